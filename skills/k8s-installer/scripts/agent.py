@@ -0,0 +1,199 @@
+"""
+節點端 agent 的本機介面
+
+node_agent.py 以內容雜湊命名上傳到節點（相同內容只傳一次），在既有
+SSH 連線上以 python3 執行，之後以長度前綴的 JSON 訊息溝通：一次送出
+多個步驟、查詢或檔案傳輸，取得結構化的結果與進度事件，不必每個命令
+都開一個 shell 再解析 stdout。
+"""
+import base64
+import hashlib
+import itertools
+import json
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from paramiko import Channel
+from paramiko.ssh_exception import SSHException
+
+
+AGENT_SOURCE_PATH = Path(__file__).with_name("node_agent.py")
+# 與 node_agent.PROTOCOL_VERSION 一致
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct(">I")
+
+EventCallback = Callable[[dict], None]
+
+_source: Optional[Tuple[str, str]] = None
+
+
+class AgentError(Exception):
+    """agent 無法啟動、連線中斷或請求執行失敗"""
+    pass
+
+
+def agent_source() -> Tuple[str, str]:
+    """取得 agent 原始碼與其內容雜湊（行程內只讀取一次）"""
+    global _source
+    if _source is None:
+        source = AGENT_SOURCE_PATH.read_text(encoding="utf-8")
+        _source = (source, hashlib.sha256(source.encode("utf-8")).hexdigest())
+    return _source
+
+
+class RemoteAgent:
+    """
+    與單一節點上的 agent 溝通（執行緒安全）
+
+    submit 只送出請求並回傳 id，可連續送出多個請求；wait 讀取訊息直到
+    指定 id 的結果出現，途中收到的其他請求結果與事件會先保存或轉交
+    各自的 callback。
+    """
+
+    def __init__(self, channel: Channel):
+        self._channel = channel
+        self._ids = itertools.count(1)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._results: dict[int, dict] = {}
+        self._callbacks: dict[int, EventCallback] = {}
+
+    @property
+    def is_open(self) -> bool:
+        return not self._channel.closed
+
+    def handshake(self) -> dict:
+        """確認 agent 已啟動且協定版本相符"""
+        info = self.call("ping")
+        if info.get("version") != PROTOCOL_VERSION:
+            raise AgentError(f"agent 協定版本不符：{info.get('version')}")
+        return info
+
+    def submit(self, op: str, on_event: Optional[EventCallback] = None, **params) -> int:
+        """送出請求（不等待結果）"""
+        request_id = next(self._ids)
+        payload = json.dumps({"id": request_id, "op": op, **params}).encode("utf-8")
+        if on_event is not None:
+            self._callbacks[request_id] = on_event
+        try:
+            with self._write_lock:
+                self._channel.sendall(HEADER.pack(len(payload)) + payload)
+        except (OSError, SSHException) as e:
+            self.close()
+            raise AgentError(f"無法送出請求：{e}") from e
+        return request_id
+
+    def wait(self, request_id: int) -> dict:
+        """
+        等待請求的結果
+
+        Raises:
+            AgentError: agent 回報錯誤或連線中斷
+        """
+        with self._read_lock:
+            while request_id not in self._results:
+                message = self._read_message()
+                message_id = message.get("id")
+                if message.get("type") == "event":
+                    callback = self._callbacks.get(message_id)
+                    if callback is not None:
+                        callback(message)
+                else:
+                    self._results[message_id] = message
+            message = self._results.pop(request_id)
+            self._callbacks.pop(request_id, None)
+
+        if message.get("type") == "error":
+            raise AgentError(message.get("message", "agent 執行失敗"))
+        return message.get("data") or {}
+
+    def call(self, op: str, on_event: Optional[EventCallback] = None, **params) -> dict:
+        """送出請求並等待結果"""
+        return self.wait(self.submit(op, on_event, **params))
+
+    def run(self, command: str, timeout: Optional[int] = None) -> Tuple[str, str, int]:
+        """
+        執行命令
+
+        Returns:
+            Tuple[stdout, stderr, exit_code]
+        """
+        result = self.call("run", command=command, timeout=timeout)
+        return result["stdout"], result["stderr"], result["exit_code"]
+
+    def batch(
+        self,
+        items: list[dict],
+        on_event: Optional[EventCallback] = None,
+        stop_on_error: bool = True,
+    ) -> list[dict]:
+        """
+        一次送出多個請求，依序執行
+
+        Args:
+            items: 請求列表（例如 {"op": "run", "command": ...}）
+            on_event: 每個項目開始與結束時的事件（index、status，結束時另含 result）
+            stop_on_error: 任一項目失敗後其餘標記為 skipped
+
+        Returns:
+            每個項目的結果，含 status（success / failed / skipped）
+        """
+        result = self.call(
+            "batch", on_event, items=items, stop_on_error=stop_on_error
+        )
+        return result["results"]
+
+    def put_file(self, path: str, data: bytes, mode: str = "0644") -> None:
+        """寫入節點上的檔案（先寫暫存檔再 rename）"""
+        self.call(
+            "put", path=path, data=base64.b64encode(data).decode("ascii"), mode=mode
+        )
+
+    def get_file(self, path: str, max_bytes: int = 1024 * 1024) -> Tuple[bytes, bool]:
+        """
+        讀取節點上的檔案
+
+        Returns:
+            Tuple[內容, 是否因超過 max_bytes 而截斷]
+        """
+        result = self.call("get", path=path, max_bytes=max_bytes)
+        return base64.b64decode(result["data"]), result["truncated"]
+
+    def close(self) -> None:
+        """結束 agent（未處理的請求會被捨棄）"""
+        if self._channel.closed:
+            return
+        try:
+            payload = json.dumps({"op": "shutdown"}).encode("utf-8")
+            with self._write_lock:
+                self._channel.sendall(HEADER.pack(len(payload)) + payload)
+        except (OSError, SSHException):
+            pass
+        self._channel.close()
+
+    def _read_message(self) -> dict:
+        header = self._read_exact(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        return json.loads(self._read_exact(length).decode("utf-8"))
+
+    def _read_exact(self, size: int) -> bytes:
+        data = bytearray()
+        try:
+            while len(data) < size:
+                chunk = self._channel.recv(size - len(data))
+                if not chunk:
+                    raise AgentError(f"agent 已結束：{self._stderr_tail()}")
+                data += chunk
+        except (OSError, SSHException) as e:
+            self.close()
+            raise AgentError(f"agent 連線中斷：{e}") from e
+        return bytes(data)
+
+    def _stderr_tail(self) -> str:
+        """agent 異常結束時的錯誤輸出（例如節點沒有 python3）"""
+        output = b""
+        while self._channel.recv_stderr_ready():
+            output += self._channel.recv_stderr(4096)
+        return output.decode("utf-8", errors="replace").strip()[-500:] or "沒有錯誤輸出"
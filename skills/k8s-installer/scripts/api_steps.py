@@ -0,0 +1,79 @@
+"""
+以 Kubernetes API 執行的叢集層級步驟
+
+與 steps 中同名步驟的腳本做相同的事，但由本機經 KubeAPIClient 直接
+呼叫 API Server（使用 --kube-api 時）。渲染出的腳本仍用於已套用狀態的
+雜湊與 dry-run。manifest 由本機的 ManifestCache 取得，不必傳到節點。
+"""
+from typing import Callable
+
+from calico import render_calico_resources
+from commands import (
+    CALICO_OPERATOR_MANIFEST,
+    METALLB_MANIFEST,
+    get_metallb_pool_manifest,
+)
+from kube_api import KubeAPIClient, KubeAPIError
+from manifests import ManifestCache
+from models import ClusterConfig
+
+
+# 等待元件就緒的上限（秒，與腳本中 kubectl wait 相同）
+CALICO_READY_TIMEOUT = 300
+METALLB_READY_TIMEOUT = 120
+
+KUBE_PROXY_CONFIGMAP = "/api/v1/namespaces/kube-system/configmaps/kube-proxy"
+
+
+def install_calico(
+    api: KubeAPIClient, config: ClusterConfig, manifests: ManifestCache
+) -> str:
+    """安裝 Calico operator 與自訂資源，等待 calico-node 就緒"""
+    api.apply_manifest(manifests.get(CALICO_OPERATOR_MANIFEST).decode("utf-8"))
+    api.apply_manifest(render_calico_resources(config))
+    ready = api.wait_pods_ready(
+        "calico-system", "k8s-app=calico-node", CALICO_READY_TIMEOUT
+    )
+    return f"Calico CNI installed ({ready} calico-node pods ready)"
+
+
+def enable_strict_arp(api: KubeAPIClient) -> bool:
+    """
+    在 kube-proxy 設定中啟用 strictARP（MetalLB L2 模式需要）
+
+    Returns:
+        是否有變更；沒有 kube-proxy（Calico eBPF 模式）時為 False
+    """
+    try:
+        configmap = api.request("GET", KUBE_PROXY_CONFIGMAP)
+    except KubeAPIError as e:
+        if e.status == 404:
+            return False
+        raise
+    current = configmap.get("data", {}).get("config.conf", "")
+    updated = current.replace("strictARP: false", "strictARP: true")
+    if updated == current:
+        return False
+    api.merge_patch(KUBE_PROXY_CONFIGMAP, {"data": {"config.conf": updated}})
+    return True
+
+
+def install_metallb(
+    api: KubeAPIClient, config: ClusterConfig, manifests: ManifestCache
+) -> str:
+    """啟用 strictARP、安裝 MetalLB 並設定 IP Address Pool"""
+    enable_strict_arp(api)
+    api.apply_manifest(manifests.get(METALLB_MANIFEST).decode("utf-8"))
+    api.wait_pods_ready("metallb-system", "app=metallb", METALLB_READY_TIMEOUT)
+    # webhook 剛就緒時可能仍拒絕請求，apply 會自動重試
+    api.apply_manifest(get_metallb_pool_manifest(config.metallb_ip_range))
+    return "MetalLB installed"
+
+
+# 可改以 API 執行的步驟 ID 對應的實作（回傳顯示用的輸出）
+API_STEPS: dict[
+    str, Callable[[KubeAPIClient, ClusterConfig, ManifestCache], str]
+] = {
+    "install_calico": install_calico,
+    "install_metallb": install_metallb,
+}
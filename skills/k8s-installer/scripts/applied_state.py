@@ -0,0 +1,186 @@
+"""
+已套用的叢集狀態
+
+記錄每次安裝、擴充或調和成功後實際套用到叢集的狀態（節點與角色、
+版本、網路設定、各步驟的腳本雜湊），供後續的增量操作（add-nodes、
+reconcile）與新的 inventory 比對。
+"""
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+
+from calico import resolve_calico
+from kubeadm_config import render_kubeadm_config
+from models import ClusterConfig, NodeConnection
+from steps import render_cluster_steps, render_node_steps, step_hashes
+from state import get_state_dir, load_json_state, save_json_state
+
+
+class AppliedStateError(Exception):
+    """無法判斷要套用的節點"""
+    pass
+
+
+def get_applied_state_path(endpoint: str) -> Path:
+    """依 Control Plane Endpoint 取得狀態檔路徑"""
+    digest = hashlib.sha1(endpoint.encode("utf-8")).hexdigest()[:12]
+    return get_state_dir() / f"applied-{digest}.json"
+
+
+def load_applied_state(endpoint: str) -> Optional[dict]:
+    """
+    載入已套用的叢集狀態
+
+    Returns:
+        狀態字典，從未套用過時回傳 None
+    """
+    data = load_json_state(get_applied_state_path(endpoint))
+    return data if isinstance(data, dict) else None
+
+
+def record_applied_state(config: ClusterConfig) -> None:
+    """
+    記錄目前叢集配置已完整套用
+
+    Args:
+        config: 已成功套用的叢集配置
+    """
+    endpoint = config.control_plane_endpoint()
+    node_steps = step_hashes(render_node_steps(config))
+    data = {
+        "endpoint": endpoint,
+        "applied_at": time.time(),
+        "settings": applied_settings(config),
+        "cluster_steps": step_hashes(render_cluster_steps(config)),
+        "kubeadm_config": render_kubeadm_config(config),
+        # 實際套用的 Calico 設定，之後的操作沿用同樣的封裝與 MTU
+        "calico": _calico_entry(config),
+        "nodes": [
+            _node_entry(node, "master", node_steps) for node in config.master_nodes
+        ] + [
+            _node_entry(node, "worker", node_steps) for node in config.worker_nodes
+        ],
+    }
+    save_json_state(get_applied_state_path(endpoint), data)
+
+
+def record_added_nodes(config: ClusterConfig, nodes: list[NodeConnection]) -> None:
+    """
+    記錄新加入的節點已套用
+
+    只更新這些節點的記錄；其他節點、叢集層級步驟與設定維持上次套用時
+    的內容（add-nodes 沒有在既有節點與 Control Plane 重新執行步驟，
+    配置中尚未調和的變更仍由 reconcile 處理）。沒有套用記錄時（以
+    --node 擴充既有叢集）只記錄新加入的節點。
+
+    Args:
+        config: 包含新節點的完整叢集配置
+        nodes: 已成功加入的節點
+    """
+    endpoint = config.control_plane_endpoint()
+    previous = load_applied_state(endpoint) or {"endpoint": endpoint}
+    node_steps = step_hashes(render_node_steps(config))
+    added = {node.key() for node in nodes}
+    entries = [
+        entry for entry in previous.get("nodes", []) if entry.get("key") not in added
+    ]
+    entries.extend(
+        _node_entry(node, "master" if config.is_master(node) else "worker", node_steps)
+        for node in nodes
+    )
+    save_json_state(
+        get_applied_state_path(endpoint),
+        dict(previous, applied_at=time.time(), nodes=entries),
+    )
+
+
+def applied_settings(config: ClusterConfig) -> dict:
+    """會影響叢集層級步驟的設定"""
+    return {
+        "control_plane_endpoint": config.control_plane_endpoint(),
+        "pod_network_cidr": config.pod_network_cidr,
+        "metallb_ip_range": config.metallb_ip_range,
+        "kubernetes_version": config.kubernetes_version,
+        "tuning": config.tuning.to_dict(),
+        "calico": _calico_entry(config),
+    }
+
+
+def _calico_entry(config: ClusterConfig) -> dict:
+    """決定後的 Calico 設定（含依節點數與 facts 決定的值）"""
+    calico = resolve_calico(config)
+    return {
+        "dataplane": calico.dataplane,
+        "encapsulation": calico.encapsulation,
+        "mtu": calico.mtu,
+    }
+
+
+def find_new_nodes(
+    config: ClusterConfig,
+    applied: dict,
+) -> list[NodeConnection]:
+    """
+    找出 inventory 中尚未套用到叢集的節點
+
+    Args:
+        config: 新的叢集配置
+        applied: load_applied_state 的結果
+
+    Returns:
+        新增的節點（維持 inventory 中的順序）
+    """
+    applied_keys = {entry["key"] for entry in applied.get("nodes", [])}
+    return [node for node in config.all_nodes() if node.key() not in applied_keys]
+
+
+def resolve_new_nodes(
+    config: ClusterConfig,
+    hosts: Optional[list[str]] = None,
+) -> list[NodeConnection]:
+    """
+    決定要加入叢集的節點
+
+    指定 hosts 時直接使用（適用於沒有套用記錄的既有叢集），否則與上次
+    套用的狀態比對。
+
+    Args:
+        config: 包含新節點的完整叢集配置
+        hosts: 明確指定的新節點 host（或 host:port）
+
+    Returns:
+        要加入的節點
+
+    Raises:
+        AppliedStateError: 找不到指定的節點或沒有套用記錄
+    """
+    if hosts:
+        nodes = []
+        for host in hosts:
+            matched = [
+                n for n in config.all_nodes() if host in (n.host, n.key())
+            ]
+            if not matched:
+                raise AppliedStateError(f"配置中找不到節點：{host}")
+            nodes.extend(n for n in matched if n not in nodes)
+        return nodes
+
+    applied = load_applied_state(config.control_plane_endpoint())
+    if applied is None:
+        raise AppliedStateError(
+            "找不到此叢集的套用記錄，請以 --node 指定要加入的節點"
+        )
+    return find_new_nodes(config, applied)
+
+
+def _node_entry(node: NodeConnection, role: str, steps: dict[str, str]) -> dict:
+    """節點記錄（不含密碼）"""
+    return {
+        "key": node.key(),
+        "host": node.host,
+        "port": node.port,
+        "user": node.user,
+        "role": role,
+        "steps": steps,
+    }
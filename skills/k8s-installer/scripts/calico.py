@@ -0,0 +1,212 @@
+"""
+Calico 網路資源產生
+
+依叢集配置產生 tigera-operator 使用的 Installation 與 APIServer 資源，
+取代固定的 custom-resources.yaml。大型叢集中 CNI 對 Control Plane 的
+負載不隨節點數線性成長：
+
+- calico-node 經 Typha 取得資料，operator 依節點數調整 Typha 副本數
+  （約每 200 個節點一個），API Server 上的 watch 數只與 Typha 數有關
+- 節點數超過 BGP full mesh 的建議上限時預設改用 VXLAN 並停用 BGP，
+  避免節點間的 BGP 連線數隨節點數平方成長
+- MTU 取所有節點中最小的網卡 MTU 再扣除封裝標頭，跨站點 MTU 不一致
+  時也不會出現封包分片
+
+封裝方式與 MTU 在第一次安裝時決定並記錄於已套用狀態，之後擴充節點
+不會改變既有叢集的網路設定。
+"""
+from dataclasses import replace
+from typing import Optional
+
+import yaml
+
+from models import CalicoSettings, ClusterConfig
+
+
+OPERATOR_API_VERSION = "operator.tigera.io/v1"
+
+# Installation 資源的 dataplane 名稱
+LINUX_DATAPLANES = {"iptables": "Iptables", "bpf": "BPF"}
+
+# 各封裝方式的標頭大小（IPv4）
+ENCAPSULATION_OVERHEAD = {
+    "VXLAN": 50,
+    "VXLANCrossSubnet": 50,
+    "IPIP": 20,
+    "IPIPCrossSubnet": 20,
+    "None": 0,
+}
+
+# 超過此節點數時 BGP full mesh 的連線數過多（Calico 建議改用 route reflector）
+BGP_MESH_MAX_NODES = 100
+
+# 與 tigera-operator 調整 Typha 副本數的規則相同
+TYPHA_NODES_PER_REPLICA = 200
+TYPHA_MAX_REPLICAS = 20
+
+# eBPF dataplane 需要的最低核心版本
+BPF_MIN_KERNEL = (5, 3)
+
+# eBPF 模式取代 kube-proxy，calico-node 需要直接連到 API Server
+SERVICES_ENDPOINT_CONFIGMAP = "kubernetes-services-endpoint"
+OPERATOR_NAMESPACE = "tigera-operator"
+
+
+def typha_replicas(node_count: int) -> int:
+    """
+    預估 operator 會建立的 Typha 副本數
+
+    每 200 個節點一個再加一個備援；超過 3 個節點時至少 3 個，
+    且不超過節點數。
+    """
+    replicas = node_count // TYPHA_NODES_PER_REPLICA + 2
+    if node_count <= replicas:
+        replicas = node_count
+    elif node_count > 3 and replicas < 3:
+        replicas = 3
+    return max(1, min(replicas, TYPHA_MAX_REPLICAS))
+
+
+def default_encapsulation(node_count: int) -> str:
+    """未設定時的封裝方式：小叢集沿用 Calico 預設，大叢集改用 VXLAN"""
+    if node_count > BGP_MESH_MAX_NODES:
+        return "VXLAN"
+    return "VXLANCrossSubnet"
+
+
+def bgp_enabled(encapsulation: str) -> bool:
+    """VXLAN 由 Felix 自行分發路由，不需要 BGP"""
+    return encapsulation != "VXLAN"
+
+
+def mtu_from_facts(facts: list[dict], encapsulation: str) -> Optional[int]:
+    """
+    依節點 facts 計算 Pod 網路 MTU
+
+    Returns:
+        最小的網卡 MTU 扣除封裝標頭；沒有可用的 MTU 時為 None
+        （由 Calico 在各節點自動偵測）
+    """
+    mtus = [f["mtu"] for f in facts if f.get("mtu")]
+    if not mtus:
+        return None
+    return min(mtus) - ENCAPSULATION_OVERHEAD[encapsulation]
+
+
+def kernel_version(release: str) -> Optional[tuple[int, int]]:
+    """解析 uname -r（例如 5.14.0-362.el9 → (5, 14)），無法解析時為 None"""
+    parts = release.split("-", 1)[0].split(".")
+    try:
+        return int(parts[0]), int(parts[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def resolve_calico(
+    config: ClusterConfig,
+    facts: Optional[list[dict]] = None,
+    applied: Optional[dict] = None,
+) -> CalicoSettings:
+    """
+    決定實際套用的 Calico 設定
+
+    配置中明確設定的值優先；其次是上次套用時決定的值（既有叢集的
+    網路設定不隨節點數改變）；最後依節點數與 facts 決定。
+
+    Args:
+        config: 叢集配置
+        facts: 各節點的 facts（第一次安裝時提供）
+        applied: load_applied_state 的結果
+    """
+    settings = config.calico
+    recorded = (applied or {}).get("calico") or {}
+    encapsulation = (
+        settings.encapsulation
+        or recorded.get("encapsulation")
+        or default_encapsulation(len(config.all_nodes()))
+    )
+    mtu = settings.mtu or recorded.get("mtu")
+    if mtu is None and facts:
+        mtu = mtu_from_facts(facts, encapsulation)
+    return replace(settings, encapsulation=encapsulation, mtu=mtu)
+
+
+def with_calico(config: ClusterConfig, calico: CalicoSettings) -> ClusterConfig:
+    """回傳套用指定 Calico 設定的配置副本（不修改原配置）"""
+    return replace(config, calico=calico)
+
+
+def calico_documents(config: ClusterConfig) -> list[dict]:
+    """
+    產生 Calico 的各份資源
+
+    Returns:
+        [Installation, APIServer]；eBPF 模式另含 API Server 位址的 ConfigMap
+    """
+    calico = config.calico
+    encapsulation = calico.encapsulation or default_encapsulation(len(config.all_nodes()))
+
+    network = {
+        "linuxDataplane": LINUX_DATAPLANES[calico.dataplane],
+        "ipPools": [{
+            "blockSize": 26,
+            "cidr": config.pod_network_cidr,
+            "encapsulation": encapsulation,
+            "natOutgoing": "Enabled",
+            "nodeSelector": "all()",
+        }],
+    }
+    if not bgp_enabled(encapsulation):
+        network["bgp"] = "Disabled"
+    if calico.mtu is not None:
+        network["mtu"] = calico.mtu
+
+    documents = []
+    if calico.dataplane == "bpf":
+        host, port = config.control_plane_endpoint().rsplit(":", 1)
+        documents.append({
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {
+                "name": SERVICES_ENDPOINT_CONFIGMAP,
+                "namespace": OPERATOR_NAMESPACE,
+            },
+            "data": {
+                "KUBERNETES_SERVICE_HOST": host,
+                "KUBERNETES_SERVICE_PORT": port,
+            },
+        })
+    documents.append({
+        "apiVersion": OPERATOR_API_VERSION,
+        "kind": "Installation",
+        "metadata": {"name": "default"},
+        "spec": {"calicoNetwork": network},
+    })
+    documents.append({
+        "apiVersion": OPERATOR_API_VERSION,
+        "kind": "APIServer",
+        "metadata": {"name": "default"},
+        "spec": {},
+    })
+    return documents
+
+
+def render_calico_resources(config: ClusterConfig) -> str:
+    """產生 Calico 資源內容（多文件 YAML，相同配置一定得到相同內容）"""
+    return "---\n".join(
+        yaml.safe_dump(document, default_flow_style=False, sort_keys=True)
+        for document in calico_documents(config)
+    ).strip()
+
+
+def calico_summary(config: ClusterConfig) -> dict:
+    """顯示用的 Calico 設定摘要"""
+    calico = config.calico
+    encapsulation = calico.encapsulation or default_encapsulation(len(config.all_nodes()))
+    return {
+        "dataplane": calico.dataplane,
+        "encapsulation": encapsulation,
+        "bgp": bgp_enabled(encapsulation),
+        "mtu": calico.mtu,
+        "typha_replicas": typha_replicas(len(config.all_nodes())),
+    }
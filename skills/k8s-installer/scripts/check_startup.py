@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+CLI 啟動效能檢查
+
+以 `python -X importtime` 執行不需要 SSH 的命令（list、validate），
+確認啟動時不會載入 paramiko 等重量級模組，並回報匯入耗時。
+
+用法：
+    python check_startup.py [--budget-ms 150]
+
+任一命令載入了禁止的模組或超出時間預算時，以 exit code 1 結束。
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+SCRIPT_DIR = Path(__file__).parent
+
+# 不需要 SSH 的命令不應載入的模組
+FORBIDDEN_MODULES = ("paramiko", "cryptography", "nacl", "bcrypt")
+
+# 不需連線即可驗證的最小配置
+SAMPLE_CONFIG = """
+master_nodes:
+  - host: 192.0.2.10
+    user: root
+    password: example
+worker_nodes:
+  - host: 192.0.2.20
+    user: root
+    password: example
+""".lstrip()
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    解析 -X importtime 輸出
+
+    Returns:
+        模組名稱 -> 累計匯入時間（微秒）
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # 保留名稱前的縮排，縮排代表巢狀匯入
+        modules[parts[2][1:].rstrip()] = int(parts[1])
+    return modules
+
+
+def measure(args: list[str]) -> dict[str, int]:
+    """以 -X importtime 執行 main.py 並回傳匯入的模組"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(SCRIPT_DIR / "main.py"), *args],
+        capture_output=True,
+        text=True,
+        cwd=SCRIPT_DIR,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"命令執行失敗（exit {proc.returncode}）：{' '.join(args)}\n"
+            f"{proc.stdout}"
+        )
+    return parse_importtime(proc.stderr)
+
+
+def check_command(name: str, args: list[str], budget_ms: float) -> bool:
+    """檢查單一命令的啟動匯入，回傳是否通過"""
+    modules = measure(args)
+    top_level = {m: t for m, t in modules.items() if not m.startswith(" ")}
+    total_ms = sum(top_level.values()) / 1000
+    loaded = sorted({
+        m.strip() for m in modules
+        if m.strip().split(".")[0] in FORBIDDEN_MODULES
+    })
+
+    slowest = sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:5]
+    print(f"[{name}] 匯入耗時 {total_ms:.1f} ms（預算 {budget_ms:.0f} ms）")
+    for module, cumulative in slowest:
+        print(f"    {cumulative / 1000:8.1f} ms  {module}")
+
+    ok = True
+    if loaded:
+        print(f"  ❌ 載入了不應載入的模組：{', '.join(loaded)}")
+        ok = False
+    if total_ms > budget_ms:
+        print("  ❌ 超出啟動時間預算")
+        ok = False
+    if ok:
+        print("  ✅ 通過")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=150.0,
+        help="單一命令的匯入時間預算（毫秒）",
+    )
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "cluster.yaml"
+        config_path.write_text(SAMPLE_CONFIG, encoding="utf-8")
+
+        results = [
+            check_command("list", ["list"], options.budget_ms),
+            check_command(
+                "validate",
+                ["validate", "-c", str(config_path)],
+                options.budget_ms,
+            ),
+        ]
+
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,10 +19,25 @@ from .cluster_scripts import (
     get_install_calico_script,
     get_generate_join_command_script,
     get_master_join_script,
+    parse_join_command,
+    get_join_configuration,
+    get_master_prepare_script,
+    get_master_control_plane_join_script,
+    get_etcd_health_check_script,
     get_worker_join_script,
     get_install_metallb_script,
+    get_metallb_pool_manifest,
+    get_remove_node_script,
+    get_seed_images_script,
+    get_fetch_seed_images_script,
+    get_stop_seed_script,
     get_check_cluster_status_script,
+    get_node_health_probe_script,
+    get_collect_diagnostics_script,
     CLUSTER_STEPS,
+    CALICO_OPERATOR_MANIFEST,
+    METALLB_MANIFEST,
+    REMOTE_MANIFEST_DIR,
 )
 
 __all__ = [
@@ -42,8 +57,23 @@ __all__ = [
     "get_install_calico_script",
     "get_generate_join_command_script",
     "get_master_join_script",
+    "parse_join_command",
+    "get_join_configuration",
+    "get_master_prepare_script",
+    "get_master_control_plane_join_script",
+    "get_etcd_health_check_script",
     "get_worker_join_script",
     "get_install_metallb_script",
+    "get_metallb_pool_manifest",
+    "get_remove_node_script",
+    "get_seed_images_script",
+    "get_fetch_seed_images_script",
+    "get_stop_seed_script",
     "get_check_cluster_status_script",
+    "get_node_health_probe_script",
+    "get_collect_diagnostics_script",
     "CLUSTER_STEPS",
+    "CALICO_OPERATOR_MANIFEST",
+    "METALLB_MANIFEST",
+    "REMOTE_MANIFEST_DIR",
 ]
@@ -3,25 +3,55 @@ K8S 叢集設定腳本
 
 包含 kubeadm init、安裝 Calico CNI、kubeadm join、MetalLB 等步驟。
 """
+import shlex
 
 
-def get_kubeadm_init_script(
-    pod_network_cidr: str,
-    control_plane_endpoint: str,
-) -> str:
+# 叢集元件 manifest（版本固定）
+CALICO_OPERATOR_MANIFEST = "https://raw.githubusercontent.com/projectcalico/calico/v3.27.0/manifests/tigera-operator.yaml"
+METALLB_MANIFEST = "https://raw.githubusercontent.com/metallb/metallb/v0.14.3/config/manifests/metallb-native.yaml"
+
+# 預先傳送到節點的 manifest（檔名為 URL 的 sha256）
+REMOTE_MANIFEST_DIR = "/var/lib/k8s-installer/manifests"
+
+# 站點種子節點匯出映像的目錄與提供下載的 port
+SEED_DIR = "/var/lib/k8s-installer/seed"
+SEED_PORT = 18080
+# 種子節點的下載服務最長存活時間（秒），安裝中斷時也會自行結束
+SEED_SERVE_SECONDS = 3600
+
+# kubeadm init 使用的設定檔
+KUBEADM_CONFIG_PATH = "/etc/kubernetes/kubeadm-config.yaml"
+
+# 讀取 manifest：節點上已有預先傳送的檔案時直接使用，否則下載
+FETCH_MANIFEST_FUNCTION = f"""
+k8s_fetch() {{
+  local cached="{REMOTE_MANIFEST_DIR}/$(printf %s "$1" | sha256sum | cut -d' ' -f1).yaml"
+  if [ -s "$cached" ]; then cat "$cached"; else curl -fsSL "$1"; fi
+}}
+""".strip()
+
+
+def get_kubeadm_init_script(kubeadm_config: str) -> str:
     """
     取得初始化 Control Plane 的腳本
-    
+
     Args:
-        pod_network_cidr: Pod 網路 CIDR
-        control_plane_endpoint: Control Plane Endpoint
+        kubeadm_config: kubeadm 設定檔內容（ClusterConfiguration 等多份文件）
     """
     return f"""
+# 寫入 kubeadm 設定
+mkdir -p /etc/kubernetes
+cat <<'EOF' > {KUBEADM_CONFIG_PATH}
+{kubeadm_config}
+EOF
+
+# 以節點上的 kubeadm 驗證設定（舊版 kubeadm 沒有 validate 子命令）
+if kubeadm config validate --help >/dev/null 2>&1; then
+  kubeadm config validate --config {KUBEADM_CONFIG_PATH} || exit 1
+fi
+
 # 初始化 Kubernetes Control Plane
-kubeadm init \\
-  --control-plane-endpoint "{control_plane_endpoint}" \\
-  --upload-certs \\
-  --pod-network-cidr={pod_network_cidr}
+kubeadm init --config {KUBEADM_CONFIG_PATH} --upload-certs
 
 # 設定 kubectl 存取
 mkdir -p $HOME/.kube
@@ -32,16 +62,23 @@ echo "Control Plane initialized"
 """.strip()
 
 
-def get_install_calico_script(pod_network_cidr: str) -> str:
-    """取得安裝 Calico CNI 的腳本"""
+def get_install_calico_script(calico_resources: str) -> str:
+    """
+    取得安裝 Calico CNI 的腳本
+
+    Args:
+        calico_resources: Installation 等 Calico 資源內容（多文件 YAML）
+    """
     return f"""
+{FETCH_MANIFEST_FUNCTION}
+
 # 安裝 Calico operator
-kubectl create -f https://raw.githubusercontent.com/projectcalico/calico/v3.27.0/manifests/tigera-operator.yaml
+k8s_fetch {CALICO_OPERATOR_MANIFEST} | kubectl create -f -
 
 # 安裝 Calico 自訂資源
-curl -fsSL https://raw.githubusercontent.com/projectcalico/calico/v3.27.0/manifests/custom-resources.yaml | \\
-  sed "s#192.168.0.0/16#{pod_network_cidr}#g" | \\
-  kubectl apply -f -
+kubectl apply -f - <<'EOF'
+{calico_resources}
+EOF
 
 # 等待 Calico 就緒
 kubectl wait --for=condition=Ready pods -l k8s-app=calico-node -n calico-system --timeout=300s
@@ -50,16 +87,31 @@ echo "Calico CNI installed"
 """.strip()
 
 
-def get_generate_join_command_script() -> str:
-    """取得產生 join 命令與 certificate key 的腳本"""
-    return """
-# 產生 Control Plane certificate key 與 join 命令
-CERT_KEY=$(kubeadm init phase upload-certs --upload-certs | tail -n 1)
-JOIN_CMD=$(kubeadm token create --print-join-command)
+def get_generate_join_command_script(
+    token_ttl: str = "24h",
+    create_token: bool = True,
+    upload_certs: bool = True,
+) -> str:
+    """
+    取得產生 join 命令與 certificate key 的腳本
 
-echo "CERT_KEY=${CERT_KEY}"
-echo "JOIN_CMD=${JOIN_CMD}"
-""".strip()
+    Args:
+        token_ttl: bootstrap token 有效期限（kubeadm duration 格式）
+        create_token: 是否建立新的 token 與 join 命令
+        upload_certs: 是否重新上傳憑證並產生 certificate key
+    """
+    lines = ["# 產生 Control Plane certificate key 與 join 命令"]
+    if upload_certs:
+        lines += [
+            "CERT_KEY=$(kubeadm init phase upload-certs --upload-certs | tail -n 1)",
+            'echo "CERT_KEY=${CERT_KEY}"',
+        ]
+    if create_token:
+        lines += [
+            f"JOIN_CMD=$(kubeadm token create --ttl {token_ttl} --print-join-command)",
+            'echo "JOIN_CMD=${JOIN_CMD}"',
+        ]
+    return "\n".join(lines)
 
 
 def get_master_join_script(join_command: str, certificate_key: str) -> str:
@@ -82,6 +134,144 @@ echo "Master joined the cluster"
 """.strip()
 
 
+# 分階段加入 Control Plane 時使用的 JoinConfiguration 路徑
+JOIN_CONFIG_PATH = "/etc/kubernetes/kubeadm-join.yaml"
+
+
+def parse_join_command(join_command: str) -> dict:
+    """
+    解析 kubeadm token create --print-join-command 的輸出
+
+    Args:
+        join_command: 例如 kubeadm join 10.0.0.1:6443 --token xxx
+            --discovery-token-ca-cert-hash sha256:yyy
+
+    Returns:
+        {"endpoint", "token", "ca_cert_hash"}
+
+    Raises:
+        ValueError: 格式不符
+    """
+    parts = join_command.split()
+    try:
+        start = parts.index("join") + 1
+        endpoint = parts[start]
+        token = parts[parts.index("--token") + 1]
+        ca_cert_hash = parts[parts.index("--discovery-token-ca-cert-hash") + 1]
+    except (ValueError, IndexError) as e:
+        raise ValueError(f"無法解析 join 命令：{join_command}") from e
+    return {"endpoint": endpoint, "token": token, "ca_cert_hash": ca_cert_hash}
+
+
+def get_join_configuration(join_command: str, certificate_key: str) -> str:
+    """
+    取得 Control Plane 加入用的 kubeadm JoinConfiguration
+
+    kubeadm join phase 的各子命令都接受 --config，改用設定檔即可分階段
+    執行，不必在每個 phase 重複傳入 token 等參數。
+    """
+    join = parse_join_command(join_command)
+    return f"""
+apiVersion: kubeadm.k8s.io/v1beta3
+kind: JoinConfiguration
+discovery:
+  bootstrapToken:
+    apiServerEndpoint: "{join['endpoint']}"
+    token: "{join['token']}"
+    caCertHashes:
+      - "{join['ca_cert_hash']}"
+controlPlane:
+  certificateKey: "{certificate_key}"
+""".strip()
+
+
+def get_master_prepare_script(join_command: str, certificate_key: str) -> str:
+    """
+    取得 Master 加入前的準備腳本（可多台並行）
+
+    執行到 kubelet-start 為止：下載憑證、產生 static Pod manifest 與
+    kubeconfig、啟動 kubelet。新增 etcd 成員的步驟另由
+    get_master_control_plane_join_script 逐台執行。
+    """
+    join_config = get_join_configuration(join_command, certificate_key)
+    return f"""
+set -e
+
+# 寫入 JoinConfiguration（含 token 與 certificate key，僅 root 可讀）
+mkdir -p /etc/kubernetes
+(umask 077 && cat <<'EOF' > {JOIN_CONFIG_PATH}
+{join_config}
+EOF
+)
+
+# 加入前的準備階段（不會變更 etcd 成員）
+kubeadm join phase preflight --config {JOIN_CONFIG_PATH}
+kubeadm join phase control-plane-prepare all --config {JOIN_CONFIG_PATH}
+kubeadm join phase kubelet-start --config {JOIN_CONFIG_PATH}
+
+echo "Control plane node prepared"
+""".strip()
+
+
+def get_master_control_plane_join_script() -> str:
+    """
+    取得新增 etcd 成員並完成 Control Plane 加入的腳本（須逐台執行）
+    """
+    return f"""
+set -e
+
+# 新增本機 etcd 成員、更新叢集狀態並標記為 Control Plane
+kubeadm join phase control-plane-join all --config {JOIN_CONFIG_PATH}
+rm -f {JOIN_CONFIG_PATH}
+
+mkdir -p $HOME/.kube
+cp -f /etc/kubernetes/admin.conf $HOME/.kube/config
+chown $(id -u):$(id -g) $HOME/.kube/config
+
+echo "Master joined the cluster"
+""".strip()
+
+
+def get_etcd_health_check_script(expected_members: int, timeout: int = 300) -> str:
+    """
+    取得 etcd 健康檢查腳本（在既有 Master 執行）
+
+    等待 etcd 成員數達到預期且所有成員皆健康，再讓下一台 Master 加入，
+    避免在 quorum 尚未穩定時連續新增成員。
+
+    Args:
+        expected_members: 預期的 etcd 成員數
+        timeout: 最長等待秒數
+    """
+    return f"""
+ETCDCTL_ARGS="--endpoints=https://127.0.0.1:2379 \\
+  --cacert=/etc/kubernetes/pki/etcd/ca.crt \\
+  --cert=/etc/kubernetes/pki/etcd/server.crt \\
+  --key=/etc/kubernetes/pki/etcd/server.key"
+DEADLINE=$(( $(date +%s) + {timeout} ))
+
+while [ "$(date +%s)" -lt "$DEADLINE" ]; do
+  ETCD_POD=$(kubectl -n kube-system get pods -l component=etcd \\
+    -o jsonpath='{{.items[0].metadata.name}}' 2>/dev/null)
+  if [ -n "$ETCD_POD" ]; then
+    # 狀態欄位須完全是 started（unstarted 表示已新增但尚未啟動）
+    MEMBERS=$(kubectl -n kube-system exec "$ETCD_POD" -- \\
+      etcdctl $ETCDCTL_ARGS member list 2>/dev/null | grep -c ', started,')
+    if [ "$MEMBERS" -ge {expected_members} ] && \\
+       kubectl -n kube-system exec "$ETCD_POD" -- \\
+         etcdctl $ETCDCTL_ARGS endpoint health --cluster >/dev/null 2>&1; then
+      echo "etcd healthy: $MEMBERS members"
+      exit 0
+    fi
+  fi
+  sleep 5
+done
+
+echo "etcd 在 {timeout} 秒內未達到 {expected_members} 個健康成員" >&2
+exit 1
+""".strip()
+
+
 def get_worker_join_script(join_command: str) -> str:
     """
     取得 Worker 加入叢集的腳本
@@ -97,20 +287,9 @@ echo "Worker joined the cluster"
 """.strip()
 
 
-def get_install_metallb_script(metallb_ip_range: str) -> str:
-    """取得安裝 MetalLB 的腳本"""
+def get_metallb_pool_manifest(metallb_ip_range: str) -> str:
+    """取得 MetalLB 的 IPAddressPool 與 L2Advertisement"""
     return f"""
-# 啟用 strictARP
-kubectl get configmap kube-proxy -n kube-system -o yaml | \\
-  sed -e 's/strictARP: false/strictARP: true/' | \\
-  kubectl apply -f - -n kube-system
-
-# 安裝 MetalLB
-kubectl apply -f https://raw.githubusercontent.com/metallb/metallb/v0.14.3/config/manifests/metallb-native.yaml
-kubectl wait --for=condition=Ready pods -l app=metallb -n metallb-system --timeout=120s
-
-# 設定 IP Address Pool
-cat <<EOF | kubectl apply -f -
 apiVersion: metallb.io/v1beta1
 kind: IPAddressPool
 metadata:
@@ -128,18 +307,220 @@ metadata:
 spec:
   ipAddressPools:
   - default-pool
+""".strip()
+
+
+def get_install_metallb_script(metallb_ip_range: str) -> str:
+    """取得安裝 MetalLB 的腳本"""
+    return f"""
+{FETCH_MANIFEST_FUNCTION}
+
+# 啟用 strictARP
+kubectl get configmap kube-proxy -n kube-system -o yaml | \\
+  sed -e 's/strictARP: false/strictARP: true/' | \\
+  kubectl apply -f - -n kube-system
+
+# 安裝 MetalLB
+k8s_fetch {METALLB_MANIFEST} | kubectl apply -f -
+kubectl wait --for=condition=Ready pods -l app=metallb -n metallb-system --timeout=120s
+
+# 設定 IP Address Pool
+cat <<EOF | kubectl apply -f -
+{get_metallb_pool_manifest(metallb_ip_range)}
 EOF
 
 echo "MetalLB installed"
 """.strip()
 
 
+def get_remove_node_script(host: str) -> str:
+    """
+    取得將節點移出叢集的腳本（在 Control Plane 執行）
+
+    以 inventory 的 host 及其 DNS 解析結果，比對每個節點的名稱與所有
+    位址（InternalIP、ExternalIP、Hostname 等）找出節點，drain 後自叢集
+    刪除。找不到或比對到多個節點時失敗，不會把仍在叢集中的節點記錄為
+    已移除。節點本身不會被重設，之後可再手動執行 kubeadm reset。
+
+    Args:
+        host: 節點 host（IP 或 DNS 名稱）
+    """
+    quoted = shlex.quote(host)
+    return f"""
+set -e
+
+HOST={quoted}
+CANDIDATES="$HOST $(getent ahosts "$HOST" 2>/dev/null | awk '{{ print $1 }}' | sort -u | tr '\n' ' ')"
+NODE_NAME=$(kubectl get nodes -o jsonpath='{{range .items[*]}}{{.metadata.name}} {{.status.addresses[*].address}}{{"\n"}}{{end}}' \
+  | awk -v candidates="$CANDIDATES" '
+      BEGIN {{ n = split(tolower(candidates), c, " "); for (i = 1; i <= n; i++) want[c[i]] = 1 }}
+      {{ for (i = 1; i <= NF; i++) if (tolower($i) in want) {{ print $1; next }} }}' \
+  | sort -u)
+
+if [ -z "$NODE_NAME" ]; then
+  echo "No node matches: $CANDIDATES" >&2
+  exit 1
+fi
+if [ "$(echo "$NODE_NAME" | wc -l)" -ne 1 ]; then
+  echo "More than one node matches $CANDIDATES:" $NODE_NAME >&2
+  exit 1
+fi
+
+kubectl drain "$NODE_NAME" --ignore-daemonsets --delete-emptydir-data --timeout=300s
+kubectl delete node "$NODE_NAME"
+
+echo "Node $NODE_NAME removed"
+""".strip()
+
+
+def get_seed_images_script(port: int = SEED_PORT) -> str:
+    """
+    取得站點種子節點的腳本：下載 kubeadm 所需映像、匯出為單一檔案，
+    並以 HTTP 提供給同站點的其他節點（最多 SEED_SERVE_SECONDS 秒）
+
+    Args:
+        port: 提供下載的 port
+    """
+    return f"""
+# 下載並匯出 kubeadm 所需映像
+mkdir -p {SEED_DIR}
+kubeadm config images pull
+ctr -n k8s.io images export {SEED_DIR}/images.tar $(kubeadm config images list)
+
+# 在背景提供下載（已啟動則沿用）
+if [ -f {SEED_DIR}/server.pid ] && kill -0 "$(cat {SEED_DIR}/server.pid)" 2>/dev/null; then
+  echo "Seed server already running"
+else
+  nohup timeout {SEED_SERVE_SECONDS} python3 -m http.server {port} --directory {SEED_DIR} >/dev/null 2>&1 &
+  echo $! > {SEED_DIR}/server.pid
+fi
+
+echo "Seed images ready on port {port}"
+""".strip()
+
+
+def get_fetch_seed_images_script(seed_host: str, port: int = SEED_PORT) -> str:
+    """
+    取得從站點種子節點匯入映像的腳本（種子無法連線時改由 registry 下載）
+
+    Args:
+        seed_host: 種子節點位址
+        port: 種子節點提供下載的 port
+    """
+    return f"""
+# 從同站點的種子節點匯入映像
+set -o pipefail
+if curl -fsS --connect-timeout 5 http://{seed_host}:{port}/images.tar | ctr -n k8s.io images import -; then
+  echo "Images imported from seed {seed_host}"
+else
+  echo "Seed {seed_host} unavailable, pulling from registry" >&2
+  kubeadm config images pull
+fi
+""".strip()
+
+
+def get_stop_seed_script() -> str:
+    """取得停止種子節點下載服務並清除匯出檔的腳本"""
+    return f"""
+# 停止下載服務並清除匯出的映像
+if [ -f {SEED_DIR}/server.pid ]; then
+  kill "$(cat {SEED_DIR}/server.pid)" 2>/dev/null || true
+fi
+rm -rf {SEED_DIR}
+
+echo "Seed stopped"
+""".strip()
+
+
 def get_check_cluster_status_script() -> str:
-    """取得檢查叢集狀態的腳本"""
+    """
+    取得檢查叢集狀態的腳本（在 Control Plane 執行）
+
+    一次查詢 API Server，以 tab 分隔的行輸出（避免傳回整份 JSON）：
+        node<TAB>名稱<TAB>InternalIP<TAB>Ready<TAB>kubelet 版本<TAB>為 True 的 conditions
+        pods<TAB>節點名稱<TAB>未就緒的 Pod 數
+    """
     return """
 # 檢查叢集狀態
-kubectl get nodes -o wide
-kubectl get pods -A
+set -o pipefail
+kubectl get nodes -o jsonpath='{range .items[*]}node{"\\t"}{.metadata.name}{"\\t"}{.status.addresses[?(@.type=="InternalIP")].address}{"\\t"}{.status.conditions[?(@.type=="Ready")].status}{"\\t"}{.status.nodeInfo.kubeletVersion}{"\\t"}{.status.conditions[?(@.status=="True")].type}{"\\n"}{end}'
+kubectl get pods -A --no-headers \\
+  -o custom-columns=NODE:.spec.nodeName,PHASE:.status.phase \\
+  | awk '$2 != "Running" && $2 != "Succeeded" { count[$1]++ }
+         END { for (n in count) printf "pods\\t%s\\t%d\\n", n, count[n] }'
+""".strip()
+
+
+def get_node_health_probe_script() -> str:
+    """
+    取得節點健康探測腳本（key=value 格式輸出）
+
+    檢查 kubelet / containerd 服務、根目錄與 containerd 資料目錄的
+    磁碟使用率，以及可用記憶體。
+    """
+    return """
+echo "hostname=$(hostname)"
+echo "kubelet=$(systemctl is-active kubelet 2>/dev/null)"
+echo "containerd=$(systemctl is-active containerd 2>/dev/null)"
+echo "disk_root_pct=$(df --output=pcent / 2>/dev/null | tail -n 1 | tr -dc '0-9')"
+echo "disk_containerd_pct=$(df --output=pcent /var/lib/containerd 2>/dev/null | tail -n 1 | tr -dc '0-9')"
+echo "memory_total_kb=$(awk '/^MemTotal:/ {print $2}' /proc/meminfo)"
+echo "memory_available_kb=$(awk '/^MemAvailable:/ {print $2}' /proc/meminfo)"
+""".strip()
+
+
+def get_collect_diagnostics_script(
+    since_minutes: int = 60,
+    max_lines: int = 5000,
+    max_file_bytes: int = 5 * 1024 * 1024,
+) -> str:
+    """
+    取得診斷資料收集腳本
+
+    在節點上收集 kubelet / containerd 日誌、系統日誌、核心訊息、容器與
+    服務狀態，以及（Control Plane 上的）叢集事件；每個命令限時 20 秒，
+    每個檔案限制行數與大小，壓縮後以 tar.gz 寫到 stdout。
+
+    Args:
+        since_minutes: 收集最近幾分鐘的 journal
+        max_lines: 每個日誌檔最多保留的行數
+        max_file_bytes: 每個檔案的大小上限
+    """
+    return f"""
+set +e
+DIAG_DIR=$(mktemp -d /tmp/k8s-diag.XXXXXX)
+trap 'rm -rf "$DIAG_DIR"' EXIT
+
+collect() {{
+    local name=$1
+    shift
+    timeout 20 "$@" 2>&1 | tail -n {max_lines} | tail -c {max_file_bytes} > "$DIAG_DIR/$name"
+}}
+
+collect kubelet.log journalctl -u kubelet --since "-{since_minutes} min" --no-pager
+collect containerd.log journalctl -u containerd --since "-{since_minutes} min" --no-pager
+if [ -f /var/log/messages ]; then
+    collect messages.log cat /var/log/messages
+elif [ -f /var/log/syslog ]; then
+    collect syslog.log cat /var/log/syslog
+fi
+collect dmesg.log dmesg -T
+collect services.txt systemctl status kubelet containerd --no-pager -l
+collect containers.txt crictl ps -a
+collect disk.txt df -h
+collect memory.txt free -m
+collect ip.txt ip -br addr
+if [ -f /var/lib/k8s-installer/journal ]; then
+    collect installer-journal.log cat /var/lib/k8s-installer/journal
+fi
+if [ -f /etc/kubernetes/admin.conf ]; then
+    export KUBECONFIG=/etc/kubernetes/admin.conf
+    collect nodes.txt kubectl get nodes -o wide
+    collect pods.txt kubectl get pods -A -o wide
+    collect events.txt kubectl get events -A --sort-by=.lastTimestamp
+fi
+
+tar -C "$DIAG_DIR" -czf - . 2>/dev/null
 """.strip()
 
 
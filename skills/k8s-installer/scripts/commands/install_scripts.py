@@ -15,17 +15,29 @@ echo "Swap disabled"
 """.strip()
 
 
-def get_load_kernel_modules_script() -> str:
-    """取得載入核心模組的腳本"""
-    return """
+# kube-proxy IPVS 模式需要的核心模組
+IPVS_MODULES = ("ip_vs", "ip_vs_rr", "ip_vs_wrr", "ip_vs_sh", "nf_conntrack")
+
+
+def get_load_kernel_modules_script(proxy_mode: str = "iptables") -> str:
+    """
+    取得載入核心模組的腳本
+
+    Args:
+        proxy_mode: kube-proxy 模式，ipvs 時一併載入 IPVS 模組
+    """
+    modules = ["overlay", "br_netfilter"]
+    if proxy_mode == "ipvs":
+        modules += IPVS_MODULES
+    listing = "\n".join(modules)
+    loads = "\n".join(f"modprobe {module}" for module in modules)
+    return f"""
 # 載入核心模組
 cat <<EOF | tee /etc/modules-load.d/k8s.conf
-overlay
-br_netfilter
+{listing}
 EOF
 
-modprobe overlay
-modprobe br_netfilter
+{loads}
 echo "Kernel modules loaded"
 """.strip()
 
@@ -3,11 +3,52 @@ K8S 套件安裝腳本
 
 包含 containerd、kubeadm、kubelet、kubectl 的安裝。
 """
+import shlex
+from typing import Optional
 
 
-def get_install_containerd_script() -> str:
-    """取得安裝 containerd 的腳本"""
-    return """
+# containerd 依 registry 讀取 hosts.toml 的目錄（config_path）
+CONTAINERD_CERTS_DIR = "/etc/containerd/certs.d"
+
+
+def get_install_containerd_script(
+    max_concurrent_downloads: Optional[int] = None,
+    snapshotter: Optional[str] = None,
+    registry_hosts: tuple[tuple[str, str], ...] = (),
+) -> str:
+    """
+    取得安裝 containerd 的腳本
+
+    Args:
+        max_concurrent_downloads: 每個映像同時下載的 layer 數（None 為預設值 3）
+        snapshotter: snapshotter 名稱（None 為預設值 overlayfs）
+        registry_hosts: (registry, hosts.toml 內容)；寫入 certs.d 並啟用 config_path
+    """
+    settings = []
+    if max_concurrent_downloads is not None:
+        settings.append(
+            f"sed -i 's/max_concurrent_downloads = [0-9]*/max_concurrent_downloads = {max_concurrent_downloads}/' /etc/containerd/config.toml\n"
+            f"grep -q 'max_concurrent_downloads = {max_concurrent_downloads}' /etc/containerd/config.toml || exit 1"
+        )
+    if snapshotter is not None:
+        settings.append(
+            f"sed -i 's/snapshotter = \"overlayfs\"/snapshotter = \"{snapshotter}\"/' /etc/containerd/config.toml"
+        )
+    if registry_hosts:
+        settings.append(
+            f"sed -i 's#config_path = \"\"#config_path = \"{CONTAINERD_CERTS_DIR}\"#' /etc/containerd/config.toml\n"
+            f"grep -q 'config_path = \"{CONTAINERD_CERTS_DIR}\"' /etc/containerd/config.toml || exit 1"
+        )
+        for registry, hosts in registry_hosts:
+            registry_dir = shlex.quote(f"{CONTAINERD_CERTS_DIR}/{registry}")
+            settings.append(
+                f"mkdir -p {registry_dir}\n"
+                f"cat <<'EOF' > {registry_dir}/hosts.toml\n"
+                f"{hosts}\n"
+                f"EOF"
+            )
+
+    script = """
 # 安裝 containerd
 dnf install -y dnf-plugins-core
 dnf config-manager --enable ol9_addons || true
@@ -17,25 +58,38 @@ dnf install -y containerd
 mkdir -p /etc/containerd
 containerd config default | tee /etc/containerd/config.toml > /dev/null
 sed -i 's/SystemdCgroup = false/SystemdCgroup = true/' /etc/containerd/config.toml
-
+"""
+    if settings:
+        script += "\n# 下載並行數、snapshotter 與 registry 鏡像\n" + "\n".join(settings) + "\n"
+    script += """
 # 啟動 containerd
 systemctl enable --now containerd
-
+"""
+    if settings:
+        # 重新執行時套用新的設定
+        script += "systemctl restart containerd\n"
+    script += """
 echo "Containerd installed and configured"
-""".strip()
+"""
+    return script.strip()
+
 
+def get_install_kubernetes_packages_script(kubernetes_version: str = "1.29") -> str:
+    """
+    取得安裝 Kubernetes 套件的腳本
 
-def get_install_kubernetes_packages_script() -> str:
-    """取得安裝 Kubernetes 套件的腳本"""
-    return """
+    Args:
+        kubernetes_version: Kubernetes minor 版本（例如 1.29）
+    """
+    return f"""
 # 新增 Kubernetes YUM repository
 cat <<EOF | tee /etc/yum.repos.d/kubernetes.repo
 [kubernetes]
 name=Kubernetes
-baseurl=https://pkgs.k8s.io/core:/stable:/v1.29/rpm/
+baseurl=https://pkgs.k8s.io/core:/stable:/v{kubernetes_version}/rpm/
 enabled=1
 gpgcheck=1
-gpgkey=https://pkgs.k8s.io/core:/stable:/v1.29/rpm/repodata/repomd.xml.key
+gpgkey=https://pkgs.k8s.io/core:/stable:/v{kubernetes_version}/rpm/repodata/repomd.xml.key
 EOF
 
 # 安裝 kubelet, kubeadm, kubectl
@@ -46,7 +100,7 @@ echo "Kubernetes packages installed"
 """.strip()
 
 
-def get_full_package_install_script() -> str:
+def get_full_package_install_script(kubernetes_version: str = "1.29") -> str:
     """取得完整的套件安裝腳本"""
     scripts = [
         "#!/bin/bash",
@@ -58,7 +112,7 @@ def get_full_package_install_script() -> str:
         get_install_containerd_script(),
         "",
         "# Step 2: Install Kubernetes packages",
-        get_install_kubernetes_packages_script(),
+        get_install_kubernetes_packages_script(kubernetes_version),
         "",
         "echo '=== Packages installation completed ==='",
     ]
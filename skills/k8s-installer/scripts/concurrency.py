@@ -0,0 +1,216 @@
+"""
+自適應並行控制（AIMD）
+
+固定的 --max-workers 對健康的節點群太保守，在套件鏡像、跳板機或 API
+Server 開始逾時時又太激進。AdaptiveConcurrency 對每種共享資源（SSH
+連線、套件 / 映像鏡像、API Server）各自維護一個並行上限：步驟成功且
+耗時正常時加法遞增（每完成約一個上限數量的步驟 +1），出現逾時、認證
+節流或鏡像錯誤時乘法遞減；--max-workers 仍是上限。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from timings import StepTimings
+
+
+# 共享資源（每個步驟都使用 ssh，其餘依步驟而定）
+RESOURCE_SSH = "ssh"
+RESOURCE_MIRROR = "mirror"
+RESOURCE_APISERVER = "apiserver"
+
+# 初始上限：從保守值開始，健康時逐步增加
+INITIAL_LIMIT = 4
+# 遇到過載訊號時上限乘上的比例
+BACKOFF_FACTOR = 0.5
+# 耗時超過基準的倍數即視為變慢（不增加上限）
+LATENCY_TOLERANCE = 2.0
+# 基準耗時的移動平均權重
+LATENCY_SMOOTHING = 0.2
+
+# 錯誤訊息中代表各資源過載的片段（小寫比對，依序判斷）
+OVERLOAD_PATTERNS = {
+    RESOURCE_MIRROR: (
+        "curl error",
+        "cannot download",
+        "failed to download metadata",
+        "errors during downloading",
+        "no more mirrors",
+        "could not resolve host",
+        "429 too many requests",
+        "503 service unavailable",
+        "error pulling image",
+        "failed to pull image",
+    ),
+    RESOURCE_APISERVER: (
+        "tls handshake timeout",
+        "etcdserver: request timed out",
+        "the server is currently unable to handle the request",
+        "context deadline exceeded",
+        "too many requests",
+        "connection to the server",
+    ),
+    RESOURCE_SSH: (
+        "逾時",
+        "timed out",
+        "error reading ssh protocol banner",
+        "too many authentication failures",
+        "connection reset",
+        "無法連線",
+        "session 中斷",
+    ),
+}
+
+
+def classify_overload(message: str) -> Optional[str]:
+    """
+    判斷錯誤是否為資源過載
+
+    Returns:
+        過載的資源；一般失敗（例如腳本本身錯誤）回傳 None
+    """
+    text = message.lower()
+    for resource, patterns in OVERLOAD_PATTERNS.items():
+        if any(pattern in text for pattern in patterns):
+            return resource
+    return None
+
+
+@dataclass
+class LimiterToken:
+    """取得名額時的記錄（用於判斷過載訊號是否已處理過）"""
+    generation: int
+
+
+class AIMDLimiter:
+    """
+    單一資源的 AIMD 並行上限（執行緒安全）
+
+    同一波過載通常會讓多個進行中的操作同時失敗；只有在最近一次遞減
+    之後才取得名額的操作能再觸發遞減，避免上限一次被砍到底。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maximum: int,
+        initial: int = INITIAL_LIMIT,
+        minimum: int = 1,
+    ):
+        self.name = name
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self._limit = float(max(minimum, min(initial, self.maximum)))
+        self._in_flight = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> LimiterToken:
+        """等待直到進行中的操作數低於目前上限"""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            return LimiterToken(self._generation)
+
+    def release(self, token: LimiterToken, healthy: bool, overloaded: bool) -> None:
+        """
+        歸還名額並依結果調整上限
+
+        Args:
+            token: acquire 回傳的記錄
+            healthy: 操作成功且耗時正常（加法遞增）
+            overloaded: 操作因此資源過載而失敗（乘法遞減）
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                if token.generation == self._generation:
+                    self._limit = max(self.minimum, self._limit * BACKOFF_FACTOR)
+                    self._generation += 1
+            elif healthy:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+class AdaptiveConcurrency:
+    """
+    依資源分別調整的並行控制
+
+    步驟耗時以過去的執行記錄（StepTimings）為基準，沒有記錄時以本次
+    執行中成功步驟的移動平均為基準。
+    """
+
+    def __init__(self, max_workers: int, timings: Optional[StepTimings] = None):
+        self.limiters = {
+            name: AIMDLimiter(name, max_workers)
+            for name in (RESOURCE_SSH, RESOURCE_MIRROR, RESOURCE_APISERVER)
+        }
+        self._timings = timings
+        self._baselines: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, key: str, resources: tuple[str, ...]) -> Iterator[None]:
+        """
+        佔用操作所需的所有資源名額，結束時依結果調整各資源上限
+
+        例外照常往外拋出；其訊息用來判斷是否為過載。
+
+        Args:
+            key: 用於比較耗時的操作鍵（步驟 ID）
+            resources: 操作使用的資源
+        """
+        # 固定順序取得，避免多個操作互相等待對方持有的名額
+        names = sorted(set(resources) | {RESOURCE_SSH})
+        tokens = {}
+        try:
+            for name in names:
+                tokens[name] = self.limiters[name].acquire()
+        except BaseException:
+            for name, token in tokens.items():
+                self.limiters[name].release(token, healthy=False, overloaded=False)
+            raise
+
+        started = time.monotonic()
+        overloaded: Optional[str] = None
+        healthy = False
+        try:
+            yield
+            healthy = self._observe(key, time.monotonic() - started)
+        except Exception as e:
+            overloaded = classify_overload(str(e))
+            raise
+        finally:
+            for name, token in tokens.items():
+                self.limiters[name].release(
+                    token, healthy=healthy, overloaded=overloaded == name
+                )
+
+    def snapshot(self) -> dict[str, int]:
+        """各資源目前的並行上限"""
+        return {name: limiter.limit for name, limiter in self.limiters.items()}
+
+    def _observe(self, key: str, duration: float) -> bool:
+        """記錄成功操作的耗時，回傳是否在正常範圍內"""
+        baseline = None
+        if self._timings is not None:
+            mean, count = self._timings.estimate(key)
+            if count:
+                baseline = mean
+        with self._lock:
+            observed = self._baselines.get(key)
+            if baseline is None:
+                baseline = observed
+            self._baselines[key] = (
+                duration
+                if observed is None
+                else (1 - LATENCY_SMOOTHING) * observed + LATENCY_SMOOTHING * duration
+            )
+        return baseline is None or duration <= baseline * LATENCY_TOLERANCE
@@ -8,7 +8,19 @@ from typing import Optional
 
 import yaml
 
-from models import NodeConnection, ClusterConfig
+from models import (
+    NodeConnection,
+    ClusterConfig,
+    KubeadmTuning,
+    CalicoSettings,
+    ContainerdSettings,
+)
+
+
+# 節點的字串型認證欄位
+AUTH_FIELDS = ("password", "key_file", "key_passphrase", "certificate_file", "sudo_password")
+# 節點的拓撲標籤
+TOPOLOGY_FIELDS = ("site", "zone", "rack")
 
 
 class ConfigLoadError(Exception):
@@ -99,6 +111,14 @@ def parse_cluster_config(data: dict) -> ClusterConfig:
     load_balancer_ip = data.get("load_balancer_ip")
     pod_network_cidr = data.get("pod_network_cidr", "192.168.0.0/16")
     metallb_ip_range = data.get("metallb_ip_range")
+    kubernetes_version = str(data.get("kubernetes_version", "1.29"))
+    site_limits = data.get("site_limits") or {}
+    if not isinstance(site_limits, dict):
+        raise ConfigValidationError("site_limits 必須是物件（站點: 上限）")
+    try:
+        site_limits = {str(site): int(limit) for site, limit in site_limits.items()}
+    except (TypeError, ValueError) as e:
+        raise ConfigValidationError(f"site_limits 的上限必須是整數：{e}") from e
 
     config = ClusterConfig(
         master_nodes=master_nodes,
@@ -106,6 +126,11 @@ def parse_cluster_config(data: dict) -> ClusterConfig:
         load_balancer_ip=load_balancer_ip,
         pod_network_cidr=pod_network_cidr,
         metallb_ip_range=metallb_ip_range,
+        kubernetes_version=kubernetes_version,
+        site_limits=site_limits,
+        tuning=parse_tuning(data.get("tuning")),
+        calico=parse_calico(data.get("calico")),
+        containerd=parse_containerd(data.get("containerd")),
     )
     
     # 驗證配置
@@ -118,6 +143,126 @@ def parse_cluster_config(data: dict) -> ClusterConfig:
     return config
 
 
+def parse_tuning(data: Optional[dict]) -> KubeadmTuning:
+    """
+    解析 kubeadm 效能調校參數
+
+    Raises:
+        ConfigValidationError: 格式錯誤或有未知的欄位
+    """
+    if not data:
+        return KubeadmTuning()
+    if not isinstance(data, dict):
+        raise ConfigValidationError("tuning 必須是物件")
+
+    fields = KubeadmTuning.__dataclass_fields__
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise ConfigValidationError(f"tuning 有未知的欄位：{', '.join(unknown)}")
+
+    values = {}
+    for name, value in data.items():
+        if value is None:
+            continue
+        if name == "proxy_mode":
+            values[name] = str(value)
+        elif name == "serialize_image_pulls":
+            if not isinstance(value, bool):
+                raise ConfigValidationError(f"tuning.{name} 必須是 true 或 false")
+            values[name] = value
+        else:
+            if isinstance(value, bool):
+                raise ConfigValidationError(f"tuning.{name} 必須是整數")
+            try:
+                values[name] = int(value)
+            except (TypeError, ValueError) as e:
+                raise ConfigValidationError(f"tuning.{name} 必須是整數：{value}") from e
+    return KubeadmTuning(**values)
+
+
+def parse_calico(data: Optional[dict]) -> CalicoSettings:
+    """
+    解析 Calico 網路設定
+
+    Raises:
+        ConfigValidationError: 格式錯誤或有未知的欄位
+    """
+    if not data:
+        return CalicoSettings()
+    if not isinstance(data, dict):
+        raise ConfigValidationError("calico 必須是物件")
+
+    fields = CalicoSettings.__dataclass_fields__
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise ConfigValidationError(f"calico 有未知的欄位：{', '.join(unknown)}")
+
+    values = {}
+    for name, value in data.items():
+        if value is None:
+            continue
+        if name == "mtu":
+            if isinstance(value, bool):
+                raise ConfigValidationError("calico.mtu 必須是整數")
+            try:
+                values[name] = int(value)
+            except (TypeError, ValueError) as e:
+                raise ConfigValidationError(f"calico.mtu 必須是整數：{value}") from e
+        else:
+            values[name] = str(value)
+    return CalicoSettings(**values)
+
+
+def parse_containerd(data: Optional[dict]) -> ContainerdSettings:
+    """
+    解析 containerd 設定
+
+    registry_mirrors 為 {registry: [鏡像 URL, ...]}，單一鏡像也可直接寫字串。
+
+    Raises:
+        ConfigValidationError: 格式錯誤或有未知的欄位
+    """
+    if not data:
+        return ContainerdSettings()
+    if not isinstance(data, dict):
+        raise ConfigValidationError("containerd 必須是物件")
+
+    fields = ContainerdSettings.__dataclass_fields__
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise ConfigValidationError(f"containerd 有未知的欄位：{', '.join(unknown)}")
+
+    values = {}
+    downloads = data.get("max_concurrent_downloads")
+    if downloads is not None:
+        if isinstance(downloads, bool):
+            raise ConfigValidationError("containerd.max_concurrent_downloads 必須是整數")
+        try:
+            values["max_concurrent_downloads"] = int(downloads)
+        except (TypeError, ValueError) as e:
+            raise ConfigValidationError(
+                f"containerd.max_concurrent_downloads 必須是整數：{downloads}"
+            ) from e
+    if data.get("snapshotter") is not None:
+        values["snapshotter"] = str(data["snapshotter"])
+
+    mirrors = data.get("registry_mirrors") or {}
+    if not isinstance(mirrors, dict):
+        raise ConfigValidationError("containerd.registry_mirrors 必須是物件（registry: 鏡像列表）")
+    parsed = []
+    for registry, urls in mirrors.items():
+        if isinstance(urls, str):
+            urls = [urls]
+        if not isinstance(urls, list):
+            raise ConfigValidationError(
+                f"containerd.registry_mirrors: {registry} 的鏡像必須是字串或列表"
+            )
+        parsed.append((str(registry), tuple(str(url).rstrip("/") for url in urls)))
+    if parsed:
+        values["registry_mirrors"] = tuple(parsed)
+    return ContainerdSettings(**values)
+
+
 def parse_node_connection(data: dict, field_name: str) -> NodeConnection:
     """
     解析節點連線資訊
@@ -135,7 +280,7 @@ def parse_node_connection(data: dict, field_name: str) -> NodeConnection:
     if not isinstance(data, dict):
         raise ConfigValidationError(f"{field_name} 必須是物件")
     
-    required_fields = ["host", "user", "password"]
+    required_fields = ["host", "user"]
     for field in required_fields:
         if field not in data:
             raise ConfigValidationError(f"{field_name} 缺少必要欄位：{field}")
@@ -144,41 +289,135 @@ def parse_node_connection(data: dict, field_name: str) -> NodeConnection:
         host=str(data["host"]),
         port=int(data.get("port", 22)),
         user=str(data["user"]),
-        password=str(data["password"]),
+        **_parse_auth_fields(data),
+        **_parse_topology_fields(data),
     )
 
 
-def save_cluster_config(config: ClusterConfig, config_path: str) -> None:
+def _parse_auth_fields(data: dict) -> dict:
+    """解析節點的認證欄位（password、key_file、certificate_file、use_agent、sudo_password）"""
+    fields = {"use_agent": bool(data.get("use_agent", False))}
+    for name in AUTH_FIELDS:
+        if data.get(name) is not None:
+            fields[name] = str(data[name])
+    for name in ("key_file", "certificate_file"):
+        if name in fields:
+            fields[name] = str(Path(fields[name]).expanduser())
+    return fields
+
+
+def _parse_topology_fields(data: dict) -> dict:
+    """解析節點的拓撲標籤（site、zone、rack）"""
+    return {
+        name: str(data[name])
+        for name in TOPOLOGY_FIELDS
+        if data.get(name) is not None
+    }
+
+
+def parse_skill_params(params: dict) -> ClusterConfig:
     """
-    將叢集配置儲存為 YAML 檔案
-    
+    將 skill-installer 框架收集的參數轉換為叢集配置
+
+    與設定檔不同，框架參數的 password 可省略（由框架另行處理）。
+
+    Args:
+        params: 結構對應 skill.yaml 定義的參數字典
+
+    Returns:
+        ClusterConfig 物件
+
+    Raises:
+        ValueError: 缺少 master_nodes 參數
+    """
+    master_data_list = params.get("master_nodes")
+    if not master_data_list and "control_plane" in params:
+        master_data_list = [params["control_plane"]]
+    if not master_data_list:
+        raise ValueError("缺少 master_nodes 參數")
+
+    masters = []
+    for m_data in master_data_list:
+        masters.append(NodeConnection(
+            host=m_data["host"],
+            port=m_data.get("port", 22),
+            user=m_data["user"],
+            **_parse_auth_fields(m_data),
+            **_parse_topology_fields(m_data),
+        ))
+
+    workers = []
+    for w_data in params.get("worker_nodes", params.get("workers", [])):
+        workers.append(NodeConnection(
+            host=w_data["host"],
+            port=w_data.get("port", 22),
+            user=w_data["user"],
+            **_parse_auth_fields(w_data),
+            **_parse_topology_fields(w_data),
+        ))
+
+    return ClusterConfig(
+        master_nodes=masters,
+        worker_nodes=workers,
+        load_balancer_ip=params.get("load_balancer_ip"),
+        pod_network_cidr=params.get("pod_network_cidr", "192.168.0.0/16"),
+        metallb_ip_range=params.get("metallb_ip_range"),
+        kubernetes_version=str(params.get("kubernetes_version", "1.29")),
+        site_limits={
+            str(site): int(limit)
+            for site, limit in (params.get("site_limits") or {}).items()
+        },
+        tuning=parse_tuning(params.get("tuning")),
+        calico=parse_calico(params.get("calico")),
+        containerd=parse_containerd(params.get("containerd")),
+    )
+
+
+def cluster_config_to_dict(config: ClusterConfig) -> dict:
+    """
+    將叢集配置轉換為字典（與設定檔格式相同）
+
     Args:
         config: ClusterConfig 物件
-        config_path: 儲存路徑
+
+    Returns:
+        可序列化為 YAML / JSON 的字典
     """
-    data = {
-        "master_nodes": [
-            {
-                "host": m.host,
-                "port": m.port,
-                "user": m.user,
-                "password": m.password,
-            }
-            for m in config.master_nodes
-        ],
-        "worker_nodes": [
-            {
-                "host": w.host,
-                "port": w.port,
-                "user": w.user,
-                "password": w.password,
-            }
-            for w in config.worker_nodes
-        ],
+    return {
+        "master_nodes": [_node_to_dict(m) for m in config.master_nodes],
+        "worker_nodes": [_node_to_dict(w) for w in config.worker_nodes],
         "load_balancer_ip": config.load_balancer_ip,
         "pod_network_cidr": config.pod_network_cidr,
         "metallb_ip_range": config.metallb_ip_range,
+        "kubernetes_version": config.kubernetes_version,
+        **({"site_limits": config.site_limits} if config.site_limits else {}),
+        **({"tuning": config.tuning.to_dict()} if config.tuning.to_dict() else {}),
+        **({"calico": config.calico.to_dict()} if config.calico.to_dict() else {}),
+        **({"containerd": config.containerd.to_dict()} if config.containerd.to_dict() else {}),
     }
+
+
+def _node_to_dict(node: NodeConnection) -> dict:
+    """節點連線資訊轉為字典（未設定的認證欄位省略）"""
+    data = {"host": node.host, "port": node.port, "user": node.user}
+    for name in AUTH_FIELDS:
+        if getattr(node, name):
+            data[name] = getattr(node, name)
+    if node.use_agent:
+        data["use_agent"] = True
+    data.update(node.topology())
+    return data
+
+
+def save_cluster_config(config: ClusterConfig, config_path: str) -> None:
+    """
+    將叢集配置儲存為 YAML 檔案
+    
+    Args:
+        config: ClusterConfig 物件
+        config_path: 儲存路徑
+    """
+    data = cluster_config_to_dict(config)
     
     with open(config_path, "w", encoding="utf-8") as f:
         yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
@@ -0,0 +1,81 @@
+"""
+containerd 設定產生
+
+依叢集配置產生 containerd 安裝腳本的參數：每個映像的 layer 下載並行數、
+snapshotter，以及每個 registry 的 hosts.toml（config_path 模式）。設定
+registry 鏡像（例如在跳板機或某個節點上的 pull-through registry）後，
+數百個節點的映像下載由鄰近的快取提供，鏡像無法使用時才回到上游 registry。
+"""
+from urllib.parse import urlparse
+
+from models import ContainerdSettings
+
+
+# 名稱與實際位址不同的上游 registry
+UPSTREAM_SERVERS = {"docker.io": "https://registry-1.docker.io"}
+
+# 未個別設定的 registry 共用的 hosts.toml 目錄名稱
+DEFAULT_REGISTRY = "_default"
+
+# TOML basic string 中有簡短寫法的跳脫字元
+TOML_ESCAPES = {
+    '"': '\\"',
+    "\\": "\\\\",
+    "\b": "\\b",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\f": "\\f",
+    "\r": "\\r",
+}
+
+
+def toml_string(value: str) -> str:
+    """將字串轉為 TOML basic string（含引號），控制字元以 \\uXXXX 表示"""
+    escaped = []
+    for c in value:
+        if c in TOML_ESCAPES:
+            escaped.append(TOML_ESCAPES[c])
+        elif ord(c) < 0x20 or ord(c) == 0x7f:
+            escaped.append(f"\\u{ord(c):04X}")
+        else:
+            escaped.append(c)
+    return '"' + "".join(escaped) + '"'
+
+
+def upstream_server(registry: str) -> str:
+    """registry 的上游位址"""
+    return UPSTREAM_SERVERS.get(registry, f"https://{registry}")
+
+
+def render_hosts_toml(registry: str, mirrors: tuple[str, ...]) -> str:
+    """
+    產生單一 registry 的 hosts.toml
+
+    鏡像依序嘗試，全部失敗時回到 server（_default 沒有上游）。鏡像 URL
+    帶有路徑時（例如 Harbor 的 proxy cache 專案 /v2/<project>）直接使用
+    該路徑。
+    """
+    lines = []
+    if registry != DEFAULT_REGISTRY:
+        lines.append(f"server = {toml_string(upstream_server(registry))}")
+    for url in mirrors:
+        lines.append("")
+        lines.append(f"[host.{toml_string(url)}]")
+        lines.append('  capabilities = ["pull", "resolve"]')
+        if urlparse(url).path not in ("", "/"):
+            lines.append("  override_path = true")
+    return "\n".join(lines).lstrip("\n")
+
+
+def containerd_script_params(settings: ContainerdSettings) -> tuple:
+    """
+    install_containerd 步驟的渲染參數（可雜湊）
+
+    Returns:
+        (max_concurrent_downloads, snapshotter, ((registry, hosts.toml), ...))
+    """
+    registry_hosts = tuple(
+        (registry, render_hosts_toml(registry, mirrors))
+        for registry, mirrors in settings.registry_mirrors
+    )
+    return (settings.max_concurrent_downloads, settings.snapshotter, registry_hosts)
@@ -0,0 +1,463 @@
+"""
+常駐服務模式
+
+以本機 Unix socket 提供服務，讓直譯器、已解析的叢集配置、節點 facts
+快取與 SSH 連線在多次呼叫之間保持溫熱。CLI 只作為輕量 client 傳送請求。
+
+通訊協定為 JSON lines：client 送出一行 {"op", "args"}，server 依序回傳
+零到多行 {"type": "event", ...}，最後以 {"type": "result", "data"} 或
+{"type": "error", "message", "error_type"} 結束。
+"""
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from state import get_state_dir
+
+
+# socket 路徑可透過環境變數覆寫
+DAEMON_SOCKET_ENV = "K8S_INSTALLER_SOCKET"
+# 設定後 CLI 與 run() 會將請求轉送給常駐服務
+DAEMON_USE_ENV = "K8S_INSTALLER_USE_DAEMON"
+
+# 背景啟動時等待服務就緒的時間（秒）
+DAEMON_START_TIMEOUT = 10
+
+EventCallback = Callable[[dict], None]
+
+
+class DaemonError(Exception):
+    """常駐服務請求錯誤"""
+
+    def __init__(self, message: str, error_type: str = ""):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def get_socket_path() -> Path:
+    """取得常駐服務 socket 路徑"""
+    override = os.environ.get(DAEMON_SOCKET_ENV)
+    if override:
+        return Path(override).expanduser()
+    return get_state_dir() / "daemon.sock"
+
+
+def daemon_requested() -> bool:
+    """環境變數是否要求使用常駐服務"""
+    return os.environ.get(DAEMON_USE_ENV, "").lower() in ("1", "true", "yes")
+
+
+class DaemonState:
+    """常駐服務在多次請求間保留的狀態"""
+
+    def __init__(self):
+        # 延遲匯入：只有實際啟動服務的行程才需要 paramiko
+        from facts import FactsCache
+        from ssh_client import ConnectionPool
+
+        self.pool = ConnectionPool()
+        self.facts = FactsCache()
+        self.started_at = time.time()
+        self.request_count = 0
+        self._configs: dict[str, tuple[int, int, object]] = {}
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        """累計處理的請求數（各連線在不同執行緒中處理）"""
+        with self._lock:
+            self.request_count += 1
+
+    def load_config(self, config_path: str):
+        """
+        載入叢集配置，檔案未變動時直接回傳已解析的結果
+
+        Raises:
+            ConfigLoadError: 檔案讀取或解析失敗
+            ConfigValidationError: 設定驗證失敗
+        """
+        from config_loader import load_cluster_config, ConfigLoadError
+
+        try:
+            st = os.stat(config_path)
+        except OSError as e:
+            raise ConfigLoadError(f"設定檔不存在：{config_path}") from e
+
+        with self._lock:
+            cached = self._configs.get(config_path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+
+        config = load_cluster_config(config_path)
+        with self._lock:
+            self._configs[config_path] = (st.st_mtime_ns, st.st_size, config)
+        return config
+
+    def resolve_config(self, args: dict):
+        """依請求參數取得叢集配置（config_path 或 params 擇一）"""
+        if args.get("config_path"):
+            return self.load_config(args["config_path"])
+
+        from config_loader import parse_skill_params
+
+        return parse_skill_params(args.get("params") or {})
+
+    def cached_config_count(self) -> int:
+        """已快取的叢集配置數量"""
+        with self._lock:
+            return len(self._configs)
+
+    def close(self) -> None:
+        """關閉所有保留的連線"""
+        self.pool.close_all()
+
+
+def _op_ping(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """回報服務狀態"""
+    state = server.state
+    return {
+        "pid": os.getpid(),
+        "uptime": round(time.time() - state.started_at, 1),
+        "requests": state.request_count,
+        "ssh_connections": len(state.pool),
+        "cached_configs": state.cached_config_count(),
+    }
+
+
+def _op_validate(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """驗證叢集配置並回傳摘要"""
+    return server.state.resolve_config(args).summary()
+
+
+def _op_facts(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """收集（或從快取取得）所有節點的 facts"""
+    from facts import collect_cluster_facts
+
+    state = server.state
+    config = state.resolve_config(args)
+    nodes = collect_cluster_facts(
+        config.all_nodes(),
+        state.pool,
+        state.facts,
+        refresh=bool(args.get("refresh")),
+    )
+    return {"nodes": nodes}
+
+
+def _op_preflight(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """並行前置檢查，收集到的 facts 同時寫入快取"""
+    from parallel import DEFAULT_MAX_WORKERS
+    from preflight import run_preflight
+
+    state = server.state
+    report = run_preflight(
+        state.resolve_config(args),
+        state.pool,
+        max_workers=int(args.get("max_workers") or DEFAULT_MAX_WORKERS),
+        facts_cache=state.facts,
+        etcd_disk_check=bool(args.get("etcd_disk_check")),
+    )
+    return report.to_dict()
+
+
+def _op_status(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """查詢叢集健康狀態（重用常駐連線）"""
+    from parallel import DEFAULT_MAX_WORKERS
+    from status import collect_cluster_status
+
+    state = server.state
+    return collect_cluster_status(
+        state.resolve_config(args),
+        state.pool,
+        max_workers=int(args.get("max_workers") or DEFAULT_MAX_WORKERS),
+    ).to_dict()
+
+
+def _op_install(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """執行安裝，進度以事件串流回傳"""
+    from installer import run_installation
+
+    state = server.state
+    config = state.resolve_config(args)
+
+    def progress(step_name: str, node: str, status: str) -> None:
+        emit({"event": "progress", "step": step_name, "node": node, "status": status})
+
+    result = run_installation(
+        config,
+        pool=state.pool,
+        progress=progress,
+        facts_cache=state.facts,
+        **(args.get("options") or {}),
+    )
+    # 節點狀態已改變，捨棄舊的 facts
+    state.facts.invalidate()
+    return result.to_dict()
+
+
+def _op_add_nodes(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """將新節點加入既有叢集，進度以事件串流回傳"""
+    from applied_state import resolve_new_nodes
+    from installer import run_add_nodes
+
+    state = server.state
+    config = state.resolve_config(args)
+    nodes = resolve_new_nodes(config, args.get("hosts"))
+    if not nodes:
+        return {"success": True, "message": "沒有需要加入的新節點"}
+
+    def progress(step_name: str, node: str, status: str) -> None:
+        emit({"event": "progress", "step": step_name, "node": node, "status": status})
+
+    result = run_add_nodes(
+        config,
+        nodes,
+        pool=state.pool,
+        progress=progress,
+        facts_cache=state.facts,
+        **(args.get("options") or {}),
+    )
+    state.facts.invalidate()
+    return result.to_dict()
+
+
+def _op_reconcile(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """依最新的套用狀態調和叢集，進度以事件串流回傳"""
+    from installer import run_reconcile
+    from reconcile import plan_for_config
+
+    state = server.state
+    config = state.resolve_config(args)
+    plan = plan_for_config(config)
+    if plan.is_empty:
+        return {"success": True, "message": "叢集已符合目前配置"}
+
+    def progress(step_name: str, node: str, status: str) -> None:
+        emit({"event": "progress", "step": step_name, "node": node, "status": status})
+
+    result = run_reconcile(
+        config,
+        plan,
+        pool=state.pool,
+        progress=progress,
+        facts_cache=state.facts,
+        **(args.get("options") or {}),
+    )
+    state.facts.invalidate()
+    return result.to_dict()
+
+
+def _op_forget_host_keys(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """移除主機金鑰記錄（服務與 CLI 共用同一份記錄檔）"""
+    from host_keys import get_host_key_store
+
+    return {"removed": get_host_key_store().forget(list(args.get("keys") or []))}
+
+
+def _op_shutdown(server: "DaemonServer", args: dict, emit: EventCallback) -> dict:
+    """停止服務（在回覆送出後才關閉）"""
+    threading.Thread(target=server.shutdown, daemon=True).start()
+    return {"stopping": True}
+
+
+OPERATIONS: dict[str, Callable[["DaemonServer", dict, EventCallback], dict]] = {
+    "ping": _op_ping,
+    "validate": _op_validate,
+    "facts": _op_facts,
+    "preflight": _op_preflight,
+    "status": _op_status,
+    "install": _op_install,
+    "add_nodes": _op_add_nodes,
+    "reconcile": _op_reconcile,
+    "forget_host_keys": _op_forget_host_keys,
+    "shutdown": _op_shutdown,
+}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """處理單一連線上的一個請求"""
+
+    def handle(self) -> None:
+        self._write_lock = threading.Lock()
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+            op = OPERATIONS.get(request.get("op"))
+            if op is None:
+                raise DaemonError(f"不支援的操作：{request.get('op')}")
+            self.server.state.count_request()
+            data = op(self.server, request.get("args") or {}, self._emit)
+            self._send({"type": "result", "data": data})
+        except Exception as e:
+            error_type = getattr(e, "error_type", "") or type(e).__name__
+            self._send({"type": "error", "message": str(e), "error_type": error_type})
+
+    def _emit(self, event: dict) -> None:
+        self._send({"type": "event", **event})
+
+    def _send(self, message: dict) -> None:
+        payload = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+        # 安裝過程可能從多個執行緒回報進度
+        with self._write_lock:
+            try:
+                self.wfile.write(payload)
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # client 已離開，請求仍繼續執行完畢
+                pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """常駐服務（每個請求一個執行緒）"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = socket_path
+        _remove_stale_socket(socket_path)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        # 請求內容可能包含 SSH 密碼，socket 建立時即僅允許擁有者連線
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.state = DaemonState()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.state.close()
+        try:
+            self.socket_path.unlink()
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    """
+    移除殘留的 socket 檔
+
+    Raises:
+        DaemonError: 已有服務在此 socket 上執行
+    """
+    if not socket_path.exists():
+        return
+    if DaemonClient(socket_path).is_running():
+        raise DaemonError(f"常駐服務已在執行：{socket_path}")
+    socket_path.unlink()
+
+
+class DaemonClient:
+    """常駐服務的輕量 client"""
+
+    def __init__(self, socket_path: Optional[Path] = None):
+        self.socket_path = socket_path or get_socket_path()
+
+    def is_running(self) -> bool:
+        """服務是否可連線"""
+        try:
+            self.request("ping")
+            return True
+        except DaemonError:
+            return False
+
+    def request(
+        self,
+        op: str,
+        args: Optional[dict] = None,
+        on_event: Optional[EventCallback] = None,
+    ):
+        """
+        送出請求並等待結果
+
+        Args:
+            op: 操作名稱
+            args: 操作參數
+            on_event: 收到事件（例如進度）時的回呼
+
+        Returns:
+            操作結果資料
+
+        Raises:
+            DaemonError: 無法連線或操作失敗
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError as e:
+            sock.close()
+            raise DaemonError(f"無法連線常駐服務：{self.socket_path}") from e
+
+        with sock, sock.makefile("rwb") as stream:
+            request = {"op": op, "args": args or {}}
+            stream.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            stream.flush()
+
+            for line in stream:
+                message = json.loads(line)
+                if message["type"] == "event":
+                    if on_event:
+                        on_event(message)
+                elif message["type"] == "result":
+                    return message["data"]
+                else:
+                    raise DaemonError(message["message"], message.get("error_type", ""))
+
+        raise DaemonError("常駐服務未回傳結果即中斷連線")
+
+
+def serve(socket_path: Optional[Path] = None) -> None:
+    """在前景執行常駐服務，直到收到 shutdown 請求或中斷"""
+    server = DaemonServer(socket_path or get_socket_path())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def start_background(socket_path: Optional[Path] = None) -> int:
+    """
+    在背景啟動常駐服務並等待就緒
+
+    Returns:
+        服務行程 PID
+
+    Raises:
+        DaemonError: 服務已在執行或啟動逾時
+    """
+    socket_path = socket_path or get_socket_path()
+    client = DaemonClient(socket_path)
+    if client.is_running():
+        raise DaemonError(f"常駐服務已在執行：{socket_path}")
+
+    log_path = socket_path.with_suffix(".log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, **{DAEMON_SOCKET_ENV: str(socket_path)})
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).parent / "main.py"),
+             "daemon", "start", "--foreground"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=env,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise DaemonError(f"常駐服務啟動失敗，請查看 {log_path}")
+        if client.is_running():
+            return proc.pid
+        time.sleep(0.1)
+    raise DaemonError(f"常駐服務啟動逾時，請查看 {log_path}")
@@ -0,0 +1,153 @@
+"""
+診斷資料收集
+
+安裝失敗時（或以 diagnose 命令手動執行）並行向相關節點收集日誌：
+每個節點在遠端壓縮後經由連線池既有的連線串流回來，最後合併成單一
+本機壓縮檔（每個節點一個目錄，另附 summary.json）。
+"""
+import io
+import json
+import tarfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from commands import get_collect_diagnostics_script
+from models import DiagnosticsBundle, InstallationStep, NodeConnection, StepStatus
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from ssh_client import ConnectionPool, SSHCommandError
+from state import get_state_dir
+
+
+# 預設收集最近幾分鐘的 journal
+DEFAULT_SINCE_MINUTES = 60
+# 每個日誌檔最多保留的行數
+DEFAULT_MAX_LINES = 5000
+# 單一節點壓縮後的大小上限
+MAX_NODE_BUNDLE_BYTES = 50 * 1024 * 1024
+
+
+def get_diagnostics_dir() -> Path:
+    """取得診斷壓縮檔的預設存放目錄"""
+    return get_state_dir() / "diagnostics"
+
+
+def fetch_node_bundle(
+    pool: ConnectionPool,
+    node: NodeConnection,
+    since_minutes: int = DEFAULT_SINCE_MINUTES,
+    max_lines: int = DEFAULT_MAX_LINES,
+) -> dict[str, bytes]:
+    """
+    在節點上收集並壓縮日誌，串流傳回後展開
+
+    Returns:
+        {檔名: 內容}
+
+    Raises:
+        SSHConnectionError: 連線失敗
+        SSHCommandError: 收集失敗或超過大小上限
+    """
+    buffer = io.BytesIO()
+    written, stderr, exit_code = pool.get(node).execute_streaming(
+        get_collect_diagnostics_script(since_minutes, max_lines),
+        buffer,
+        limit=MAX_NODE_BUNDLE_BYTES,
+    )
+    if exit_code != 0 or written == 0:
+        raise SSHCommandError(f"[{node}] 診斷資料收集失敗：{stderr.strip() or exit_code}")
+
+    files = {}
+    buffer.seek(0)
+    try:
+        with tarfile.open(fileobj=buffer, mode="r:gz") as node_tar:
+            for member in node_tar.getmembers():
+                if member.isfile():
+                    files[Path(member.name).name] = node_tar.extractfile(member).read()
+    except (tarfile.TarError, EOFError, OSError) as e:
+        raise SSHCommandError(f"[{node}] 診斷資料壓縮檔損毀：{e}") from e
+    return files
+
+
+def collect_diagnostics(
+    nodes: list[NodeConnection],
+    pool: ConnectionPool,
+    output: Optional[Path] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    since_minutes: int = DEFAULT_SINCE_MINUTES,
+    max_lines: int = DEFAULT_MAX_LINES,
+    steps: Optional[list[InstallationStep]] = None,
+) -> DiagnosticsBundle:
+    """
+    並行收集節點診斷資料並寫成單一壓縮檔
+
+    單一節點失敗只會記錄在 summary.json 與回傳結果中。
+
+    Args:
+        nodes: 目標節點
+        pool: SSH 連線池
+        output: 壓縮檔路徑，預設寫入狀態目錄的 diagnostics/
+        max_workers: 同時收集的節點數上限
+        since_minutes: 收集最近幾分鐘的 journal
+        max_lines: 每個日誌檔最多保留的行數
+        steps: 失敗的安裝步驟（寫入 summary.json 供對照）
+
+    Returns:
+        DiagnosticsBundle；所有節點都失敗時 path 為 None
+    """
+    started = time.monotonic()
+    outcomes = run_on_nodes(
+        nodes,
+        lambda node: fetch_node_bundle(pool, node, since_minutes, max_lines),
+        max_workers=max_workers,
+    )
+
+    bundle = DiagnosticsBundle()
+    for outcome in outcomes:
+        if outcome.ok:
+            bundle.collected[str(outcome.node)] = sum(len(d) for d in outcome.result.values())
+        else:
+            bundle.failed[str(outcome.node)] = str(outcome.error)
+
+    if bundle.collected:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = output or get_diagnostics_dir() / f"diagnostics-{stamp}.tar.gz"
+        summary = {
+            "created_at": stamp,
+            "since_minutes": since_minutes,
+            "collected": bundle.collected,
+            "failed": bundle.failed,
+            "failed_steps": [
+                {"name": s.name, "node": s.node, "error": s.error}
+                for s in steps or []
+                if s.status == StepStatus.FAILED
+            ],
+        }
+        _write_archive(path, outcomes, summary)
+        bundle.path = str(path)
+
+    bundle.duration = time.monotonic() - started
+    return bundle
+
+
+def _write_archive(path: Path, outcomes: list, summary: dict) -> None:
+    """將各節點的檔案放在以節點命名的目錄下，合併為單一壓縮檔"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, "w:gz") as archive:
+        data = json.dumps(summary, ensure_ascii=False, indent=2).encode("utf-8")
+        _add_bytes(archive, "summary.json", data)
+
+        for outcome in outcomes:
+            if not outcome.ok:
+                continue
+            prefix = f"{outcome.node.host}_{outcome.node.port}"
+            for name, content in sorted(outcome.result.items()):
+                _add_bytes(archive, f"{prefix}/{name}", content)
+
+
+def _add_bytes(archive: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
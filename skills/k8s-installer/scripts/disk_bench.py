@@ -0,0 +1,160 @@
+"""
+etcd 磁碟延遲量測
+
+etcd 每次寫入 WAL 都會 fdatasync，磁碟的 fsync 延遲直接決定 etcd 的
+寫入延遲與 leader 選舉的穩定性。在建立 Control Plane 之前，於每個
+Master 的 etcd 資料目錄以與 WAL 相同的模式（2300 bytes 循序寫入，
+每次寫入後 fdatasync）量測延遲，p99 與 etcd 建議值比較。
+"""
+from typing import Optional
+
+from models import CheckStatus, DiskLatency, NodeConnection, PreflightCheck
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from ssh_client import ConnectionPool, SSHCommandError, SSHConnectionError
+
+
+# 量測目錄（kubeadm 預設的 etcd 資料目錄，量測後不留下檔案）
+ETCD_DATA_DIR = "/var/lib/etcd"
+# 每次寫入的大小（與 etcd 文件中 fio 量測的 --bs 相同）
+WRITE_SIZE = 2300
+# 寫入次數與時間上限（秒），慢速磁碟提早結束
+BENCHMARK_WRITES = 1000
+BENCHMARK_SECONDS = 15
+
+# etcd 建議 fdatasync p99 低於 10ms；超過 50ms 時 heartbeat 容易逾時
+FSYNC_P99_RECOMMENDED_MS = 10.0
+FSYNC_P99_MAX_MS = 50.0
+
+DISK_BENCHMARK_SCRIPT = f"""
+# etcd 要求資料目錄為 0700，先以相同權限建立，避免 kubeadm 沿用較寬的權限
+mkdir -p -m 0700 {ETCD_DATA_DIR}
+PY=$(command -v python3 || command -v /usr/libexec/platform-python)
+if [ -z "$PY" ]; then
+  echo "找不到 python3，無法量測磁碟延遲" >&2
+  exit 1
+fi
+"$PY" - {ETCD_DATA_DIR} <<'EOF'
+import os, sys, time
+path = os.path.join(sys.argv[1], ".k8s-installer-fsync-bench")
+block = b"\\0" * {WRITE_SIZE}
+latencies = []
+deadline = time.monotonic() + {BENCHMARK_SECONDS}
+fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+try:
+    for _ in range({BENCHMARK_WRITES}):
+        os.write(fd, block)
+        started = time.perf_counter()
+        os.fdatasync(fd)
+        latencies.append(time.perf_counter() - started)
+        if time.monotonic() > deadline:
+            break
+finally:
+    os.close(fd)
+    os.unlink(path)
+latencies.sort()
+def percentile(p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+print("samples=%d" % len(latencies))
+print("p50_ms=%.3f" % percentile(0.50))
+print("p99_ms=%.3f" % percentile(0.99))
+EOF
+""".strip()
+
+
+def parse_benchmark(node: str, stdout: str) -> DiskLatency:
+    """解析量測腳本的 key=value 輸出"""
+    values = {}
+    for line in stdout.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            values[key.strip()] = value.strip()
+    try:
+        return DiskLatency(
+            node=node,
+            samples=int(values["samples"]),
+            p50_ms=float(values["p50_ms"]),
+            p99_ms=float(values["p99_ms"]),
+        )
+    except (KeyError, ValueError):
+        return DiskLatency(node=node, error=f"無法解析量測結果：{stdout.strip()}")
+
+
+def measure_fsync_latency(pool: ConnectionPool, node: NodeConnection) -> DiskLatency:
+    """
+    在單一節點量測 fdatasync 延遲
+
+    連線或執行失敗時記錄於 error 欄位，不拋出例外。
+    """
+    try:
+        stdout, stderr, exit_code = pool.get(node).execute(DISK_BENCHMARK_SCRIPT)
+    except (SSHConnectionError, SSHCommandError) as e:
+        return DiskLatency(node=str(node), error=str(e))
+    if exit_code != 0:
+        return DiskLatency(node=str(node), error=stderr.strip() or "量測腳本執行失敗")
+    return parse_benchmark(str(node), stdout)
+
+
+def measure_masters(
+    masters: list[NodeConnection],
+    pool: ConnectionPool,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[DiskLatency]:
+    """
+    並行量測所有 Master
+
+    Returns:
+        與 masters 相同順序的量測結果
+    """
+    outcomes = run_on_nodes(
+        masters,
+        lambda node: measure_fsync_latency(pool, node),
+        max_workers=max_workers,
+    )
+    results = []
+    for outcome in outcomes:
+        if not outcome.ok:
+            raise outcome.error
+        results.append(outcome.result)
+    return results
+
+
+def latency_check(latency: DiskLatency) -> PreflightCheck:
+    """依 etcd 建議值判斷量測結果"""
+    name = "etcd 磁碟"
+    if latency.error is not None or latency.p99_ms is None:
+        return PreflightCheck(name, CheckStatus.WARN, f"無法量測：{latency.error}")
+    message = (
+        f"fdatasync p99 {latency.p99_ms:.1f} ms、p50 {latency.p50_ms:.1f} ms"
+        f"（{latency.samples} 次）"
+    )
+    if latency.p99_ms > FSYNC_P99_MAX_MS:
+        return PreflightCheck(
+            name,
+            CheckStatus.FAIL,
+            f"{message}，超過 {FSYNC_P99_MAX_MS:.0f} ms，etcd 會頻繁逾時",
+        )
+    if latency.p99_ms > FSYNC_P99_RECOMMENDED_MS:
+        return PreflightCheck(
+            name,
+            CheckStatus.WARN,
+            f"{message}，高於 etcd 建議的 {FSYNC_P99_RECOMMENDED_MS:.0f} ms",
+        )
+    return PreflightCheck(name, CheckStatus.PASS, message)
+
+
+def fastest_first(
+    masters: list[NodeConnection],
+    latencies: list[DiskLatency],
+) -> list[NodeConnection]:
+    """
+    依 p99 延遲排序 Master（無法量測的排在最後，延遲相同時維持原順序）
+
+    Args:
+        masters: Master 節點
+        latencies: measure_masters 的結果（與 masters 相同順序）
+    """
+    def key(pair: tuple[NodeConnection, DiskLatency]) -> tuple[bool, float]:
+        p99: Optional[float] = pair[1].p99_ms
+        return (p99 is None, p99 or 0.0)
+
+    return [node for node, _ in sorted(zip(masters, latencies), key=key)]
@@ -0,0 +1,102 @@
+"""
+非 root 使用者的權限提升
+
+SSH 使用者不是 root 時，每個節點只以 sudo 開啟一次提升權限的 session
+（常駐 bash 或 agent），所有步驟都在其中執行，不必每個命令各自經過一次
+sudo 與 PAM 認證。有設定密碼時以 sudo -S 從 stdin 送出一次，否則使用
+sudo -n（需為免密碼 sudo）。
+"""
+import select
+import shlex
+import time
+import uuid
+from typing import Optional
+
+from paramiko import Channel, Transport
+from paramiko.ssh_exception import SSHException
+
+
+# 等待 sudo 認證完成的上限（秒）
+ELEVATION_TIMEOUT = 30
+
+RECV_SIZE = 4096
+
+
+class ElevationError(Exception):
+    """無法以 sudo 取得 root 權限"""
+    pass
+
+
+def sudo_command(command: str, password: Optional[str], ready: str, prompt: str) -> str:
+    """
+    以 sudo 包裝命令：認證成功後先在 stdout 印出 ready 標記再 exec 原命令
+
+    sudo 是否詢問密碼無法事先得知（可能為免密碼或仍在快取期內），
+    因此以唯一的提示字串判斷何時該送出密碼，以 ready 標記判斷認證完成。
+    """
+    inner = shlex.quote(f"printf '%s\\n' '{ready}'; exec {command}")
+    if password:
+        return f"sudo -S -p '{prompt}' bash --noprofile --norc -c {inner}"
+    return f"sudo -n bash --noprofile --norc -c {inner}"
+
+
+def open_elevated_channel(
+    transport: Transport,
+    command: str,
+    password: Optional[str] = None,
+    timeout: float = ELEVATION_TIMEOUT,
+) -> Channel:
+    """
+    開啟以 root 執行 command 的 channel
+
+    回傳時 sudo 已認證完成，ready 標記與密碼提示都已讀出，之後 channel
+    的 stdin / stdout 直接屬於 command。
+
+    Raises:
+        ElevationError: 密碼錯誤、使用者無 sudo 權限、需要 tty 或逾時
+    """
+    token = uuid.uuid4().hex
+    ready = f"__K8S_ROOT_{token}__"
+    prompt = f"__K8S_SUDO_{token}__"
+    try:
+        channel = transport.open_session()
+        channel.exec_command(sudo_command(command, password, ready, prompt))
+    except SSHException as e:
+        raise ElevationError(f"無法開啟 sudo session：{e}") from e
+
+    out, err = bytearray(), bytearray()
+    ready_line = f"{ready}\n".encode("ascii")
+    prompt_bytes = prompt.encode("ascii")
+    password_sent = False
+    deadline = time.monotonic() + timeout
+    try:
+        while ready_line not in out:
+            prompts = err.count(prompt_bytes)
+            if prompts > 1:
+                raise ElevationError("sudo 密碼錯誤（sudo_password 或 password）")
+            if prompts == 1 and not password_sent:
+                channel.sendall(f"{password}\n".encode("utf-8"))
+                password_sent = True
+
+            if channel.recv_ready():
+                out += channel.recv(RECV_SIZE)
+            elif channel.recv_stderr_ready():
+                err += channel.recv_stderr(RECV_SIZE)
+            elif channel.exit_status_ready() or channel.closed:
+                while channel.recv_stderr_ready():
+                    err += channel.recv_stderr(RECV_SIZE)
+                message = err.replace(prompt_bytes, b"").decode("utf-8", errors="replace")
+                raise ElevationError(
+                    f"sudo 失敗：{message.strip()[-300:] or channel.recv_exit_status()}"
+                )
+            elif time.monotonic() > deadline:
+                raise ElevationError(f"sudo 認證在 {timeout} 秒內未完成")
+            else:
+                select.select([channel], [], [], 0.5)
+    except ElevationError:
+        channel.close()
+        raise
+    except (OSError, SSHException) as e:
+        channel.close()
+        raise ElevationError(f"sudo session 中斷：{e}") from e
+    return channel
@@ -0,0 +1,160 @@
+"""
+節點資訊（facts）收集
+
+以單一 SSH 命令收集節點的作業系統、CPU、記憶體與網路資訊，並提供
+具有效期限的快取，讓常駐模式下重複的操作不必再次收集。
+"""
+import threading
+import time
+from typing import Optional
+
+from host_keys import scan_host_keys
+from models import NodeConnection
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from ssh_client import ConnectionPool, SSHConnectionError, SSHCommandError
+
+
+# facts 快取有效時間（秒）
+FACTS_TTL = 600
+
+FACTS_SCRIPT = """
+. /etc/os-release 2>/dev/null
+DEFAULT_IFACE=$(ip -o route show default 2>/dev/null | awk '{print $5; exit}')
+echo "hostname=$(hostname)"
+echo "os_id=${ID}"
+echo "os_version=${VERSION_ID}"
+echo "kernel=$(uname -r)"
+echo "arch=$(uname -m)"
+echo "cpus=$(nproc)"
+echo "memory_kb=$(awk '/^MemTotal:/ {print $2}' /proc/meminfo)"
+echo "default_iface=${DEFAULT_IFACE}"
+echo "mtu=$(cat /sys/class/net/${DEFAULT_IFACE}/mtu 2>/dev/null)"
+""".strip()
+
+# 需要轉換為整數的欄位
+INT_FACTS = ("cpus", "memory_kb", "mtu")
+
+
+def parse_facts(stdout: str) -> dict:
+    """
+    解析 facts 腳本輸出
+
+    Args:
+        stdout: key=value 格式的輸出
+
+    Returns:
+        facts 字典（無法轉換的數值欄位為 None）
+    """
+    facts = {}
+    for line in stdout.splitlines():
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        facts[key.strip()] = value.strip()
+
+    for key in INT_FACTS:
+        try:
+            facts[key] = int(facts.get(key, ""))
+        except ValueError:
+            facts[key] = None
+    return facts
+
+
+def gather_facts(pool: ConnectionPool, node: NodeConnection) -> dict:
+    """
+    收集單一節點的 facts
+
+    Raises:
+        SSHConnectionError: 連線失敗
+        SSHCommandError: 命令執行失敗
+    """
+    stdout, stderr, exit_code = pool.get(node).execute(FACTS_SCRIPT)
+    if exit_code != 0:
+        raise SSHCommandError(f"[{node}] 無法收集節點資訊：{stderr}")
+    return parse_facts(stdout)
+
+
+class FactsCache:
+    """具有效期限的節點 facts 快取（執行緒安全）"""
+
+    def __init__(self, ttl: float = FACTS_TTL):
+        self.ttl = ttl
+        self._entries: dict[tuple, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        pool: ConnectionPool,
+        node: NodeConnection,
+        refresh: bool = False,
+    ) -> dict:
+        """
+        取得節點 facts，快取過期或指定 refresh 時重新收集
+
+        Args:
+            pool: SSH 連線池
+            node: 目標節點
+            refresh: 是否強制重新收集
+        """
+        if not refresh:
+            cached = self.peek(node)
+            if cached is not None:
+                return cached
+
+        facts = gather_facts(pool, node)
+        self.put(node, facts)
+        return facts
+
+    def put(self, node: NodeConnection, facts: dict) -> None:
+        """寫入由其他流程（例如前置檢查）收集到的 facts"""
+        with self._lock:
+            self._entries[(node.host, node.port)] = (time.monotonic(), facts)
+
+    def peek(self, node: NodeConnection) -> Optional[dict]:
+        """取得未過期的快取內容，不觸發收集"""
+        with self._lock:
+            entry = self._entries.get((node.host, node.port))
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def invalidate(self, node: Optional[NodeConnection] = None) -> None:
+        """清除單一節點或全部的快取"""
+        with self._lock:
+            if node is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((node.host, node.port), None)
+
+
+def collect_cluster_facts(
+    nodes: list[NodeConnection],
+    pool: ConnectionPool,
+    cache: FactsCache,
+    refresh: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[dict]:
+    """
+    並行收集多個節點的 facts
+
+    單一節點失敗不影響其他節點，錯誤記錄於該節點結果的 error 欄位。
+
+    Returns:
+        每個節點一筆 {"node", "facts"} 或 {"node", "error"}
+    """
+    scan_host_keys(nodes, max_workers)
+    outcomes = run_on_nodes(
+        nodes,
+        lambda node: cache.get(pool, node, refresh=refresh),
+        max_workers=max_workers,
+    )
+
+    results = []
+    for outcome in outcomes:
+        if outcome.ok:
+            results.append({"node": str(outcome.node), "facts": outcome.result})
+        elif isinstance(outcome.error, (SSHConnectionError, SSHCommandError)):
+            results.append({"node": str(outcome.node), "error": str(outcome.error)})
+        else:
+            raise outcome.error
+    return results
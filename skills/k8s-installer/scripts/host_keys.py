@@ -0,0 +1,208 @@
+"""
+SSH 主機金鑰管理
+
+第一次接觸節點時並行掃描其主機金鑰並記錄（trust on first use），之後
+每次連線都必須與記錄一致，金鑰變更即拒絕連線。記錄檔在每個行程只讀取
+一次，所有連線共用同一份記憶體中的對照表，大量並行連線時不需反覆讀取
+known_hosts。
+"""
+import base64
+import hashlib
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from paramiko import MissingHostKeyPolicy, PKey, Transport
+from paramiko.ssh_exception import SSHException
+
+from models import NodeConnection
+from parallel import DEFAULT_MAX_WORKERS, NodeOutcome, run_on_nodes
+from state import get_state_dir, load_json_state, save_json_state
+
+
+# 掃描主機金鑰時的連線逾時（秒）
+SCAN_TIMEOUT = 10
+
+# 掃描結果
+SCAN_PINNED = "pinned"
+SCAN_KNOWN = "known"
+
+
+class HostKeyError(Exception):
+    """主機金鑰與記錄不符"""
+    pass
+
+
+def get_host_keys_path() -> Path:
+    """取得主機金鑰記錄檔路徑"""
+    return get_state_dir() / "known-hosts.json"
+
+
+def fingerprint(key: PKey) -> str:
+    """OpenSSH 格式的 SHA256 指紋"""
+    digest = hashlib.sha256(key.asbytes()).digest()
+    return "SHA256:" + base64.b64encode(digest).decode("ascii").rstrip("=")
+
+
+class HostKeyStore:
+    """
+    已記錄的主機金鑰（以 host:port 為鍵）
+
+    記錄檔只在建立時讀取一次；執行緒安全。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_host_keys_path()
+        data = load_json_state(self.path)
+        self._keys: dict[str, dict] = data if isinstance(data, dict) else {}
+        self._lock = threading.Lock()
+
+    def lookup(self, node: NodeConnection) -> Optional[dict]:
+        """取得節點的金鑰記錄（type、key、fingerprint、pinned_at）"""
+        with self._lock:
+            return self._keys.get(node.key())
+
+    def is_known(self, node: NodeConnection) -> bool:
+        return self.lookup(node) is not None
+
+    def verify(self, node: NodeConnection, key: PKey, save: bool = True) -> bool:
+        """
+        驗證節點提供的主機金鑰，未記錄過則記錄
+
+        Args:
+            node: 節點
+            key: 節點提供的主機金鑰
+            save: 新記錄時是否立即寫回檔案（批次掃描時最後一次寫入）
+
+        Returns:
+            是否為新記錄的金鑰
+
+        Raises:
+            HostKeyError: 與已記錄的金鑰不符
+        """
+        with self._lock:
+            entry = self._keys.get(node.key())
+            if entry is not None:
+                if entry["type"] != key.get_name() or entry["key"] != key.get_base64():
+                    raise HostKeyError(
+                        f"{node.key()} 的主機金鑰與記錄不符"
+                        f"（記錄 {entry['fingerprint']}，收到 {fingerprint(key)}）；"
+                        "若節點確實已重新安裝，請執行 host-keys forget 後重試"
+                    )
+                return False
+
+            self._keys[node.key()] = {
+                "type": key.get_name(),
+                "key": key.get_base64(),
+                "fingerprint": fingerprint(key),
+                "pinned_at": time.time(),
+            }
+            if save:
+                save_json_state(self.path, self._keys)
+            return True
+
+    def forget(self, keys: list[str]) -> list[str]:
+        """
+        移除主機金鑰記錄
+
+        Args:
+            keys: host:port 列表
+
+        Returns:
+            實際移除的項目
+        """
+        with self._lock:
+            removed = [key for key in keys if self._keys.pop(key, None) is not None]
+            if removed:
+                save_json_state(self.path, self._keys)
+            return removed
+
+    def save(self) -> bool:
+        with self._lock:
+            return save_json_state(self.path, self._keys)
+
+
+_store: Optional[HostKeyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_host_key_store() -> HostKeyStore:
+    """取得行程共用的主機金鑰記錄（第一次呼叫時讀取檔案）"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HostKeyStore()
+        return _store
+
+
+class PinningPolicy(MissingHostKeyPolicy):
+    """
+    以 HostKeyStore 驗證主機金鑰的 paramiko policy
+
+    SSHClient 不載入任何 known_hosts，因此每次連線都會交由此 policy
+    比對共用的記憶體對照表。
+    """
+
+    def __init__(self, store: HostKeyStore, node: NodeConnection):
+        self.store = store
+        self.node = node
+
+    def missing_host_key(self, client, hostname: str, key: PKey) -> None:
+        self.store.verify(self.node, key)
+
+
+def fetch_host_key(node: NodeConnection) -> PKey:
+    """
+    只完成 SSH 金鑰交換並取得節點的主機金鑰（不認證）
+
+    Raises:
+        OSError: 無法連線
+        SSHException: SSH 協定錯誤
+    """
+    sock = socket.create_connection((node.host, node.port), timeout=SCAN_TIMEOUT)
+    transport = Transport(sock)
+    try:
+        transport.banner_timeout = SCAN_TIMEOUT
+        transport.start_client(timeout=SCAN_TIMEOUT)
+        return transport.get_remote_server_key()
+    finally:
+        transport.close()
+
+
+def scan_host_keys(
+    nodes: list[NodeConnection],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    store: Optional[HostKeyStore] = None,
+) -> list[NodeOutcome[str]]:
+    """
+    並行掃描尚未記錄的節點主機金鑰並記錄
+
+    已記錄的節點不會連線；新金鑰在全部掃描完成後一次寫回檔案。
+
+    Args:
+        nodes: 目標節點
+        max_workers: 同時掃描的節點數上限
+        store: 主機金鑰記錄，預設為行程共用的記錄
+
+    Returns:
+        每個節點的結果（SCAN_PINNED / SCAN_KNOWN 或錯誤）
+    """
+    store = store or get_host_key_store()
+    unknown = [node for node in nodes if not store.is_known(node)]
+
+    def scan(node: NodeConnection) -> str:
+        try:
+            key = fetch_host_key(node)
+        except (OSError, SSHException) as e:
+            raise HostKeyError(f"{node.key()} 無法取得主機金鑰：{e}") from e
+        return SCAN_PINNED if store.verify(node, key, save=False) else SCAN_KNOWN
+
+    scanned = {id(o.node): o for o in run_on_nodes(unknown, scan, max_workers)}
+    if any(o.ok and o.result == SCAN_PINNED for o in scanned.values()):
+        store.save()
+    return [
+        scanned.get(id(node)) or NodeOutcome(node=node, result=SCAN_KNOWN)
+        for node in nodes
+    ]
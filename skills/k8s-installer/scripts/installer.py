@@ -3,43 +3,162 @@ K8S 安裝器
 
 協調整個 K8S 叢集的安裝流程。
 """
-from typing import Callable, Optional
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import Callable, ContextManager, Optional, TypeVar
 
 from models import (
+    CheckStatus,
     ClusterConfig,
     ExecutionResult,
     InstallationStep,
     NodeConnection,
+    ReconcileActionKind,
+    ReconcilePlan,
+    RenderedScript,
     StepStatus,
 )
-from ssh_client import K8SSSHClient, SSHConnectionError, SSHCommandError
+from ssh_client import ConnectionPool, SSHConnectionError, SSHCommandError
+from agent import AgentError
+from api_steps import API_STEPS
+from concurrency import AdaptiveConcurrency
+from applied_state import load_applied_state, record_added_nodes, record_applied_state
+from calico import resolve_calico, with_calico
+from diagnostics import collect_diagnostics
+from disk_bench import fastest_first, latency_check, measure_masters
+from facts import FactsCache
+from host_keys import scan_host_keys
+from join_credentials import JoinCredentialManager
+from kube_api import KubeAPIClient, KubeAPIError, open_kube_api
+from manifests import ManifestCache, ManifestError, cluster_manifests
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from preflight import run_preflight
 from prompts import show_progress
-from commands import (
-    get_disable_swap_script,
-    get_load_kernel_modules_script,
-    get_configure_sysctl_script,
-    get_install_containerd_script,
-    get_install_kubernetes_packages_script,
-    get_kubeadm_init_script,
-    get_install_calico_script,
-    get_generate_join_command_script,
-    get_master_join_script,
-    get_worker_join_script,
-    get_install_metallb_script,
+from reconcile import CLUSTER_TARGET
+from steps import (
+    STEP_NAMES,
+    render_cluster_steps,
+    render_node_steps,
+    render_step,
+    step_resources,
 )
+from timings import StepTimings
+from topology import SiteLimits, choose_seeds, interleave, site_of
+
+
+# 進度回報函式：(step_name, node, status)
+ProgressCallback = Callable[[str, str, str], None]
+
+T = TypeVar("T")
 
 
 class K8SInstaller:
     """K8S 叢集安裝器"""
 
-    def __init__(self, config: ClusterConfig, verbose: bool = False):
-        self.config = config
+    def __init__(
+        self,
+        config: ClusterConfig,
+        verbose: bool = False,
+        pool: Optional[ConnectionPool] = None,
+        progress: Optional[ProgressCallback] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        skip_preflight: bool = False,
+        upload_scripts: bool = False,
+        collect_diagnostics: bool = True,
+        persistent_shell: bool = False,
+        node_agent: bool = False,
+        adaptive_concurrency: bool = False,
+        site_seeds: bool = False,
+        kube_api: bool = False,
+        etcd_disk_check: bool = False,
+        fastest_primary: bool = False,
+        node_slots: Optional[threading.Semaphore] = None,
+        manifest_cache: Optional[ManifestCache] = None,
+        facts_cache: Optional[FactsCache] = None,
+        timings: Optional[StepTimings] = None,
+    ):
+        """
+        Args:
+            config: 叢集配置
+            verbose: 是否顯示詳細輸出
+            pool: 共用的 SSH 連線池（常駐模式使用）
+            progress: 進度回報函式，預設輸出到終端機
+            max_workers: 同時操作的節點數上限
+            skip_preflight: 是否跳過前置檢查
+            upload_scripts: 是否以 SFTP 上傳腳本後執行
+            collect_diagnostics: 失敗時是否收集相關節點的日誌
+            persistent_shell: 是否在每個節點的常駐 bash 中執行步驟
+            node_agent: 是否透過上傳到節點的 agent 執行步驟
+            adaptive_concurrency: 是否依逾時與錯誤自動調整並行數
+            site_seeds: 是否由各站點的種子節點分發映像
+            kube_api: 是否經 SSH 通道直接呼叫 Kubernetes API 執行叢集層級步驟
+            etcd_disk_check: 是否在建立 Control Plane 前量測 Master 的 etcd 磁碟延遲
+            fastest_primary: 是否以 etcd 磁碟延遲最低的 Master 作為 Primary Master
+            node_slots: 多叢集安裝時共用的節點操作並行上限
+            manifest_cache: 多叢集安裝時共用的 manifest 快取
+            facts_cache: 共用的節點 facts 快取（常駐模式使用）
+            timings: 多叢集安裝時共用的步驟耗時記錄
+        """
+        # 既有叢集沿用上次決定的 Calico 封裝與 MTU（不修改呼叫端的配置）
+        self.config = with_calico(
+            config,
+            resolve_calico(
+                config, applied=load_applied_state(config.control_plane_endpoint())
+            ),
+        )
         self.verbose = verbose
+        self.max_workers = max_workers
+        self.skip_preflight = skip_preflight
+        # 以 SFTP 上傳腳本（每個節點每份內容只傳一次）並在節點上記錄執行過的雜湊
+        self.upload_scripts = upload_scripts
+        # 失敗時自動收集相關節點的日誌
+        self.collect_diagnostics = collect_diagnostics
+        # 在每個節點的常駐 bash 中執行步驟（不必每步都開新 session）
+        self.persistent_shell = persistent_shell
+        # 透過上傳到節點的 agent 執行步驟（批次送出、結構化結果）
+        self.node_agent = node_agent
+        # 每個站點由種子節點下載一次映像，再分發給同站點的其他節點
+        self.site_seeds = site_seeds
+        # 各站點同時操作的節點數上限（來自 config.site_limits）
+        self.site_limits = SiteLimits(config.site_limits)
+        # 多叢集安裝時所有叢集共用的節點操作並行上限
+        self.node_slots = node_slots
+        # 叢集層級步驟經 SSH 通道直接呼叫 Kubernetes API（不在節點上執行 kubectl）
+        self.kube_api = kube_api
+        self._api: Optional[KubeAPIClient] = None
+        self._api_lock = threading.Lock()
+        # 多叢集安裝時共用的 manifest 快取（預先傳到 Primary Master）；
+        # 使用 API 時 manifest 由本機直接套用
+        self.manifest_cache = manifest_cache or (ManifestCache() if kube_api else None)
+        # 建立 Control Plane 前量測各 Master 的 etcd 磁碟延遲，
+        # fastest_primary 時以延遲最低的 Master 作為 Primary Master
+        self.etcd_disk_check = etcd_disk_check or fastest_primary
+        self.fastest_primary = fastest_primary
+        # 未提供連線池時自行建立，安裝結束後關閉；常駐模式則共用外部連線池
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool()
+        self.progress = progress or show_progress
         self.steps: list[InstallationStep] = []
+        # fastest_primary 改用的 Primary Master（未改變時為 None）
+        self.primary_changed: Optional[NodeConnection] = None
+        # 前置檢查收集的節點資訊（決定 Calico MTU 時使用）；
+        # 常駐模式共用外部快取，已預先檢查的節點不必重新收集
+        self.facts = facts_cache if facts_cache is not None else FactsCache()
         self.join_command: Optional[str] = None
         self.worker_join_command: Optional[str] = None
         self.master_join_command: Optional[str] = None
         self.certificate_key: Optional[str] = None
+        self.credentials = self._create_credentials()
+        # 多叢集安裝時共用的耗時記錄（各叢集的樣本寫回同一份檔案）
+        self.timings = timings if timings is not None else StepTimings()
+        # 依各資源的逾時與錯誤自動調整並行數（max_workers 為上限）
+        self.concurrency = (
+            AdaptiveConcurrency(max_workers, self.timings)
+            if adaptive_concurrency
+            else None
+        )
 
     def install(self) -> ExecutionResult:
         """
@@ -48,212 +167,754 @@ class K8SInstaller:
         Returns:
             ExecutionResult 執行結果
         """
-        try:
-            # Phase 1: 在所有節點執行前置作業
-            self._run_prerequisites_on_all_nodes()
-            
-            # Phase 2: 在所有節點安裝套件
-            self._run_package_install_on_all_nodes()
-            
-            # Phase 3: 初始化 Control Plane
-            self._init_control_plane()
-            
-            # Phase 4: 加入其他 Masters
-            self._join_masters()
-
-            # Phase 5: Worker 加入叢集
-            self._join_workers()
-
-            # Phase 6: 安裝 MetalLB（可選）
-            self._install_metallb()
-            
+        return self._run(self._install)
+
+    def add_nodes(self, nodes: list[NodeConnection]) -> ExecutionResult:
+        """
+        將新節點加入既有叢集
+
+        只在新節點上執行前置作業、套件安裝與 join，既有節點完全不受影響；
+        join 憑證由既有的 Primary Master 取得（有效的快取直接重用）。
+
+        Args:
+            nodes: 要加入的節點（須已包含在 config 中以判斷角色）
+
+        Returns:
+            ExecutionResult 執行結果
+        """
+        return self._run(lambda: self._add_nodes(nodes))
+
+    def reconcile(self, plan: ReconcilePlan) -> ExecutionResult:
+        """
+        依調和計畫讓既有叢集符合目前配置
+
+        Args:
+            plan: plan_reconcile 產生的計畫
+
+        Returns:
+            ExecutionResult 執行結果
+        """
+        if plan.blockers:
             return ExecutionResult(
-                success=True,
-                message="K8S 叢集安裝完成",
-                join_command=self.join_command,
+                success=False,
+                message="配置變更無法自動調和，未修改任何節點",
+                error="\n".join(plan.blockers),
             )
+        return self._run(lambda: self._reconcile(plan))
+
+    def _run(self, body: Callable[[], ExecutionResult]) -> ExecutionResult:
+        """執行安裝流程並統一處理錯誤與資源釋放"""
+        try:
+            # 第一次接觸的節點先並行記錄主機金鑰（已記錄的節點不會連線）
+            scan_host_keys(self.config.all_nodes(), self.max_workers)
+            return body()
         except (SSHConnectionError, SSHCommandError) as e:
             return ExecutionResult(
                 success=False,
                 message="安裝失敗",
                 error=str(e),
+                diagnostics=self._collect_failure_diagnostics(),
             )
+        finally:
+            self.credentials.stop_background_refresh()
+            if self._api is not None:
+                self._api.close()
+            if self.concurrency is not None:
+                limits = self.concurrency.snapshot()
+                self.progress(
+                    "自適應並行上限",
+                    " ".join(f"{name}={limit}" for name, limit in limits.items()),
+                    "success",
+                )
+            self.timings.record_steps(self.steps)
+            if self._owns_pool:
+                self.pool.close_all()
 
-    def _run_prerequisites_on_all_nodes(self) -> None:
-        """在所有節點執行前置作業"""
-        scripts = [
-            ("停用 Swap", get_disable_swap_script),
-            ("載入核心模組", get_load_kernel_modules_script),
-            ("設定 Sysctl", get_configure_sysctl_script),
-        ]
-        
-        for node in self.config.all_nodes():
-            for step_name, script_fn in scripts:
-                self._execute_step(node, step_name, script_fn())
-
-    def _run_package_install_on_all_nodes(self) -> None:
-        """在所有節點安裝套件"""
-        scripts = [
-            ("安裝 Containerd", get_install_containerd_script),
-            ("安裝 K8S 套件", get_install_kubernetes_packages_script),
-        ]
-        
-        for node in self.config.all_nodes():
-            for step_name, script_fn in scripts:
-                self._execute_step(node, step_name, script_fn())
+    def _collect_failure_diagnostics(self) -> Optional[str]:
+        """
+        並行收集失敗步驟所在節點的日誌
+
+        Returns:
+            診斷壓縮檔路徑；未啟用或無法收集時為 None
+        """
+        if not self.collect_diagnostics:
+            return None
+        failed = {s.node for s in self.steps if s.status == StepStatus.FAILED}
+        nodes = [node for node in self.config.all_nodes() if str(node) in failed]
+        if not nodes:
+            return None
+
+        self.progress("收集診斷資料", f"{len(nodes)} 個節點", "running")
+        try:
+            bundle = collect_diagnostics(
+                nodes, self.pool, max_workers=self.max_workers, steps=self.steps
+            )
+        except OSError:
+            # 本機無法寫入壓縮檔不應蓋過原本的安裝錯誤
+            self.progress("收集診斷資料", f"{len(nodes)} 個節點", "failed")
+            return None
+        self.progress(
+            "收集診斷資料",
+            bundle.path or f"{len(nodes)} 個節點",
+            "success" if bundle.path else "failed",
+        )
+        return bundle.path
+
+    def _install(self) -> ExecutionResult:
+        """完整安裝的各階段"""
+        # Phase 0: 並行前置檢查，任何節點未通過就不修改任何機器
+        if not self.skip_preflight:
+            failure = self._run_preflight()
+            if failure is not None:
+                return failure
+        if self.etcd_disk_check:
+            failure = self._check_etcd_disks()
+            if failure is not None:
+                return failure
+        self._resolve_calico()
+
+        # Phase 1-2: 所有節點並行執行前置作業與套件安裝
+        self._prepare_nodes(self.config.all_nodes())
+        self._distribute_images(self.config.all_nodes())
+
+        # Phase 3: 初始化 Control Plane
+        self._init_control_plane()
+
+        # Phase 4: 加入其他 Masters
+        self._join_masters(self.config.master_nodes[1:])
+
+        # Phase 5: Worker 加入叢集
+        self._join_workers(self.config.worker_nodes)
+
+        # Phase 6: 安裝 MetalLB（可選）
+        self._install_metallb()
+
+        record_applied_state(self.config)
+        message = "K8S 叢集安裝完成"
+        if self.primary_changed is not None:
+            message += (
+                f"（Primary Master 依 etcd 磁碟延遲改為 {self.primary_changed}，"
+                "建議將配置檔中的 master_nodes 調整為相同順序）"
+            )
+        return ExecutionResult(
+            success=True,
+            message=message,
+            join_command=self.join_command,
+        )
+
+    def _add_nodes(self, nodes: list[NodeConnection]) -> ExecutionResult:
+        """擴充節點的各階段"""
+        if not self.skip_preflight:
+            failure = self._run_preflight(nodes)
+            if failure is not None:
+                return failure
+
+        masters = self._join_new_nodes(nodes)
+
+        record_added_nodes(self.config, nodes)
+        return ExecutionResult(
+            success=True,
+            message=f"已加入 {len(nodes)} 個節點"
+            f"（Master {masters} 個、Worker {len(nodes) - masters} 個）",
+        )
+
+    def _reconcile(self, plan: ReconcilePlan) -> ExecutionResult:
+        """
+        調和的各階段
+
+        先移除節點，再於既有節點重跑變更的步驟，接著加入新節點，
+        最後重跑叢集層級步驟。
+        """
+        by_key = {node.key(): node for node in self.config.all_nodes()}
+        added = [by_key[a.node] for a in plan.of_kind(ReconcileActionKind.ADD)]
+
+        if added and not self.skip_preflight:
+            failure = self._run_preflight(added)
+            if failure is not None:
+                return failure
 
-    def _init_control_plane(self) -> None:
-        """初始化 Control Plane"""
         cp = self.config.primary_master()
-        
-        # 執行 kubeadm init
-        self._execute_step(
-            cp,
-            "初始化 Control Plane",
-            get_kubeadm_init_script(
-                self.config.pod_network_cidr,
-                self.config.control_plane_endpoint(),
-            ),
+        for action in plan.of_kind(ReconcileActionKind.REMOVE):
+            host = action.node.rsplit(":", 1)[0]
+            self._execute_step(
+                cp,
+                render_step("remove_node", host),
+                f"{STEP_NAMES['remove_node']}（{host}）",
+            )
+
+        node_reruns: dict[str, set[str]] = {}
+        cluster_reruns: set[str] = set()
+        for action in plan.of_kind(ReconcileActionKind.RERUN):
+            if action.node == CLUSTER_TARGET:
+                cluster_reruns.add(action.step)
+            else:
+                node_reruns.setdefault(action.node, set()).add(action.step)
+
+        if node_reruns:
+            self._prepare_nodes(
+                [by_key[key] for key in node_reruns],
+                only=lambda node: node_reruns[node.key()],
+            )
+
+        if added:
+            self._join_new_nodes(added)
+
+        for step in render_cluster_steps(self.config):
+            if step.step_id in cluster_reruns:
+                self._execute_step(cp, step)
+
+        record_applied_state(self.config)
+        return ExecutionResult(
+            success=True,
+            message=f"調和完成，共執行 {len(plan.actions)} 個動作",
         )
-        
-        # 安裝 Calico
-        self._execute_step(
-            cp,
-            "安裝 Calico CNI",
-            get_install_calico_script(self.config.pod_network_cidr),
+
+    def _join_new_nodes(self, nodes: list[NodeConnection]) -> int:
+        """
+        將新節點加入既有叢集
+
+        Returns:
+            加入的 Master 數
+        """
+        if any(n.key() == self.config.primary_master().key() for n in nodes):
+            raise SSHCommandError("Primary Master 必須是既有節點，無法以擴充方式加入")
+
+        masters = [n for n in nodes if self.config.is_master(n)]
+        workers = [n for n in nodes if not self.config.is_master(n)]
+
+        self._prepare_nodes(nodes)
+        self._distribute_images(nodes)
+        self._join_masters(
+            masters,
+            existing_members=len(self.config.master_nodes) - len(masters),
         )
-        
+        self._join_workers(workers)
+        return len(masters)
+
+    def _run_preflight(
+        self,
+        nodes: Optional[list[NodeConnection]] = None,
+    ) -> Optional[ExecutionResult]:
+        """執行前置檢查，未通過時回傳失敗結果"""
+        report = run_preflight(
+            self.config,
+            self.pool,
+            self.max_workers,
+            facts_cache=self.facts,
+            nodes=nodes,
+        )
+        for result in report.nodes:
+            status = "success" if result.passed else "failed"
+            self.progress(STEP_NAMES["preflight"], result.node, status)
+        if report.passed:
+            # 各節點並行檢查，以整體耗時作為單一節點的預估值
+            self.timings.record("preflight", report.duration)
+            return None
+        return ExecutionResult(
+            success=False,
+            message="前置檢查未通過，未修改任何節點",
+            error=report.error_summary(),
+        )
+
+    def _create_credentials(self) -> JoinCredentialManager:
+        """建立 Primary Master 的 join 憑證管理"""
+        return JoinCredentialManager(
+            self.config.primary_master(),
+            self.config.control_plane_endpoint(),
+            self.pool,
+            node_agent=self.node_agent,
+            kube_api=self._kube_api_client if self.kube_api else None,
+        )
+
+    def _check_etcd_disks(self) -> Optional[ExecutionResult]:
+        """
+        並行量測所有 Master 的 etcd 磁碟延遲
+
+        任何 Master 的 p99 超過上限時回傳失敗結果（尚未修改任何節點）；
+        fastest_primary 時將延遲最低的 Master 移到第一台。
+        """
+        masters = self.config.master_nodes
+        started = time.monotonic()
+        latencies = measure_masters(masters, self.pool, self.max_workers)
+        # 各 Master 並行量測，以整體耗時作為單一節點的預估值
+        self.timings.record("etcd_disk_check", time.monotonic() - started)
+        failures = []
+        for latency in latencies:
+            check = latency_check(latency)
+            status = "failed" if check.status == CheckStatus.FAIL else "success"
+            self.progress(
+                f"{STEP_NAMES['etcd_disk_check']}：{check.message}", latency.node, status
+            )
+            if check.status == CheckStatus.FAIL:
+                failures.append(f"{latency.node}: {check.message}")
+        if failures:
+            return ExecutionResult(
+                success=False,
+                message="etcd 磁碟延遲過高，未修改任何節點",
+                error="\n".join(failures),
+            )
+
+        if self.fastest_primary:
+            self._choose_primary(fastest_first(masters, latencies))
+        return None
+
+    def _choose_primary(self, ordered: list[NodeConnection]) -> None:
+        """
+        以延遲最低的 Master 作為 Primary Master
+
+        未設定 Load Balancer 時 Control Plane Endpoint 是第一台 Master，
+        換掉它會讓配置檔與已套用狀態對不上，因此維持原順序。
+        """
+        current = self.config.primary_master()
+        name = "選擇 Primary Master"
+        if ordered[0].key() == current.key():
+            self.progress(name, str(current), "success")
+            return
+        if not self.config.load_balancer_ip:
+            self.progress(
+                f"{name}：未設定 load_balancer_ip，維持配置中的第一台"
+                f"（延遲最低的是 {ordered[0]}）",
+                str(current),
+                "warning",
+            )
+            return
+        self.config = replace(self.config, master_nodes=ordered)
+        self.credentials = self._create_credentials()
+        self.primary_changed = ordered[0]
+        self.progress(name, str(ordered[0]), "success")
+
+    def _resolve_calico(self) -> None:
+        """
+        依所有節點的網卡 MTU 決定 Calico MTU
+
+        前置檢查已收集的 facts 直接使用；略過前置檢查時另行收集。
+        配置或上次套用的記錄已決定 MTU 時不需要 facts。
+        """
+        if self.config.calico.mtu is not None:
+            return
+        facts = self._run_parallel(
+            self.config.all_nodes(),
+            lambda node: self.facts.get(self.pool, node),
+        )
+        self.config = with_calico(self.config, resolve_calico(self.config, facts))
+
+    def _prepare_nodes(
+        self,
+        nodes: list[NodeConnection],
+        only: Optional[Callable[[NodeConnection], set[str]]] = None,
+    ) -> None:
+        """
+        在節點上執行前置作業與套件安裝
+
+        節點之間互不相依，並行執行；同一節點內的步驟依序執行。
+
+        Args:
+            nodes: 目標節點
+            only: 若提供，每個節點只執行其回傳的步驟 ID
+        """
+        steps = render_node_steps(self.config)
+
+        def prepare(node: NodeConnection) -> None:
+            selected = only(node) if only is not None else None
+            chain = [s for s in steps if selected is None or s.step_id in selected]
+            if self.node_agent:
+                self._execute_batch(node, chain)
+                return
+            for step in chain:
+                self._execute_step(node, step)
+
+        self._run_parallel(nodes, prepare)
+
+    def _distribute_images(self, nodes: list[NodeConnection]) -> None:
+        """
+        每個站點由種子節點從 registry 下載一次 kubeadm 映像，同站點的
+        其他節點再從種子匯入（種子無法連線時各自下載）
+
+        結束後停止種子的下載服務；停止失敗不影響安裝。
+        """
+        if not self.site_seeds:
+            return
+        seeds = choose_seeds(self.config, nodes)
+        seed_keys = {seed.key() for seed in seeds.values()}
+        self._run_parallel(
+            list(seeds.values()),
+            lambda seed: self._execute_step(seed, render_step("seed_images")),
+        )
+
+        def fetch(node: NodeConnection) -> None:
+            seed = seeds[site_of(node)]
+            self._execute_step(
+                node,
+                render_step("fetch_seed_images", seed.host),
+                f"{STEP_NAMES['fetch_seed_images']}（{seed.host}）",
+            )
+
+        try:
+            self._run_parallel([n for n in nodes if n.key() not in seed_keys], fetch)
+        finally:
+            run_on_nodes(
+                list(seeds.values()),
+                lambda seed: self._execute_step(seed, render_step("stop_seed")),
+                max_workers=self.max_workers,
+            )
+
+    def _run_parallel(
+        self,
+        nodes: list[NodeConnection],
+        fn: Callable[[NodeConnection], T],
+    ) -> list[T]:
+        """
+        對多個節點並行執行 fn
+
+        節點依拓撲交錯排列後再交給執行緒池，同時進行的工作分散在不同
+        站點與機櫃。等待所有節點結束後，若有任何節點失敗則拋出第一個
+        錯誤，並在訊息中註明失敗的節點數。
+        """
+        outcomes = run_on_nodes(interleave(nodes), fn, max_workers=self.max_workers)
+        by_node = {id(o.node): o for o in outcomes}
+        outcomes = [by_node[id(node)] for node in nodes]
+        failures = [o for o in outcomes if not o.ok]
+        if failures:
+            error = failures[0].error
+            if len(failures) > 1 and isinstance(error, SSHCommandError):
+                raise SSHCommandError(
+                    f"{error}（另有 {len(failures) - 1} 個節點失敗）"
+                ) from error
+            raise error
+        return [o.result for o in outcomes]
+
+    def _init_control_plane(self) -> None:
+        """初始化 Control Plane"""
+        cp = self.config.primary_master()
+        self._stage_manifests()
+
+        # 執行 kubeadm init 與安裝 Calico
+        for step in render_cluster_steps(self.config):
+            if step.step_id in ("kubeadm_init", "install_calico"):
+                self._execute_step(cp, step)
+
         # 取得 join command
         self._get_join_command()
 
+    def _stage_manifests(self) -> None:
+        """
+        將共用快取中的 manifest 傳到 Primary Master
+
+        本機無法下載時不中斷安裝，改由節點上的腳本自行下載。使用 API
+        時 manifest 由本機直接套用，不必傳送。
+        """
+        if self.manifest_cache is None or self.kube_api:
+            return
+        cp = self.config.primary_master()
+        name = "傳送 Manifest"
+        self.progress(name, str(cp), "running")
+        try:
+            with self._node_slot():
+                self.manifest_cache.stage(
+                    self.pool.get(cp), cluster_manifests(self.config)
+                )
+        except ManifestError:
+            self.progress(name, str(cp), "failed")
+            return
+        self.progress(name, str(cp), "success")
+
+    def _node_slot(self) -> ContextManager:
+        """佔用一個全域節點操作名額（未設定上限時不限制）"""
+        return self.node_slots if self.node_slots is not None else nullcontext()
+
+    def _step_slot(self, key: str, resources: tuple[str, ...]) -> ContextManager:
+        """佔用自適應並行的資源名額（未啟用時不限制）"""
+        if self.concurrency is None:
+            return nullcontext()
+        return self.concurrency.slot(key, resources)
+
+    def _kube_api_client(self) -> KubeAPIClient:
+        """取得 Primary Master 的 API 用戶端（第一次使用時讀取 admin kubeconfig）"""
+        with self._api_lock:
+            if self._api is None:
+                try:
+                    self._api = open_kube_api(
+                        self.pool.get(self.config.primary_master())
+                    )
+                except KubeAPIError as e:
+                    raise SSHCommandError(f"無法建立 Kubernetes API 連線：{e}") from e
+            return self._api
+
     def _get_join_command(self) -> None:
         """從 Control Plane 取得 join 命令與憑證"""
         cp = self.config.primary_master()
-        show_progress("取得 Join 命令", str(cp), "running")
-        
-        with K8SSSHClient(cp) as client:
-            stdout, stderr, exit_code = client.execute(
-                get_generate_join_command_script()
-            )
-            if exit_code == 0:
-                cert_key = None
-                join_cmd = None
-                for line in stdout.splitlines():
-                    if line.startswith("CERT_KEY="):
-                        cert_key = line.split("=", 1)[1].strip()
-                    if line.startswith("JOIN_CMD="):
-                        join_cmd = line.split("=", 1)[1].strip()
-
-                if not cert_key or not join_cmd:
-                    raise SSHCommandError("join 命令或 certificate key 解析失敗")
-
-                self.certificate_key = cert_key
-                self.worker_join_command = join_cmd
-                self.master_join_command = (
-                    f"{join_cmd} --control-plane --certificate-key {cert_key}"
-                )
-                self.join_command = "\n".join(
-                    [
-                        "Master Join:",
-                        self.master_join_command,
-                        "",
-                        "Worker Join:",
-                        self.worker_join_command,
-                    ]
-                )
-                show_progress("取得 Join 命令", str(cp), "success")
-            else:
-                raise SSHCommandError(f"無法取得 join 命令：{stderr}")
+        step = InstallationStep(
+            name=STEP_NAMES["generate_join"], node=str(cp), step_id="generate_join"
+        )
+        self.steps.append(step)
+        self.progress(step.name, step.node, "running")
+        step.mark_running()
+
+        # 剛初始化的叢集不能沿用舊叢集留下的憑證
+        self.credentials.invalidate()
+        need_certificate_key = len(self.config.master_nodes) > 1
+        credentials = self.credentials.get(need_certificate_key)
+        # 安裝期間（例如大量節點加入）於到期前自動更新
+        self.credentials.start_background_refresh()
 
-    def _join_masters(self) -> None:
-        """其他 Master 節點加入叢集"""
-        if not self.worker_join_command or not self.certificate_key:
-            raise SSHCommandError("缺少 Master join 命令，無法加入 Control Plane")
+        self.certificate_key = credentials.certificate_key
+        self.worker_join_command = credentials.join_command
+        self.master_join_command = credentials.master_join_command()
+        lines = []
+        if self.master_join_command:
+            lines += ["Master Join:", self.master_join_command, ""]
+        lines += ["Worker Join:", self.worker_join_command]
+        self.join_command = "\n".join(lines)
+        step.mark_success()
+        self.progress(step.name, step.node, "success")
+
+    def _join_masters(
+        self,
+        masters: list[NodeConnection],
+        existing_members: int = 1,
+    ) -> None:
+        """
+        其他 Master 節點加入叢集
 
-        for master in self.config.master_nodes[1:]:
+        準備階段（憑證、manifest、kubelet）所有 Master 並行執行；只有新增
+        etcd 成員的 control-plane-join 逐台執行，且每台之後都等 etcd 健康
+        再繼續，維持 quorum 穩定。
+
+        Args:
+            masters: 要加入的 Master
+            existing_members: 加入前已存在的 etcd 成員數
+        """
+        if not masters:
+            return
+
+        credentials = self.credentials.get(need_certificate_key=True)
+        prepare = render_step(
+            "master_prepare", credentials.join_command, credentials.certificate_key
+        )
+        self._run_parallel(
+            masters,
+            lambda master: self._execute_step(master, prepare),
+        )
+
+        cp = self.config.primary_master()
+        for index, master in enumerate(masters, start=existing_members + 1):
+            self._execute_step(master, render_step("master_join"))
             self._execute_step(
-                master,
-                "加入 Control Plane",
-                get_master_join_script(self.worker_join_command, self.certificate_key),
+                cp,
+                render_step("etcd_health_check", index),
+                f"{STEP_NAMES['etcd_health_check']}（{index} 個成員）",
             )
 
-    def _join_workers(self) -> None:
-        """Worker 節點加入叢集"""
-        if not self.worker_join_command:
-            raise SSHCommandError("缺少 Worker join 命令，無法加入 Worker")
-
-        for worker in self.config.worker_nodes:
+    def _join_workers(self, workers: list[NodeConnection]) -> None:
+        """Worker 節點並行加入叢集（共用快取的 join 憑證）"""
+        def join(worker: NodeConnection) -> None:
+            credentials = self.credentials.get()
             self._execute_step(
-                worker,
-                "加入叢集",
-                get_worker_join_script(self.worker_join_command),
+                worker, render_step("worker_join", credentials.join_command)
             )
 
-    def _install_metallb(self) -> None:
-        """安裝 MetalLB（可選）"""
-        if not self.config.metallb_ip_range:
-            return
+        self._run_parallel(workers, join)
 
+    def _install_metallb(self) -> None:
+        """安裝 MetalLB（可選，未設定 IP 範圍時不會渲染此步驟）"""
         cp = self.config.primary_master()
-        self._execute_step(
-            cp,
-            "安裝 MetalLB",
-            get_install_metallb_script(self.config.metallb_ip_range),
-        )
+        for step in render_cluster_steps(self.config):
+            if step.step_id == "install_metallb":
+                self._execute_step(cp, step)
 
     def _execute_step(
         self,
         node: NodeConnection,
-        step_name: str,
-        script: str,
+        rendered: RenderedScript,
+        step_name: Optional[str] = None,
     ) -> None:
         """
         執行單一安裝步驟
         
         Args:
             node: 目標節點
-            step_name: 步驟名稱
-            script: 要執行的腳本
+            rendered: 已渲染的步驟腳本
+            step_name: 顯示名稱，預設為步驟名稱
         """
-        step = InstallationStep(name=step_name, node=str(node))
+        step_name = step_name or rendered.name
+        step = InstallationStep(
+            name=step_name, node=str(node), step_id=rendered.step_id
+        )
         self.steps.append(step)
-        
-        show_progress(step_name, str(node), "running")
+
+        # 等待名額的時間不計入步驟耗時
+        # 先取得站點名額，避免佔住全域名額等待壅塞的站點
+        resources = step_resources(rendered.step_id)
+        with self.site_limits.slot(node), self._node_slot():
+            with self._step_slot(rendered.step_id, resources):
+                self._run_step(node, rendered, step)
+
+    def _run_step(
+        self,
+        node: NodeConnection,
+        rendered: RenderedScript,
+        step: InstallationStep,
+    ) -> None:
+        """在節點上執行已記錄的步驟，失敗時拋出例外"""
+        if self.kube_api and rendered.step_id in API_STEPS:
+            self._run_api_step(node, rendered, step)
+            return
+
+        step_name = step.name
+        self.progress(step_name, str(node), "running")
         step.mark_running()
         
         try:
-            with K8SSSHClient(node) as client:
-                stdout, stderr, exit_code = client.execute(script)
-                
-                if exit_code == 0:
-                    step.mark_success(stdout)
-                    show_progress(step_name, str(node), "success")
-                else:
-                    error_msg = stderr if stderr else f"Exit code: {exit_code}"
-                    step.mark_failed(error_msg)
-                    show_progress(step_name, str(node), "failed")
-                    raise SSHCommandError(
-                        f"[{node}] {step_name} 失敗：{error_msg}"
-                    )
-        except SSHConnectionError as e:
+            client = self.pool.get(node)
+            if self.node_agent:
+                stdout, stderr, exit_code = client.agent().run(rendered.script)
+            elif self.upload_scripts and not rendered.secret:
+                stdout, stderr, exit_code = client.execute_uploaded(
+                    rendered.script,
+                    rendered.digest,
+                    rendered.step_id,
+                    persistent_shell=self.persistent_shell,
+                )
+            else:
+                stdout, stderr, exit_code = client.execute(
+                    rendered.script, persistent_shell=self.persistent_shell
+                )
+        except AgentError as e:
             step.mark_failed(str(e))
-            show_progress(step_name, str(node), "failed")
+            self.progress(step_name, str(node), "failed")
+            raise SSHCommandError(f"[{node}] {step_name} 失敗：{e}") from e
+        except (SSHConnectionError, SSHCommandError) as e:
+            step.mark_failed(str(e))
+            self.progress(step_name, str(node), "failed")
             raise
 
+        if exit_code == 0:
+            step.mark_success(stdout)
+            self.progress(step_name, str(node), "success")
+        else:
+            error_msg = stderr if stderr else f"Exit code: {exit_code}"
+            step.mark_failed(error_msg)
+            self.progress(step_name, str(node), "failed")
+            raise SSHCommandError(
+                f"[{node}] {step_name} 失敗：{error_msg}"
+            )
 
-def run_installation(
-    config: ClusterConfig,
-    verbose: bool = False,
-) -> ExecutionResult:
+    def _run_api_step(
+        self,
+        node: NodeConnection,
+        rendered: RenderedScript,
+        step: InstallationStep,
+    ) -> None:
+        """以 Kubernetes API 執行叢集層級步驟，失敗時拋出例外"""
+        self.progress(step.name, str(node), "running")
+        step.mark_running()
+        try:
+            output = API_STEPS[rendered.step_id](
+                self._kube_api_client(), self.config, self.manifest_cache
+            )
+        except (KubeAPIError, ManifestError, SSHConnectionError, SSHCommandError) as e:
+            step.mark_failed(str(e))
+            self.progress(step.name, str(node), "failed")
+            raise SSHCommandError(f"[{node}] {step.name} 失敗：{e}") from e
+        step.mark_success(output)
+        self.progress(step.name, str(node), "success")
+
+    def _execute_batch(self, node: NodeConnection, chain: list[RenderedScript]) -> None:
+        """
+        透過 agent 一次送出節點的多個步驟，依序執行
+
+        每個步驟的開始與結束以 agent 事件即時回報；任一步驟失敗後其餘
+        步驟不會執行。
+        """
+        records = [
+            InstallationStep(name=r.name, node=str(node), step_id=r.step_id)
+            for r in chain
+        ]
+        self.steps.extend(records)
+
+        def on_event(event: dict) -> None:
+            record = records[event["index"]]
+            if event["status"] == "running":
+                record.mark_running()
+            elif event["status"] == "success":
+                record.mark_success(event["result"].get("stdout", ""))
+            else:
+                result = event["result"]
+                record.mark_failed(
+                    result.get("stderr")
+                    or result.get("error")
+                    or f"Exit code: {result.get('exit_code')}"
+                )
+            self.progress(record.name, record.node, event["status"])
+
+        key = "batch:" + ",".join(r.step_id for r in chain)
+        resources = tuple(res for r in chain for res in step_resources(r.step_id))
+        try:
+            with self.site_limits.slot(node), self._node_slot():
+                with self._step_slot(key, resources):
+                    self.pool.get(node).agent().batch(
+                        [{"op": "run", "command": r.script} for r in chain], on_event
+                    )
+                    for record in records:
+                        if record.status == StepStatus.FAILED:
+                            raise SSHCommandError(
+                                f"[{node}] {record.name} 失敗：{record.error}"
+                            )
+        except AgentError as e:
+            for record in records:
+                if record.status == StepStatus.RUNNING:
+                    record.mark_failed(str(e))
+                    self.progress(record.name, record.node, "failed")
+            raise SSHCommandError(f"[{node}] agent 執行失敗：{e}") from e
+
+
+def run_installation(config: ClusterConfig, **options) -> ExecutionResult:
     """
     執行 K8S 安裝
-    
+
     Args:
         config: 叢集配置
-        verbose: 是否顯示詳細輸出
-        
+        options: K8SInstaller 的選項（verbose、pool、max_workers 等）
+
+    Returns:
+        ExecutionResult 執行結果
+    """
+    return K8SInstaller(config, **options).install()
+
+
+def run_add_nodes(
+    config: ClusterConfig,
+    nodes: list[NodeConnection],
+    **options,
+) -> ExecutionResult:
+    """
+    將新節點加入既有叢集
+
+    Args:
+        config: 包含新節點的完整叢集配置
+        nodes: 要加入的節點
+        options: K8SInstaller 的選項（skip_preflight 只檢查新節點）
+
+    Returns:
+        ExecutionResult 執行結果
+    """
+    return K8SInstaller(config, **options).add_nodes(nodes)
+
+
+def run_reconcile(
+    config: ClusterConfig,
+    plan: ReconcilePlan,
+    **options,
+) -> ExecutionResult:
+    """
+    依調和計畫更新既有叢集
+
+    Args:
+        config: 新的叢集配置
+        plan: plan_reconcile 產生的計畫
+        options: K8SInstaller 的選項（skip_preflight 只檢查新節點）
+
     Returns:
         ExecutionResult 執行結果
     """
-    installer = K8SInstaller(config, verbose)
-    return installer.install()
+    return K8SInstaller(config, **options).reconcile(plan)
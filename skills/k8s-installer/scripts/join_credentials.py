@@ -0,0 +1,229 @@
+"""
+Join 憑證管理
+
+快取 bootstrap token 與 Control Plane certificate key 及其到期時間，
+在多個節點加入與多次執行之間重用，並於到期前在背景更新。並行加入的
+節點共用同一份憑證，不會每個節點都到 Control Plane 產生一次。
+"""
+import dataclasses
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from agent import AgentError
+from commands import get_generate_join_command_script
+from kube_api import KubeAPIClient, KubeAPIError, create_join_command
+from models import JoinCredentials, NodeConnection
+from ssh_client import ConnectionPool, SSHCommandError
+from state import get_state_dir, load_json_state, save_json_state
+
+
+# bootstrap token 有效期限（秒），建立時以 --ttl 指定
+TOKEN_TTL = 24 * 3600
+# kubeadm 上傳的憑證 Secret 兩小時後即被刪除
+CERTIFICATE_KEY_TTL = 2 * 3600
+# 在到期前多久視為需要更新（秒）
+REFRESH_MARGIN = 15 * 60
+# 背景更新失敗時的重試間隔（秒）
+REFRESH_RETRY_INTERVAL = 60
+
+
+class JoinCredentialManager:
+    """
+    Join 憑證管理器（執行緒安全）
+
+    get() 在快取有效時直接回傳；需要更新時只有一個執行緒會連到
+    Control Plane，其他並行呼叫者等待同一次更新的結果。
+    """
+
+    def __init__(
+        self,
+        control_plane: NodeConnection,
+        endpoint: str,
+        pool: ConnectionPool,
+        store_path: Optional[Path] = None,
+        refresh_margin: float = REFRESH_MARGIN,
+        node_agent: bool = False,
+        kube_api: Optional[Callable[[], KubeAPIClient]] = None,
+    ):
+        self.control_plane = control_plane
+        self.endpoint = endpoint
+        self.pool = pool
+        self.store_path = store_path or _default_store_path(endpoint)
+        self.refresh_margin = refresh_margin
+        # 透過節點端 agent 產生憑證，直接取得結構化欄位
+        self.node_agent = node_agent
+        # 提供時以 API 直接建立 bootstrap token（certificate key 仍需 kubeadm）
+        self.kube_api = kube_api
+        self._lock = threading.Lock()
+        self._credentials = self._load()
+        # 曾經要求過 certificate key 時，背景更新也一併維持其有效
+        self._keep_certificate_key = False
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def get(self, need_certificate_key: bool = False) -> JoinCredentials:
+        """
+        取得有效的 join 憑證
+
+        Args:
+            need_certificate_key: 是否需要 certificate key（加入 Master 時）
+
+        Raises:
+            SSHConnectionError: 無法連線 Control Plane
+            SSHCommandError: 產生憑證失敗
+        """
+        with self._lock:
+            if need_certificate_key:
+                self._keep_certificate_key = True
+            self._refresh_locked(
+                need_certificate_key=need_certificate_key,
+                margin=self.refresh_margin,
+            )
+            # 回傳副本，避免背景更新時呼叫者讀到更新到一半的內容
+            return dataclasses.replace(self._credentials)
+
+    def invalidate(self) -> None:
+        """捨棄快取（例如 Control Plane 重新初始化後）"""
+        with self._lock:
+            self._credentials = JoinCredentials()
+            save_json_state(self.store_path, self._credentials.to_dict(), private=True)
+
+    def start_background_refresh(self) -> None:
+        """啟動背景執行緒，在憑證到期前自動更新"""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop,
+            name="join-credential-refresh",
+            daemon=True,
+        )
+        self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        """停止背景更新"""
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def _refresh_loop(self) -> None:
+        """背景更新：睡到最早的到期時間減去 margin 後更新"""
+        while not self._stop.is_set():
+            with self._lock:
+                wake_at = self._next_refresh_at()
+            if self._stop.wait(max(0.0, wake_at - time.time())):
+                return
+            try:
+                with self._lock:
+                    self._refresh_locked(
+                        need_certificate_key=self._keep_certificate_key,
+                        margin=self.refresh_margin,
+                    )
+            except Exception:
+                # 背景更新失敗不影響前景；下次 get() 仍會同步重試
+                self._stop.wait(REFRESH_RETRY_INTERVAL)
+
+    def _next_refresh_at(self) -> float:
+        """下一次需要更新的時間"""
+        due = [self._credentials.token_expires_at]
+        if self._keep_certificate_key:
+            due.append(self._credentials.certificate_key_expires_at)
+        return min(due) - self.refresh_margin
+
+    def _refresh_locked(self, need_certificate_key: bool, margin: float) -> None:
+        """更新即將到期的部分（呼叫者須持有鎖）"""
+        now = time.time()
+        create_token = not self._credentials.token_valid(now, margin)
+        upload_certs = need_certificate_key and not (
+            self._credentials.certificate_key_valid(now, margin)
+        )
+        if not create_token and not upload_certs:
+            return
+
+        fields = {}
+        if create_token and self.kube_api is not None:
+            fields["join_command"] = self._create_token_via_api()
+        remote_token = create_token and self.kube_api is None
+        if remote_token or upload_certs:
+            if self.node_agent:
+                generated = self._generate_via_agent(remote_token, upload_certs)
+            else:
+                generated = self._generate(remote_token, upload_certs)
+            if remote_token:
+                fields["join_command"] = generated.get("join_command")
+            if upload_certs:
+                fields["certificate_key"] = generated.get("certificate_key")
+        if (create_token and not fields.get("join_command")) or (
+            upload_certs and not fields.get("certificate_key")
+        ):
+            raise SSHCommandError("join 命令或 certificate key 解析失敗")
+
+        if create_token:
+            self._credentials.join_command = fields["join_command"]
+            self._credentials.token_expires_at = now + TOKEN_TTL
+        if upload_certs:
+            self._credentials.certificate_key = fields["certificate_key"]
+            self._credentials.certificate_key_expires_at = now + CERTIFICATE_KEY_TTL
+        save_json_state(self.store_path, self._credentials.to_dict(), private=True)
+
+    def _generate(self, create_token: bool, upload_certs: bool) -> dict:
+        """
+        在 Control Plane 產生新的 token 及（或）certificate key
+
+        Returns:
+            {"join_command", "certificate_key"}（未要求的欄位為 None）
+        """
+        script = get_generate_join_command_script(
+            token_ttl=f"{TOKEN_TTL}s",
+            create_token=create_token,
+            upload_certs=upload_certs,
+        )
+        stdout, stderr, exit_code = self.pool.get(self.control_plane).execute(script)
+        if exit_code != 0:
+            raise SSHCommandError(f"無法取得 join 命令：{stderr}")
+
+        fields = {}
+        for line in stdout.splitlines():
+            if "=" in line:
+                key, value = line.split("=", 1)
+                fields[key.strip()] = value.strip()
+        return {
+            "join_command": fields.get("JOIN_CMD"),
+            "certificate_key": fields.get("CERT_KEY"),
+        }
+
+    def _create_token_via_api(self) -> str:
+        """經 Kubernetes API 建立 bootstrap token，回傳 join 命令"""
+        try:
+            return create_join_command(self.kube_api(), self.endpoint, TOKEN_TTL)
+        except KubeAPIError as e:
+            raise SSHCommandError(f"無法建立 bootstrap token：{e}") from e
+
+    def _generate_via_agent(self, create_token: bool, upload_certs: bool) -> dict:
+        """由 Control Plane 上的 agent 產生憑證（不經過 stdout 解析）"""
+        try:
+            return self.pool.get(self.control_plane).agent().call(
+                "join_credentials",
+                token_ttl=f"{TOKEN_TTL}s",
+                create_token=create_token,
+                upload_certs=upload_certs,
+            )
+        except AgentError as e:
+            raise SSHCommandError(f"無法取得 join 命令：{e}") from e
+
+    def _load(self) -> JoinCredentials:
+        """載入上次執行留下的憑證"""
+        data = load_json_state(self.store_path)
+        if isinstance(data, dict):
+            return JoinCredentials.from_dict(data)
+        return JoinCredentials()
+
+
+def _default_store_path(endpoint: str) -> Path:
+    """依 Control Plane Endpoint 產生憑證快取檔路徑"""
+    digest = hashlib.sha1(endpoint.encode("utf-8")).hexdigest()[:12]
+    return get_state_dir() / f"join-credentials-{digest}.json"
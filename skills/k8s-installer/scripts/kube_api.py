@@ -0,0 +1,500 @@
+"""
+經 SSH 通道存取 Kubernetes API
+
+叢集層級的步驟原本在 Primary Master 上以 kubectl 執行，每個命令都要
+啟動一次 kubectl 並重新讀取 kubeconfig。KubeAPIClient 只讀取一次 admin
+kubeconfig，經既有的 SSH 連線開 direct-tcpip 通道到節點上的 API Server，
+以保持連線的 HTTPS 直接呼叫 API：manifest 以 server-side apply 套用，
+等待就緒改用 watch，不在節點上啟動任何行程。
+"""
+import base64
+import http.client
+import json
+import secrets
+import select
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import yaml
+from paramiko import Channel
+from paramiko.ssh_exception import SSHException
+
+from ssh_client import K8SSSHClient, SSHCommandError
+
+
+# Primary Master 上的 admin kubeconfig 與 API Server 位址（從節點本身看）
+ADMIN_KUBECONFIG = "/etc/kubernetes/admin.conf"
+API_SERVER_HOST = "127.0.0.1"
+API_SERVER_PORT = 6443
+# kubeadm 產生的 API Server 憑證一定包含此名稱，用於驗證主機名稱
+API_SERVER_NAME = "kubernetes"
+
+# server-side apply 的 field manager
+FIELD_MANAGER = "k8s-installer"
+
+# 單一請求的逾時（秒）
+REQUEST_TIMEOUT = 60
+# 暫時性錯誤（webhook 尚未就緒、API Server 忙碌）與新 CRD 出現在
+# discovery 前的重試上限（秒）
+RETRY_TIMEOUT = 120
+RETRY_INTERVAL = 2
+# 暫時性錯誤的 HTTP 狀態碼
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+TUNNEL_BUFFER_SIZE = 64 * 1024
+
+
+class KubeAPIError(Exception):
+    """Kubernetes API 請求失敗"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        # HTTP 狀態碼；連線層級的錯誤為 None
+        self.status = status
+
+
+@dataclass
+class KubeCredentials:
+    """admin kubeconfig 中的 CA 與用戶端憑證（PEM）"""
+    ca_data: bytes
+    cert_data: bytes
+    key_data: bytes
+
+
+def parse_kubeconfig(text: str) -> KubeCredentials:
+    """
+    解析 kubeconfig（使用 current-context 的叢集與使用者）
+
+    Raises:
+        KubeAPIError: 格式不符或不含內嵌憑證
+    """
+    try:
+        data = yaml.safe_load(text)
+        contexts = {c["name"]: c["context"] for c in data["contexts"]}
+        context = contexts[data.get("current-context") or next(iter(contexts))]
+        cluster = next(
+            c["cluster"] for c in data["clusters"] if c["name"] == context["cluster"]
+        )
+        user = next(u["user"] for u in data["users"] if u["name"] == context["user"])
+        return KubeCredentials(
+            ca_data=base64.b64decode(cluster["certificate-authority-data"]),
+            cert_data=base64.b64decode(user["client-certificate-data"]),
+            key_data=base64.b64decode(user["client-key-data"]),
+        )
+    except (yaml.YAMLError, KeyError, TypeError, StopIteration, ValueError) as e:
+        raise KubeAPIError(f"無法解析 kubeconfig：{e}") from e
+
+
+def _tls_context(credentials: KubeCredentials) -> ssl.SSLContext:
+    """以 kubeconfig 的 CA 驗證 API Server，並以用戶端憑證認證"""
+    context = ssl.create_default_context(cadata=credentials.ca_data.decode("ascii"))
+    # load_cert_chain 只接受檔案，寫入僅本人可讀的暫存目錄後立即刪除
+    with tempfile.TemporaryDirectory(prefix="k8s-installer-") as directory:
+        cert_path = Path(directory) / "client.crt"
+        key_path = Path(directory) / "client.key"
+        cert_path.write_bytes(credentials.cert_data)
+        key_path.write_bytes(credentials.key_data)
+        context.load_cert_chain(str(cert_path), str(key_path))
+    return context
+
+
+def _pump(sock: socket.socket, channel: Channel) -> None:
+    """在本機 socket 與 SSH 通道之間雙向轉送，任一端關閉即結束"""
+    try:
+        while True:
+            readable, _, _ = select.select([sock, channel], [], [])
+            if sock in readable:
+                data = sock.recv(TUNNEL_BUFFER_SIZE)
+                if not data:
+                    break
+                channel.sendall(data)
+            if channel in readable:
+                data = channel.recv(TUNNEL_BUFFER_SIZE)
+                if not data:
+                    break
+                sock.sendall(data)
+    except (OSError, SSHException):
+        pass
+    finally:
+        channel.close()
+        sock.close()
+
+
+class _TunnelConnection(http.client.HTTPSConnection):
+    """經 SSH 通道連到 API Server 的 HTTPS 連線（不開本機 port）"""
+
+    def __init__(
+        self,
+        open_channel: Callable[[], Channel],
+        context: ssl.SSLContext,
+        timeout: float,
+    ):
+        super().__init__(API_SERVER_NAME, API_SERVER_PORT, timeout=timeout)
+        self._open_channel = open_channel
+        self._tls = context
+
+    def connect(self) -> None:
+        channel = self._open_channel()
+        local, remote = socket.socketpair()
+        threading.Thread(
+            target=_pump, args=(remote, channel), name="kube-api-tunnel", daemon=True
+        ).start()
+        local.settimeout(self.timeout)
+        self.sock = self._tls.wrap_socket(local, server_hostname=API_SERVER_NAME)
+
+
+def _api_base(api_version: str) -> str:
+    return "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+
+
+def _pod_ready(pod: dict) -> bool:
+    conditions = pod.get("status", {}).get("conditions") or []
+    return any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions)
+
+
+class KubeAPIClient:
+    """
+    經 SSH 通道的 Kubernetes API 用戶端（執行緒安全）
+
+    一般請求共用一條保持連線的 HTTPS 連線（依序送出）；watch 會長時間
+    佔用連線，另外開獨立的通道。
+    """
+
+    def __init__(
+        self,
+        open_channel: Callable[[], Channel],
+        credentials: KubeCredentials,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        """
+        Args:
+            open_channel: 開啟到 API Server 的 SSH 通道
+            credentials: admin kubeconfig 中的憑證
+            timeout: 單一請求的逾時（秒）
+        """
+        self.credentials = credentials
+        self.timeout = timeout
+        self._open_channel = open_channel
+        self._context = _tls_context(credentials)
+        self._connection: Optional[_TunnelConnection] = None
+        self._lock = threading.Lock()
+        # apiVersion → {kind: (resource, namespaced)}
+        self._resources: dict[str, dict[str, tuple[str, bool]]] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[dict] = None,
+        content_type: str = "application/json",
+        query: Optional[dict] = None,
+    ) -> dict:
+        """
+        送出請求並回傳 JSON 結果
+
+        連線被 API Server 關閉時（例如閒置過久）重新連線再送一次。
+
+        Raises:
+            KubeAPIError: 連線失敗或 API Server 回傳錯誤
+        """
+        if query:
+            path = f"{path}?{urllib.parse.urlencode(query)}"
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Accept": "application/json"}
+        if payload is not None:
+            headers["Content-Type"] = content_type
+
+        with self._lock:
+            for attempt in range(2):
+                if self._connection is None:
+                    self._connection = self._connect(self.timeout)
+                try:
+                    self._connection.request(method, path, payload, headers)
+                    response = self._connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError, SSHCommandError) as e:
+                    self._connection.close()
+                    self._connection = None
+                    if attempt == 1 or isinstance(e, SSHCommandError):
+                        raise KubeAPIError(f"{method} {path} 失敗：{e}") from e
+
+        if response.status >= 400:
+            message = data.decode("utf-8", errors="replace")
+            try:
+                message = json.loads(message).get("message", message)
+            except (ValueError, AttributeError):
+                pass
+            raise KubeAPIError(
+                f"{method} {path} 失敗（{response.status}）：{message}",
+                status=response.status,
+            )
+        return json.loads(data) if data else {}
+
+    def watch(
+        self,
+        path: str,
+        query: dict,
+        timeout: float,
+    ) -> Iterator[dict]:
+        """
+        以獨立連線 watch 資源，逐一產生事件（{"type", "object"}）
+
+        Args:
+            path: 集合路徑（例如 /api/v1/namespaces/x/pods）
+            query: labelSelector、resourceVersion 等查詢參數
+            timeout: watch 最長持續秒數
+        """
+        query = dict(query, watch="1", timeoutSeconds=str(max(1, int(timeout))))
+        connection = self._connect(timeout + self.timeout)
+        try:
+            try:
+                connection.request(
+                    "GET",
+                    f"{path}?{urllib.parse.urlencode(query)}",
+                    headers={"Accept": "application/json"},
+                )
+                response = connection.getresponse()
+            except (http.client.HTTPException, OSError, SSHCommandError) as e:
+                raise KubeAPIError(f"watch {path} 失敗：{e}") from e
+            if response.status >= 400:
+                raise KubeAPIError(
+                    f"watch {path} 失敗（{response.status}）", status=response.status
+                )
+            while True:
+                try:
+                    line = response.readline()
+                except (http.client.HTTPException, OSError):
+                    return
+                if not line:
+                    return
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+
+    def apply(self, obj: dict) -> dict:
+        """
+        以 server-side apply 建立或更新物件
+
+        暫時性錯誤（例如 admission webhook 尚未就緒）與尚未出現在
+        discovery 的新 CRD 會重試到 RETRY_TIMEOUT。
+        """
+        deadline = time.monotonic() + RETRY_TIMEOUT
+        while True:
+            try:
+                return self.request(
+                    "PATCH",
+                    self.object_path(obj),
+                    obj,
+                    content_type="application/apply-patch+yaml",
+                    query={"fieldManager": FIELD_MANAGER, "force": "true"},
+                )
+            except KubeAPIError as e:
+                if e.status == 404:
+                    # 同一份 manifest 剛建立的 CRD 或 namespace 尚未生效
+                    self._resources.pop(obj.get("apiVersion"), None)
+                elif e.status not in RETRYABLE_STATUS:
+                    raise
+                if time.monotonic() > deadline:
+                    raise
+            time.sleep(RETRY_INTERVAL)
+
+    def apply_manifest(self, text: str) -> int:
+        """
+        依序套用多文件 YAML 中的所有物件
+
+        Returns:
+            套用的物件數
+        """
+        try:
+            documents = [doc for doc in yaml.safe_load_all(text) if doc]
+        except yaml.YAMLError as e:
+            raise KubeAPIError(f"manifest 格式錯誤：{e}") from e
+
+        count = 0
+        for document in documents:
+            items = document.get("items", []) if document.get("kind") == "List" else [document]
+            for item in items:
+                self.apply(item)
+                count += 1
+        return count
+
+    def merge_patch(self, path: str, patch: dict) -> dict:
+        return self.request(
+            "PATCH", path, patch, content_type="application/merge-patch+json"
+        )
+
+    def wait_pods_ready(self, namespace: str, selector: str, timeout: float) -> int:
+        """
+        等待符合 selector 的 Pod 全部 Ready（至少一個）
+
+        先列出目前狀態，未就緒時從該 resourceVersion 開始 watch，
+        不必反覆輪詢。
+
+        Returns:
+            Ready 的 Pod 數
+
+        Raises:
+            KubeAPIError: 逾時或請求失敗
+        """
+        path = f"/api/v1/namespaces/{namespace}/pods"
+        deadline = time.monotonic() + timeout
+        while True:
+            listing = self.request("GET", path, query={"labelSelector": selector})
+            pods = {p["metadata"]["name"]: p for p in listing.get("items", [])}
+            if pods and all(_pod_ready(p) for p in pods.values()):
+                return len(pods)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            query = {
+                "labelSelector": selector,
+                "resourceVersion": listing.get("metadata", {}).get("resourceVersion", ""),
+            }
+            for event in self.watch(path, query, remaining):
+                if event.get("type") == "ERROR":
+                    # resourceVersion 過期等情況：重新列出
+                    break
+                pod = event.get("object", {})
+                name = pod.get("metadata", {}).get("name")
+                if event.get("type") == "DELETED":
+                    pods.pop(name, None)
+                else:
+                    pods[name] = pod
+                if pods and all(_pod_ready(p) for p in pods.values()):
+                    return len(pods)
+            if time.monotonic() >= deadline:
+                break
+
+        ready = sum(1 for p in pods.values() if _pod_ready(p))
+        raise KubeAPIError(
+            f"{namespace} 中 {selector} 的 Pod 在 {timeout} 秒內未全部就緒"
+            f"（{ready}/{len(pods)}）"
+        )
+
+    def object_path(self, obj: dict) -> str:
+        """物件的 API 路徑（依 discovery 判斷資源名稱與是否有 namespace）"""
+        try:
+            api_version = obj["apiVersion"]
+            kind = obj["kind"]
+            name = obj["metadata"]["name"]
+        except (KeyError, TypeError) as e:
+            raise KubeAPIError(f"物件缺少 apiVersion / kind / metadata.name：{obj}") from e
+
+        resource, namespaced = self._resource(api_version, kind)
+        base = _api_base(api_version)
+        if namespaced:
+            namespace = obj["metadata"].get("namespace") or "default"
+            return f"{base}/namespaces/{namespace}/{resource}/{name}"
+        return f"{base}/{resource}/{name}"
+
+    def _resource(self, api_version: str, kind: str) -> tuple[str, bool]:
+        """查詢 kind 對應的資源（每個 apiVersion 只查一次 discovery）"""
+        resources = self._resources.get(api_version)
+        if resources is None:
+            try:
+                listing = self.request("GET", _api_base(api_version))
+            except KubeAPIError as e:
+                if e.status != 404:
+                    raise
+                listing = {}
+            resources = {
+                r["kind"]: (r["name"], r["namespaced"])
+                for r in listing.get("resources", [])
+                if "/" not in r["name"]
+            }
+            self._resources[api_version] = resources
+        if kind not in resources:
+            self._resources.pop(api_version, None)
+            raise KubeAPIError(f"API Server 不認得 {api_version} {kind}", status=404)
+        return resources[kind]
+
+    def _connect(self, timeout: float) -> _TunnelConnection:
+        return _TunnelConnection(self._open_channel, self._context, timeout)
+
+
+def open_kube_api(client: K8SSSHClient) -> KubeAPIClient:
+    """
+    讀取 Primary Master 的 admin kubeconfig 並建立 API 用戶端
+
+    Raises:
+        SSHCommandError: 無法讀取 kubeconfig
+        KubeAPIError: kubeconfig 格式不符
+    """
+    stdout, stderr, exit_code = client.execute(f"cat {ADMIN_KUBECONFIG}")
+    if exit_code != 0:
+        raise SSHCommandError(f"[{client.node}] 無法讀取 {ADMIN_KUBECONFIG}：{stderr}")
+    return KubeAPIClient(
+        lambda: client.open_tunnel(API_SERVER_HOST, API_SERVER_PORT),
+        parse_kubeconfig(stdout),
+    )
+
+
+def ca_cert_hash(ca_data: bytes) -> str:
+    """kubeadm join 的 --discovery-token-ca-cert-hash（CA 公鑰 SPKI 的 sha256）"""
+    # cryptography 為 paramiko 的相依套件
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+
+    certificate = x509.load_pem_x509_certificate(ca_data)
+    spki = certificate.public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    digest = hashes.Hash(hashes.SHA256())
+    digest.update(spki)
+    return "sha256:" + digest.finalize().hex()
+
+
+def create_join_command(api: KubeAPIClient, endpoint: str, ttl: int) -> str:
+    """
+    建立 bootstrap token 並組出 Worker 的 kubeadm join 命令
+
+    與 kubeadm token create --print-join-command 建立相同內容的 Secret。
+
+    Args:
+        api: API 用戶端
+        endpoint: Control Plane Endpoint（host:port）
+        ttl: token 有效期限（秒）
+    """
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
+    token_id = "".join(secrets.choice(alphabet) for _ in range(6))
+    token_secret = "".join(secrets.choice(alphabet) for _ in range(16))
+    expiration = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    api.request(
+        "POST",
+        "/api/v1/namespaces/kube-system/secrets",
+        {
+            "apiVersion": "v1",
+            "kind": "Secret",
+            "metadata": {"name": f"bootstrap-token-{token_id}", "namespace": "kube-system"},
+            "type": "bootstrap.kubernetes.io/token",
+            "stringData": {
+                "token-id": token_id,
+                "token-secret": token_secret,
+                "expiration": expiration.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "usage-bootstrap-authentication": "true",
+                "usage-bootstrap-signing": "true",
+                "auth-extra-groups": "system:bootstrappers:kubeadm:default-node-token",
+            },
+        },
+    )
+    return (
+        f"kubeadm join {endpoint} --token {token_id}.{token_secret} "
+        f"--discovery-token-ca-cert-hash {ca_cert_hash(api.credentials.ca_data)}"
+    )
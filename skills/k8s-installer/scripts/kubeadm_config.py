@@ -0,0 +1,123 @@
+"""
+kubeadm 設定檔產生
+
+依叢集配置產生 kubeadm init 使用的 ClusterConfiguration、
+KubeProxyConfiguration 與 KubeletConfiguration（Calico eBPF 模式改為以
+InitConfiguration 略過 kube-proxy）。未設定的調校參數不寫入，
+沿用各元件的預設值；鍵依字母排序，相同配置一定得到相同內容，可直接
+與上次套用的設定比對。
+"""
+import difflib
+from typing import Optional
+
+import yaml
+
+from models import ClusterConfig
+
+
+KUBEADM_API_VERSION = "kubeadm.k8s.io/v1beta3"
+KUBE_PROXY_API_VERSION = "kubeproxy.config.k8s.io/v1alpha1"
+KUBELET_API_VERSION = "kubelet.config.k8s.io/v1beta1"
+
+# 此版本起 nftables 模式預設可用，之前的版本需開啟 feature gate
+NFTABLES_GA_MINOR = 31
+
+
+def _string_args(args: dict) -> dict:
+    """extraArgs 只接受字串值，未設定的參數省略"""
+    return {name: str(value) for name, value in args.items() if value is not None}
+
+
+def kubeadm_documents(config: ClusterConfig) -> list[dict]:
+    """
+    產生 kubeadm 設定的各份文件
+
+    Returns:
+        [ClusterConfiguration, KubeProxyConfiguration, KubeletConfiguration]；
+        Calico eBPF 模式為 [InitConfiguration, ClusterConfiguration, KubeletConfiguration]
+    """
+    tuning = config.tuning
+
+    cluster = {
+        "apiVersion": KUBEADM_API_VERSION,
+        "kind": "ClusterConfiguration",
+        "controlPlaneEndpoint": config.control_plane_endpoint(),
+        "networking": {"podSubnet": config.pod_network_cidr},
+    }
+    api_server_args = _string_args(
+        {"max-requests-inflight": tuning.max_requests_inflight}
+    )
+    if api_server_args:
+        cluster["apiServer"] = {"extraArgs": api_server_args}
+    controller_args = _string_args({
+        "kube-api-qps": tuning.controller_manager_qps,
+        "kube-api-burst": tuning.controller_manager_burst,
+    })
+    if controller_args:
+        cluster["controllerManager"] = {"extraArgs": controller_args}
+    etcd_args = _string_args({
+        "quota-backend-bytes": tuning.etcd_quota_bytes,
+        "snapshot-count": tuning.etcd_snapshot_count,
+    })
+    if etcd_args:
+        cluster["etcd"] = {"local": {"extraArgs": etcd_args}}
+
+    proxy = {
+        "apiVersion": KUBE_PROXY_API_VERSION,
+        "kind": "KubeProxyConfiguration",
+        "mode": tuning.proxy_mode,
+    }
+    if tuning.proxy_mode == "ipvs" and config.metallb_ip_range:
+        # MetalLB L2 模式需要 strictARP，直接寫入設定
+        proxy["ipvs"] = {"strictARP": True}
+    minor = config.kubernetes_minor()
+    if tuning.proxy_mode == "nftables" and minor is not None and minor < NFTABLES_GA_MINOR:
+        proxy["featureGates"] = {"NFTablesProxyMode": True}
+
+    kubelet = {
+        "apiVersion": KUBELET_API_VERSION,
+        "kind": "KubeletConfiguration",
+        # 與 containerd 的 SystemdCgroup = true 一致
+        "cgroupDriver": "systemd",
+    }
+    if tuning.serialize_image_pulls is not None:
+        kubelet["serializeImagePulls"] = tuning.serialize_image_pulls
+    if tuning.max_pods is not None:
+        kubelet["maxPods"] = tuning.max_pods
+
+    if config.calico.dataplane == "bpf":
+        # eBPF dataplane 取代 kube-proxy，不安裝 kube-proxy addon
+        init = {
+            "apiVersion": KUBEADM_API_VERSION,
+            "kind": "InitConfiguration",
+            "skipPhases": ["addon/kube-proxy"],
+        }
+        return [init, cluster, kubelet]
+    return [cluster, proxy, kubelet]
+
+
+def render_kubeadm_config(config: ClusterConfig) -> str:
+    """產生 kubeadm 設定檔內容（多文件 YAML）"""
+    return "---\n".join(
+        yaml.safe_dump(document, default_flow_style=False, sort_keys=True)
+        for document in kubeadm_documents(config)
+    ).strip()
+
+
+def diff_kubeadm_config(before: Optional[str], after: str) -> str:
+    """
+    比對兩份 kubeadm 設定
+
+    Returns:
+        unified diff；沒有舊設定時為空字串，內容相同時也為空字串
+    """
+    if before is None:
+        return ""
+    return "".join(
+        difflib.unified_diff(
+            (before + "\n").splitlines(keepends=True),
+            (after + "\n").splitlines(keepends=True),
+            fromfile="applied",
+            tofile="config",
+        )
+    )
@@ -3,30 +3,134 @@
 K8S-Installer CLI
 
 自動化安裝 Kubernetes 叢集的命令列工具。
+
+重量級模組（installer → ssh_client → paramiko、config_loader → yaml）
+只在需要的命令內才匯入，讓 list / info / validate 等命令能快速啟動。
 """
+import functools
 import json
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import click
 
-from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
-from installer import run_installation
 from prompts import (
     collect_cluster_nodes,
     confirm_cluster_config,
+    confirm_new_nodes,
+    show_cluster_status,
     show_error,
+    show_install_plan,
+    show_multi_cluster_report,
+    show_preflight_report,
+    show_progress,
+    show_reconcile_plan,
     show_success,
 )
-from models import ClusterConfig
+from models import ClusterConfig, ExecutionResult
+from parallel import (
+    DEFAULT_MAX_CLUSTERS,
+    DEFAULT_MAX_NODE_OPERATIONS,
+    DEFAULT_MAX_WORKERS,
+)
 
 
 @click.group()
 @click.version_option(version="0.1.0", prog_name="k8s-installer")
-def cli() -> None:
+@click.option(
+    "--daemon", "use_daemon",
+    is_flag=True,
+    default=False,
+    envvar="K8S_INSTALLER_USE_DAEMON",
+    help="透過常駐服務執行（重用已載入的配置與 SSH 連線）",
+)
+@click.pass_context
+def cli(ctx: click.Context, use_daemon: bool) -> None:
     """K8S-Installer - 自動化安裝 Kubernetes 叢集"""
-    pass
+    ctx.obj = {"use_daemon": use_daemon}
+
+
+def _daemon_client(ctx: click.Context):
+    """若要求使用常駐服務，回傳 DaemonClient，否則回傳 None"""
+    if not (ctx.obj or {}).get("use_daemon"):
+        return None
+    from daemon import DaemonClient
+
+    return DaemonClient()
+
+
+def _daemon_error_title(error_type: str) -> str:
+    """將常駐服務回傳的錯誤類型轉換為顯示標題"""
+    return {
+        "ConfigLoadError": "配置載入失敗",
+        "ConfigValidationError": "配置驗證失敗",
+    }.get(error_type, "常駐服務執行失敗")
+
+
+# installer_options 的旗標選項：(選項, 說明)；參數名稱即 K8SInstaller 的選項名稱
+INSTALLER_FLAGS = (
+    ("--upload-scripts", "以 SFTP 上傳腳本（依內容雜湊只傳一次）並在節點上留下執行記錄"),
+    ("--no-diagnostics", "失敗時不自動收集節點日誌"),
+    ("--persistent-shell", "每個節點只開一個常駐 bash 執行所有步驟（profile 載入較慢的節點適用）"),
+    ("--node-agent", "上傳 Python agent 到節點，批次送出步驟並取得結構化結果（節點需有 python3）"),
+    ("--adaptive-concurrency", "依逾時、認證節流與鏡像錯誤自動調整並行數（--max-workers 為上限）"),
+    ("--site-seeds", "每個站點由一個節點下載映像，再分發給同站點的其他節點"),
+    ("--kube-api", "經 SSH 通道直接呼叫 Kubernetes API 套用 manifest、等待就緒與建立 token（不在 Master 上執行 kubectl）"),
+)
+# 建立 Control Plane 的命令（install、install-clusters）另有的旗標選項
+ETCD_FLAGS = (
+    ("--etcd-disk-check", "建立 Control Plane 前量測各 Master 的 etcd 磁碟 fsync 延遲，超過上限時不安裝"),
+    ("--fastest-primary", "以 etcd 磁碟延遲最低的 Master 作為 Primary Master（需設定 load_balancer_ip；隱含 --etcd-disk-check）"),
+)
+
+
+def installer_options(
+    max_workers_help: str = "同時操作的節點數上限",
+    skip_preflight_help: str = "跳過安裝前的節點檢查",
+    etcd_options: bool = False,
+) -> Callable:
+    """
+    install、add-nodes、reconcile、install-clusters 共用的執行選項
+
+    被裝飾的命令改以 options 參數取得要傳給 K8SInstaller 的選項字典
+    （--no-diagnostics 轉為 collect_diagnostics）。
+
+    Args:
+        max_workers_help: --max-workers 的說明
+        skip_preflight_help: --skip-preflight 的說明
+        etcd_options: 是否包含 --etcd-disk-check 與 --fastest-primary
+    """
+    flags = INSTALLER_FLAGS + (ETCD_FLAGS if etcd_options else ())
+    options = [
+        click.option(
+            "--max-workers",
+            type=click.IntRange(min=1),
+            default=DEFAULT_MAX_WORKERS,
+            show_default=True,
+            help=max_workers_help,
+        ),
+        click.option("--skip-preflight", is_flag=True, default=False, help=skip_preflight_help),
+    ] + [
+        click.option(flag, is_flag=True, default=False, help=help_text)
+        for flag, help_text in flags
+    ]
+    names = ["max_workers", "skip_preflight"] + [
+        flag[2:].replace("-", "_") for flag, _ in flags
+    ]
+
+    def decorator(command: Callable) -> Callable:
+        @functools.wraps(command)
+        def wrapper(*args, **kwargs):
+            values = {name: kwargs.pop(name) for name in names}
+            values["collect_diagnostics"] = not values.pop("no_diagnostics")
+            return command(*args, options=values, **kwargs)
+
+        for option in reversed(options):
+            wrapper = option(wrapper)
+        return wrapper
+
+    return decorator
 
 
 @cli.command()
@@ -53,13 +157,36 @@ def cli() -> None:
     default=False,
     help="顯示詳細輸出",
 )
+@installer_options(etcd_options=True)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="只渲染腳本並預估耗時，不連線任何節點（-v 顯示腳本內容）",
+)
+@click.pass_context
 def install(
+    ctx: click.Context,
     config: Optional[Path],
     json_output: bool,
     yes: bool,
     verbose: bool,
+    dry_run: bool,
+    options: dict,
 ) -> None:
     """安裝 Kubernetes 叢集"""
+    from config_loader import ConfigLoadError, ConfigValidationError
+
+    if dry_run:
+        _show_install_plan(config, verbose, json_output, options)
+
+    options = dict(options, verbose=verbose)
+
+    client = _daemon_client(ctx)
+    if client is not None and config and (yes or json_output):
+        # 不需確認時連配置都交由常駐服務解析（已快取則直接重用）
+        _install_via_daemon(client, {"config_path": str(config.resolve())}, options, json_output)
+
     try:
         cluster_config = _get_cluster_config(config)
         
@@ -67,8 +194,20 @@ def install(
             if not confirm_cluster_config(cluster_config):
                 click.echo("已取消安裝")
                 sys.exit(0)
-        
-        result = run_installation(cluster_config, verbose)
+
+        if client is not None:
+            from config_loader import cluster_config_to_dict
+
+            args = (
+                {"config_path": str(config.resolve())}
+                if config
+                else {"params": cluster_config_to_dict(cluster_config)}
+            )
+            _install_via_daemon(client, args, options, json_output)
+
+        from installer import run_installation
+
+        result = run_installation(cluster_config, **options)
         _output_result(result, json_output)
         sys.exit(0 if result.success else 1)
         
@@ -86,9 +225,333 @@ def install(
         sys.exit(1)
 
 
+def _show_install_plan(
+    config: Optional[Path],
+    verbose: bool,
+    json_output: bool,
+    options: dict,
+) -> None:
+    """輸出 dry-run 安裝計畫後結束（options 為 installer_options 收集的選項）"""
+    from config_loader import ConfigLoadError, ConfigValidationError
+    from planner import build_install_plan
+
+    try:
+        cluster_config = _get_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        _handle_error("配置載入失敗", str(e), json_output)
+        sys.exit(1)
+
+    plan = build_install_plan(
+        cluster_config,
+        options["max_workers"],
+        options["skip_preflight"],
+        site_seeds=options["site_seeds"],
+        etcd_disk_check=options["etcd_disk_check"],
+        fastest_primary=options["fastest_primary"],
+    )
+    if json_output:
+        click.echo(
+            json.dumps(plan.to_dict(include_scripts=verbose), ensure_ascii=False, indent=2)
+        )
+    else:
+        show_install_plan(plan, show_scripts=verbose)
+    sys.exit(0)
+
+
+def _install_via_daemon(
+    client,
+    args: dict,
+    options: dict,
+    json_output: bool,
+    op: str = "install",
+) -> None:
+    """透過常駐服務執行安裝，並在本機顯示串流回來的進度"""
+    from daemon import DaemonError
+
+    def on_event(event: dict) -> None:
+        if event.get("event") == "progress":
+            show_progress(event["step"], event["node"], event["status"])
+
+    try:
+        data = client.request(op, dict(args, options=options), on_event)
+    except DaemonError as e:
+        _handle_error(_daemon_error_title(e.error_type), str(e), json_output)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+
+    result = ExecutionResult(**data)
+    _output_result(result, json_output)
+    sys.exit(0 if result.success else 1)
+
+
+@cli.command("add-nodes")
+@click.option(
+    "--config", "-c",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="包含新節點的完整叢集設定檔",
+)
+@click.option(
+    "--node", "hosts",
+    multiple=True,
+    help="要加入的節點 host（可重複）；未指定時與上次套用的節點比對",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出結果",
+)
+@click.option(
+    "--yes", "-y",
+    is_flag=True,
+    default=False,
+    help="跳過確認提示",
+)
+@installer_options(skip_preflight_help="跳過新節點的前置檢查")
+@click.pass_context
+def add_nodes(
+    ctx: click.Context,
+    config: Path,
+    hosts: tuple[str, ...],
+    json_output: bool,
+    yes: bool,
+    options: dict,
+) -> None:
+    """將新節點加入既有叢集（只操作新節點）"""
+    from applied_state import AppliedStateError, resolve_new_nodes
+    from config_loader import ConfigLoadError, ConfigValidationError
+
+    try:
+        cluster_config = _get_cluster_config(config)
+        nodes = resolve_new_nodes(cluster_config, list(hosts))
+        if not nodes:
+            _output_result(
+                ExecutionResult(success=True, message="沒有需要加入的新節點"),
+                json_output,
+            )
+            sys.exit(0)
+
+        if not yes and not json_output:
+            if not confirm_new_nodes(cluster_config, nodes):
+                click.echo("已取消")
+                sys.exit(0)
+
+        client = _daemon_client(ctx)
+        if client is not None:
+            args = {"config_path": str(config.resolve()), "hosts": [n.key() for n in nodes]}
+            _install_via_daemon(client, args, options, json_output, op="add_nodes")
+
+        from installer import run_add_nodes
+
+        result = run_add_nodes(cluster_config, nodes, **options)
+        _output_result(result, json_output)
+        sys.exit(0 if result.success else 1)
+
+    except ConfigLoadError as e:
+        _handle_error("配置載入失敗", str(e), json_output)
+        sys.exit(1)
+    except ConfigValidationError as e:
+        _handle_error("配置驗證失敗", str(e), json_output)
+        sys.exit(1)
+    except AppliedStateError as e:
+        _handle_error("無法決定要加入的節點", str(e), json_output)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+    except Exception as e:
+        _handle_error("未預期的錯誤", str(e), json_output)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--config", "-c",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="目標叢集設定檔",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="只顯示調和計畫，不修改任何節點",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出結果",
+)
+@click.option(
+    "--yes", "-y",
+    is_flag=True,
+    default=False,
+    help="跳過確認提示",
+)
+@installer_options(skip_preflight_help="跳過新節點的前置檢查")
+@click.pass_context
+def reconcile(
+    ctx: click.Context,
+    config: Path,
+    dry_run: bool,
+    json_output: bool,
+    yes: bool,
+    options: dict,
+) -> None:
+    """比對上次套用的狀態，只執行讓叢集符合配置所需的最少步驟"""
+    from applied_state import AppliedStateError
+    from config_loader import ConfigLoadError, ConfigValidationError
+    from reconcile import plan_for_config
+
+    try:
+        cluster_config = _get_cluster_config(config)
+        plan = plan_for_config(cluster_config)
+
+        if json_output and dry_run:
+            click.echo(json.dumps(plan.to_dict(), ensure_ascii=False, indent=2))
+            sys.exit(1 if plan.blockers else 0)
+        if not json_output:
+            show_reconcile_plan(plan)
+        if dry_run or plan.is_empty:
+            if json_output:
+                _output_result(
+                    ExecutionResult(success=True, message="叢集已符合目前配置"),
+                    json_output,
+                )
+            sys.exit(1 if plan.blockers else 0)
+        if plan.blockers:
+            _handle_error(
+                "配置變更無法自動調和", "\n".join(plan.blockers), json_output
+            )
+            sys.exit(1)
+
+        if not yes and not json_output:
+            if not click.confirm("確認執行以上動作？", default=False):
+                click.echo("已取消")
+                sys.exit(0)
+
+        client = _daemon_client(ctx)
+        if client is not None:
+            args = {"config_path": str(config.resolve())}
+            _install_via_daemon(client, args, options, json_output, op="reconcile")
+
+        from installer import run_reconcile
+
+        result = run_reconcile(cluster_config, plan, **options)
+        _output_result(result, json_output)
+        sys.exit(0 if result.success else 1)
+
+    except ConfigLoadError as e:
+        _handle_error("配置載入失敗", str(e), json_output)
+        sys.exit(1)
+    except ConfigValidationError as e:
+        _handle_error("配置驗證失敗", str(e), json_output)
+        sys.exit(1)
+    except AppliedStateError as e:
+        _handle_error("無法調和", str(e), json_output)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+    except Exception as e:
+        _handle_error("未預期的錯誤", str(e), json_output)
+        sys.exit(1)
+
+
+@cli.command("install-clusters")
+@click.argument(
+    "configs",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出結果",
+)
+@click.option(
+    "-y", "--yes",
+    is_flag=True,
+    default=False,
+    help="跳過確認提示",
+)
+@click.option(
+    "--max-clusters",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CLUSTERS,
+    show_default=True,
+    help="同時安裝的叢集數上限",
+)
+@click.option(
+    "--max-node-ops",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_NODE_OPERATIONS,
+    show_default=True,
+    help="所有叢集合計同時執行的節點操作上限",
+)
+@installer_options(max_workers_help="每個叢集同時操作的節點數上限", etcd_options=True)
+def install_clusters(
+    configs: tuple[Path, ...],
+    json_output: bool,
+    yes: bool,
+    max_clusters: int,
+    max_node_ops: int,
+    options: dict,
+) -> None:
+    """並行安裝多個叢集（每個配置檔一個叢集，單一叢集失敗不影響其他叢集）"""
+    from config_loader import ConfigLoadError, ConfigValidationError, load_cluster_config
+
+    clusters: dict[str, ClusterConfig] = {}
+    try:
+        for path in configs:
+            # 以檔名為叢集名稱，重複時改用完整路徑
+            name = path.stem if path.stem not in clusters else str(path)
+            clusters[name] = load_cluster_config(path)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        _handle_error(f"配置載入失敗（{path}）", str(e), json_output)
+        sys.exit(1)
+
+    if not yes and not json_output:
+        for name, cluster_config in clusters.items():
+            click.echo(
+                f"  • {name}：Master {len(cluster_config.master_nodes)} 台、"
+                f"Worker {len(cluster_config.worker_nodes)} 台"
+            )
+        if not click.confirm(f"確認安裝以上 {len(clusters)} 個叢集？", default=False):
+            click.echo("已取消安裝")
+            sys.exit(0)
+
+    from multi_cluster import run_multi_installation
+
+    try:
+        report = run_multi_installation(
+            clusters,
+            max_clusters=max_clusters,
+            max_node_operations=max_node_ops,
+            **options,
+        )
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+
+    if json_output:
+        click.echo(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        show_multi_cluster_report(report)
+    sys.exit(0 if report.success else 1)
+
+
 def _get_cluster_config(config_path: Optional[Path]) -> ClusterConfig:
     """取得叢集配置"""
     if config_path:
+        from config_loader import load_cluster_config
+
         return load_cluster_config(config_path)
     return collect_cluster_nodes()
 
@@ -101,6 +564,8 @@ def _output_result(result, json_output: bool) -> None:
             output["join_command"] = result.join_command
         if result.error:
             output["error"] = result.error
+        if result.diagnostics:
+            output["diagnostics"] = result.diagnostics
         click.echo(json.dumps(output, ensure_ascii=False, indent=2))
     else:
         if result.success:
@@ -109,6 +574,8 @@ def _output_result(result, json_output: bool) -> None:
                 click.echo(f"\n📋 Join 命令：\n{result.join_command}")
         else:
             show_error(result.message, result.error)
+            if result.diagnostics:
+                click.echo(f"\n🩺 診斷資料：{result.diagnostics}")
 
 
 def _handle_interrupt(json_output: bool) -> None:
@@ -212,28 +679,33 @@ def info(skill_name: str, json_output: bool) -> None:
     type=click.Path(exists=True, path_type=Path),
     help="叢集配置檔路徑（YAML 格式）",
 )
-def validate(config: Optional[Path]) -> None:
+@click.pass_context
+def validate(ctx: click.Context, config: Optional[Path]) -> None:
     """驗證叢集配置檔"""
     if not config:
         show_error("請指定配置檔路徑", "使用 -c 或 --config 選項")
         sys.exit(1)
-    
+
+    client = _daemon_client(ctx)
+    if client is not None:
+        from daemon import DaemonError
+
+        try:
+            summary = client.request("validate", {"config_path": str(config.resolve())})
+        except DaemonError as e:
+            show_error(_daemon_error_title(e.error_type), str(e))
+            sys.exit(1)
+        _echo_config_summary(config, summary)
+        return
+
+    from config_loader import (
+        load_cluster_config,
+        ConfigLoadError,
+        ConfigValidationError,
+    )
+
     try:
         cluster_config = load_cluster_config(config)
-        show_success(f"配置檔驗證通過：{config}")
-        
-        click.echo(f"\n叢集配置：")
-        click.echo(f"  Masters: {len(cluster_config.master_nodes)} 個節點")
-        for i, master in enumerate(cluster_config.master_nodes, 1):
-            click.echo(f"    {i}. {master}")
-        click.echo(f"  Workers: {len(cluster_config.worker_nodes)} 個節點")
-        for i, worker in enumerate(cluster_config.worker_nodes, 1):
-            click.echo(f"    {i}. {worker}")
-        click.echo(f"  Control Plane Endpoint: {cluster_config.control_plane_endpoint()}")
-        click.echo(f"  Pod Network CIDR: {cluster_config.pod_network_cidr}")
-        if cluster_config.metallb_ip_range:
-            click.echo(f"  MetalLB IP Range: {cluster_config.metallb_ip_range}")
-        
     except ConfigLoadError as e:
         show_error("配置載入失敗", str(e))
         sys.exit(1)
@@ -241,6 +713,517 @@ def validate(config: Optional[Path]) -> None:
         show_error("配置驗證失敗", str(e))
         sys.exit(1)
 
+    _echo_config_summary(config, cluster_config.summary())
+
+
+def _echo_config_summary(config: Path, summary: dict) -> None:
+    """顯示配置驗證結果摘要"""
+    show_success(f"配置檔驗證通過：{config}")
+
+    click.echo(f"\n叢集配置：")
+    click.echo(f"  Masters: {len(summary['master_nodes'])} 個節點")
+    for i, master in enumerate(summary["master_nodes"], 1):
+        click.echo(f"    {i}. {master}")
+    click.echo(f"  Workers: {len(summary['worker_nodes'])} 個節點")
+    for i, worker in enumerate(summary["worker_nodes"], 1):
+        click.echo(f"    {i}. {worker}")
+    click.echo(f"  Control Plane Endpoint: {summary['control_plane_endpoint']}")
+    click.echo(f"  Pod Network CIDR: {summary['pod_network_cidr']}")
+    if summary.get("metallb_ip_range"):
+        click.echo(f"  MetalLB IP Range: {summary['metallb_ip_range']}")
+    if summary.get("kubernetes_version"):
+        click.echo(f"  Kubernetes Version: {summary['kubernetes_version']}")
+    if summary.get("sites"):
+        click.echo(f"  Sites: {', '.join(summary['sites'])}")
+    if summary.get("tuning"):
+        tuning = ", ".join(f"{k}={v}" for k, v in summary["tuning"].items())
+        click.echo(f"  Tuning: {tuning}")
+    if summary.get("calico"):
+        calico = ", ".join(f"{k}={v}" for k, v in summary["calico"].items())
+        click.echo(f"  Calico: {calico}")
+    if summary.get("containerd"):
+        containerd = summary["containerd"]
+        mirrors = containerd.get("registry_mirrors", {})
+        details = [f"{k}={v}" for k, v in containerd.items() if k != "registry_mirrors"]
+        details += [f"{registry} → {', '.join(urls)}" for registry, urls in mirrors.items()]
+        click.echo(f"  Containerd: {'; '.join(details)}")
+
+
+@cli.command()
+@click.option(
+    "-c", "--config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="叢集配置檔路徑（YAML 格式）",
+)
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    help="同時檢查的節點數上限",
+)
+@click.option(
+    "--etcd-disk-check",
+    is_flag=True,
+    default=False,
+    help="在 Master 上量測 etcd 資料目錄的 fsync 延遲",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出",
+)
+@click.pass_context
+def preflight(
+    ctx: click.Context,
+    config: Path,
+    max_workers: int,
+    etcd_disk_check: bool,
+    json_output: bool,
+) -> None:
+    """並行檢查所有節點是否符合安裝條件（不修改任何節點）"""
+    client = _daemon_client(ctx)
+    try:
+        if client is not None:
+            from daemon import DaemonError
+
+            try:
+                data = client.request(
+                    "preflight",
+                    {
+                        "config_path": str(config.resolve()),
+                        "max_workers": max_workers,
+                        "etcd_disk_check": etcd_disk_check,
+                    },
+                )
+            except DaemonError as e:
+                _handle_error(_daemon_error_title(e.error_type), str(e), json_output)
+                sys.exit(1)
+        else:
+            data = _run_preflight_locally(config, max_workers, etcd_disk_check)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+
+    if json_output:
+        click.echo(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        from models import PreflightReport
+
+        show_preflight_report(PreflightReport.from_dict(data))
+    sys.exit(0 if data["success"] else 1)
+
+
+def _run_preflight_locally(config: Path, max_workers: int, etcd_disk_check: bool) -> dict:
+    """在本行程執行前置檢查（未使用常駐服務時）"""
+    from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
+    from preflight import run_preflight
+    from ssh_client import ConnectionPool
+
+    try:
+        cluster_config = load_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        show_error("配置載入失敗", str(e))
+        sys.exit(1)
+
+    pool = ConnectionPool()
+    try:
+        return run_preflight(
+            cluster_config, pool, max_workers, etcd_disk_check=etcd_disk_check
+        ).to_dict()
+    finally:
+        pool.close_all()
+
+
+@cli.command()
+@click.option(
+    "-c", "--config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="叢集配置檔路徑（YAML 格式）",
+)
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    help="同時探測的節點數上限",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出",
+)
+@click.pass_context
+def status(
+    ctx: click.Context,
+    config: Path,
+    max_workers: int,
+    json_output: bool,
+) -> None:
+    """查詢叢集與所有節點的健康狀態（不修改任何節點）"""
+    client = _daemon_client(ctx)
+    try:
+        if client is not None:
+            from daemon import DaemonError
+
+            try:
+                data = client.request(
+                    "status",
+                    {"config_path": str(config.resolve()), "max_workers": max_workers},
+                )
+            except DaemonError as e:
+                _handle_error(_daemon_error_title(e.error_type), str(e), json_output)
+                sys.exit(1)
+        else:
+            data = _collect_status_locally(config, max_workers)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+
+    if json_output:
+        click.echo(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        from models import ClusterStatus
+
+        show_cluster_status(ClusterStatus.from_dict(data))
+    sys.exit(0 if data["success"] else 1)
+
+
+def _collect_status_locally(config: Path, max_workers: int) -> dict:
+    """在本行程收集叢集狀態（未使用常駐服務時）"""
+    from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
+    from ssh_client import ConnectionPool
+    from status import collect_cluster_status
+
+    try:
+        cluster_config = load_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        show_error("配置載入失敗", str(e))
+        sys.exit(1)
+
+    pool = ConnectionPool()
+    try:
+        return collect_cluster_status(cluster_config, pool, max_workers).to_dict()
+    finally:
+        pool.close_all()
+
+
+@cli.command()
+@click.option(
+    "-c", "--config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="叢集配置檔路徑（YAML 格式）",
+)
+@click.option(
+    "--node", "hosts",
+    multiple=True,
+    help="只收集指定節點（host 或 host:port，可重複指定），預設為全部",
+)
+@click.option(
+    "-o", "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="壓縮檔輸出路徑，預設存放於狀態目錄的 diagnostics/",
+)
+@click.option(
+    "--since",
+    type=click.IntRange(min=1),
+    default=60,
+    show_default=True,
+    help="收集最近幾分鐘的 journal",
+)
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    help="同時收集的節點數上限",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出",
+)
+def diagnose(
+    config: Path,
+    hosts: tuple[str, ...],
+    output: Optional[Path],
+    since: int,
+    max_workers: int,
+    json_output: bool,
+) -> None:
+    """並行收集節點日誌（kubelet、containerd、系統日誌等）為單一壓縮檔"""
+    from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
+    from diagnostics import collect_diagnostics
+    from ssh_client import ConnectionPool
+
+    try:
+        cluster_config = load_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        _handle_error("配置載入失敗", str(e), json_output)
+        sys.exit(1)
+
+    nodes = cluster_config.all_nodes()
+    if hosts:
+        wanted = set(hosts)
+        unknown = wanted - {n.host for n in nodes} - {n.key() for n in nodes}
+        if unknown:
+            _handle_error("節點不在配置中", "、".join(sorted(unknown)), json_output)
+            sys.exit(1)
+        nodes = [n for n in nodes if n.host in wanted or n.key() in wanted]
+
+    pool = ConnectionPool()
+    try:
+        bundle = collect_diagnostics(
+            nodes, pool, output=output, max_workers=max_workers, since_minutes=since
+        )
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+    except OSError as e:
+        _handle_error("無法寫入診斷壓縮檔", str(e), json_output)
+        sys.exit(1)
+    finally:
+        pool.close_all()
+
+    if json_output:
+        click.echo(json.dumps(bundle.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        for node, size in bundle.collected.items():
+            click.echo(f"✅ {node}：{size // 1024} KB")
+        for node, error in bundle.failed.items():
+            click.echo(f"❌ {node}：{error}")
+        if bundle.path:
+            show_success(f"診斷資料已寫入 {bundle.path}（{bundle.duration:.1f} 秒）")
+        else:
+            show_error("未收集到任何節點的診斷資料")
+    sys.exit(0 if bundle.success else 1)
+
+
+@cli.command()
+@click.option(
+    "-c", "--config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="叢集配置檔路徑（YAML 格式）",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="忽略快取，重新收集",
+)
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出",
+)
+@click.pass_context
+def facts(ctx: click.Context, config: Path, refresh: bool, json_output: bool) -> None:
+    """收集所有節點的系統資訊（OS、CPU、記憶體、網路）"""
+    client = _daemon_client(ctx)
+    try:
+        if client is not None:
+            from daemon import DaemonError
+
+            try:
+                data = client.request(
+                    "facts",
+                    {"config_path": str(config.resolve()), "refresh": refresh},
+                )
+            except DaemonError as e:
+                _handle_error(_daemon_error_title(e.error_type), str(e), json_output)
+                sys.exit(1)
+            nodes = data["nodes"]
+        else:
+            nodes = _collect_facts_locally(config)
+    except KeyboardInterrupt:
+        _handle_interrupt(json_output)
+        sys.exit(130)
+
+    if json_output:
+        click.echo(json.dumps({"nodes": nodes}, ensure_ascii=False, indent=2))
+        return
+
+    for entry in nodes:
+        if "error" in entry:
+            click.echo(f"❌ {entry['node']}：{entry['error']}")
+            continue
+        f = entry["facts"]
+        memory_gb = (f.get("memory_kb") or 0) / 1024 / 1024
+        click.echo(
+            f"✅ {entry['node']}：{f.get('hostname')} "
+            f"{f.get('os_id')} {f.get('os_version')} / "
+            f"{f.get('cpus')} CPU / {memory_gb:.1f} GB / "
+            f"{f.get('default_iface')} MTU {f.get('mtu')}"
+        )
+
+
+def _collect_facts_locally(config: Path) -> list[dict]:
+    """在本行程收集 facts（未使用常駐服務時）"""
+    from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
+    from facts import FactsCache, collect_cluster_facts
+    from ssh_client import ConnectionPool
+
+    try:
+        cluster_config = load_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        show_error("配置載入失敗", str(e))
+        sys.exit(1)
+
+    pool = ConnectionPool()
+    try:
+        return collect_cluster_facts(cluster_config.all_nodes(), pool, FactsCache())
+    finally:
+        pool.close_all()
+
+
+@cli.group("host-keys")
+def host_keys_group() -> None:
+    """管理節點的 SSH 主機金鑰記錄"""
+    pass
+
+
+@host_keys_group.command("scan")
+@click.option(
+    "-c", "--config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="叢集配置檔路徑（YAML 格式）",
+)
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    help="同時掃描的節點數上限",
+)
+def host_keys_scan(config: Path, max_workers: int) -> None:
+    """並行取得並記錄尚未記錄的節點主機金鑰"""
+    from config_loader import load_cluster_config, ConfigLoadError, ConfigValidationError
+    from host_keys import SCAN_PINNED, get_host_key_store, scan_host_keys
+
+    try:
+        cluster_config = load_cluster_config(config)
+    except (ConfigLoadError, ConfigValidationError) as e:
+        show_error("配置載入失敗", str(e))
+        sys.exit(1)
+
+    store = get_host_key_store()
+    failed = False
+    for outcome in scan_host_keys(cluster_config.all_nodes(), max_workers, store):
+        if not outcome.ok:
+            failed = True
+            click.echo(f"❌ {outcome.node}：{outcome.error}")
+            continue
+        entry = store.lookup(outcome.node)
+        label = "新記錄" if outcome.result == SCAN_PINNED else "已記錄"
+        click.echo(f"✅ {outcome.node}：{label} {entry['type']} {entry['fingerprint']}")
+    sys.exit(1 if failed else 0)
+
+
+@host_keys_group.command("forget")
+@click.argument("hosts", nargs=-1, required=True)
+@click.pass_context
+def host_keys_forget(ctx: click.Context, hosts: tuple[str, ...]) -> None:
+    """移除節點的主機金鑰記錄（HOST 或 HOST:PORT，節點重新安裝後使用）"""
+    keys = [host if ":" in host else f"{host}:22" for host in hosts]
+    client = _daemon_client(ctx)
+    if client is not None:
+        from daemon import DaemonError
+
+        # 常駐服務持有共用的記錄，須由服務移除才會生效
+        try:
+            removed = client.request("forget_host_keys", {"keys": keys})["removed"]
+        except DaemonError as e:
+            show_error(_daemon_error_title(e.error_type), str(e))
+            sys.exit(1)
+    else:
+        from host_keys import get_host_key_store
+
+        removed = get_host_key_store().forget(keys)
+
+    for key in keys:
+        click.echo(f"{'✅ 已移除' if key in removed else '⚠️  沒有記錄'}：{key}")
+
+
+@cli.group("daemon")
+def daemon_group() -> None:
+    """管理常駐服務（保留配置、facts 與 SSH 連線）"""
+    pass
+
+
+@daemon_group.command("start")
+@click.option(
+    "--foreground",
+    is_flag=True,
+    default=False,
+    help="在前景執行（不轉為背景行程）",
+)
+def daemon_start(foreground: bool) -> None:
+    """啟動常駐服務"""
+    from daemon import DaemonError, get_socket_path, serve, start_background
+
+    try:
+        if foreground:
+            click.echo(f"常駐服務啟動：{get_socket_path()}")
+            serve()
+        else:
+            pid = start_background()
+            show_success(f"常駐服務已啟動（PID {pid}）：{get_socket_path()}")
+    except DaemonError as e:
+        show_error("常駐服務啟動失敗", str(e))
+        sys.exit(1)
+    except KeyboardInterrupt:
+        click.echo("\n常駐服務已停止")
+
+
+@daemon_group.command("stop")
+def daemon_stop() -> None:
+    """停止常駐服務"""
+    from daemon import DaemonClient, DaemonError
+
+    try:
+        DaemonClient().request("shutdown")
+        show_success("常駐服務已停止")
+    except DaemonError as e:
+        show_error("無法停止常駐服務", str(e))
+        sys.exit(1)
+
+
+@daemon_group.command("status")
+@click.option(
+    "--json-output",
+    is_flag=True,
+    default=False,
+    help="以 JSON 格式輸出",
+)
+def daemon_status(json_output: bool) -> None:
+    """顯示常駐服務狀態"""
+    from daemon import DaemonClient, DaemonError
+
+    try:
+        status = DaemonClient().request("ping")
+    except DaemonError as e:
+        _handle_error("常駐服務未執行", str(e), json_output)
+        sys.exit(1)
+
+    if json_output:
+        click.echo(json.dumps(status, ensure_ascii=False, indent=2))
+        return
+    click.echo(f"常駐服務執行中（PID {status['pid']}）")
+    click.echo(f"  執行時間: {status['uptime']} 秒")
+    click.echo(f"  已處理請求: {status['requests']}")
+    click.echo(f"  SSH 連線: {status['ssh_connections']}")
+    click.echo(f"  已快取配置: {status['cached_configs']}")
+
 
 # === Skill Installer 框架介面 ===
 # 當被 skill-installer 呼叫時，會執行此函式
@@ -257,46 +1240,28 @@ def run(params: dict) -> None:
             - pod_network_cidr: str (optional)
             - metallb_ip_range: str (optional)
     """
-    from models import NodeConnection, ClusterConfig
-    from installer import run_installation
+    from config_loader import parse_skill_params
+    from daemon import DaemonClient, daemon_requested
     from prompts import show_success, show_error
     import click
-    
-    # 轉換參數為內部資料結構
-    master_data_list = params.get("master_nodes")
-    if not master_data_list and "control_plane" in params:
-        master_data_list = [params["control_plane"]]
-    if not master_data_list:
-        raise ValueError("缺少 master_nodes 參數")
-
-    masters = []
-    for m_data in master_data_list:
-        masters.append(NodeConnection(
-            host=m_data["host"],
-            port=m_data.get("port", 22),
-            user=m_data["user"],
-            password=m_data.get("password"),
-        ))
-
-    workers = []
-    for w_data in params.get("worker_nodes", params.get("workers", [])):
-        workers.append(NodeConnection(
-            host=w_data["host"],
-            port=w_data.get("port", 22),
-            user=w_data["user"],
-            password=w_data.get("password"),
-        ))
-    
-    cluster_config = ClusterConfig(
-        master_nodes=masters,
-        worker_nodes=workers,
-        load_balancer_ip=params.get("load_balancer_ip"),
-        pod_network_cidr=params.get("pod_network_cidr", "192.168.0.0/16"),
-        metallb_ip_range=params.get("metallb_ip_range"),
-    )
-    
-    # 執行安裝
-    result = run_installation(cluster_config, verbose=True)
+
+    # 設定 K8S_INSTALLER_USE_DAEMON 且服務可用時，交由常駐服務執行
+    client = DaemonClient() if daemon_requested() else None
+    if client is not None and client.is_running():
+        data = client.request(
+            "install",
+            {"params": params, "options": {"verbose": True}},
+            lambda e: show_progress(e["step"], e["node"], e["status"]),
+        )
+        result = ExecutionResult(**data)
+    else:
+        from installer import run_installation
+
+        # 轉換參數為內部資料結構
+        cluster_config = parse_skill_params(params)
+
+        # 執行安裝
+        result = run_installation(cluster_config, verbose=True)
     
     # 輸出結果
     if result.success:
@@ -0,0 +1,127 @@
+"""
+叢集元件 manifest 的本機快取
+
+安裝腳本預設在 Primary Master 上直接下載 Calico / MetalLB 的 manifest。
+同時安裝多個叢集時改由本機的 ManifestCache 統一取得：每個 URL 只下載
+一次（保存在狀態目錄，URL 皆帶版本，內容不會變動），再以 SFTP 傳到各
+叢集的 Primary Master；腳本發現節點上已有對應檔案就不會再下載。
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+from commands import (
+    CALICO_OPERATOR_MANIFEST,
+    METALLB_MANIFEST,
+    REMOTE_MANIFEST_DIR,
+)
+from models import ClusterConfig
+from ssh_client import K8SSSHClient
+from state import get_state_dir
+
+
+# 下載 manifest 的逾時（秒）
+DOWNLOAD_TIMEOUT = 60
+
+
+class ManifestError(Exception):
+    """manifest 無法下載"""
+    pass
+
+
+def manifest_name(url: str) -> str:
+    """節點與本機快取上的檔名（與腳本中 k8s_fetch 的規則一致）"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest() + ".yaml"
+
+
+def cluster_manifests(config: ClusterConfig) -> list[str]:
+    """叢集安裝會用到的 manifest URL"""
+    urls = [CALICO_OPERATOR_MANIFEST]
+    if config.metallb_ip_range:
+        urls.append(METALLB_MANIFEST)
+    return urls
+
+
+class ManifestCache:
+    """
+    行程內共用的 manifest 快取（執行緒安全）
+
+    同一 URL 的並行請求只會下載一次，其餘等待同一份結果。
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = directory or get_state_dir() / "manifests"
+        self._data: dict[str, bytes] = {}
+        self._url_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> bytes:
+        """
+        取得 manifest 內容（記憶體 → 本機檔案 → 下載）
+
+        Raises:
+            ManifestError: 下載失敗
+        """
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+
+        with url_lock:
+            data = self._data.get(url)
+            if data is not None:
+                return data
+
+            path = self.directory / manifest_name(url)
+            try:
+                data = path.read_bytes() or None
+            except OSError:
+                data = None
+            if data is None:
+                data = self._download(url)
+                self._write(path, data)
+            self._data[url] = data
+            return data
+
+    def stage(self, client: K8SSSHClient, urls: list[str]) -> list[str]:
+        """
+        將 manifest 傳到節點上（每個連線每個檔案只傳一次）
+
+        Returns:
+            節點上的路徑
+
+        Raises:
+            ManifestError: 下載失敗
+            SSHCommandError: 上傳失敗
+        """
+        return [
+            client.stage_file(REMOTE_MANIFEST_DIR, manifest_name(url), self.get(url))
+            for url in urls
+        ]
+
+    def _download(self, url: str) -> bytes:
+        try:
+            with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+                data = response.read()
+        except OSError as e:
+            raise ManifestError(f"無法下載 {url}：{e}") from e
+        if not data:
+            raise ManifestError(f"{url} 內容為空")
+        return data
+
+    def _write(self, path: Path, data: bytes) -> None:
+        """寫入本機快取（失敗時只使用記憶體中的內容）"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
@@ -3,8 +3,11 @@ K8S-Installer 資料模型
 
 定義所有資料結構，包含節點連線資訊、叢集配置、執行結果等。
 """
+import re
+import time
 from dataclasses import dataclass, field
 from typing import Optional
+from urllib.parse import urlparse
 from enum import Enum
 
 
@@ -16,13 +19,26 @@ class StepStatus(Enum):
     FAILED = "failed"
 
 
+# SSH 認證方式（未快取成功方式時依此順序嘗試，password 最慢故排最後）
+AUTH_METHODS = ("certificate", "key", "agent", "password")
+
+
 @dataclass
 class NodeConnection:
     """K8S 節點的 SSH 連線資訊"""
     host: str
     user: str
-    password: str
+    password: Optional[str] = None
     port: int = 22
+    key_file: Optional[str] = None
+    key_passphrase: Optional[str] = None
+    certificate_file: Optional[str] = None
+    use_agent: bool = False
+    sudo_password: Optional[str] = None
+    # 拓撲標籤（用於各站點並行上限、站點內映像分發與分散 join）
+    site: Optional[str] = None
+    zone: Optional[str] = None
+    rack: Optional[str] = None
 
     def validate(self) -> list[str]:
         """驗證節點連線資訊，回傳錯誤訊息列表"""
@@ -31,16 +47,220 @@ class NodeConnection:
             errors.append("host 不可為空")
         if not self.user or not self.user.strip():
             errors.append("user 不可為空")
-        if not self.password:
-            errors.append("password 不可為空")
+        if not self.auth_methods():
+            errors.append("需設定 password、key_file 或 use_agent 至少一種認證方式")
+        if self.certificate_file and not self.key_file:
+            errors.append("certificate_file 需搭配 key_file")
         if not (1 <= self.port <= 65535):
             errors.append(f"port 必須在 1-65535 範圍內，目前為 {self.port}")
         return errors
 
+    def auth_methods(self) -> list[str]:
+        """此節點可用的認證方式（依 AUTH_METHODS 順序）"""
+        available = {
+            "certificate": bool(self.key_file and self.certificate_file),
+            "key": bool(self.key_file),
+            "agent": self.use_agent,
+            "password": bool(self.password),
+        }
+        return [method for method in AUTH_METHODS if available[method]]
+
+    def needs_elevation(self) -> bool:
+        """SSH 使用者不是 root，需以 sudo 開啟提升權限的 session"""
+        return self.user != "root"
+
+    def become_password(self) -> Optional[str]:
+        """sudo 密碼（未另外設定時沿用 SSH 密碼；皆無則使用 sudo -n）"""
+        return self.sudo_password or self.password
+
+    def topology(self) -> dict[str, str]:
+        """已設定的拓撲標籤"""
+        labels = {"site": self.site, "zone": self.zone, "rack": self.rack}
+        return {name: value for name, value in labels.items() if value}
+
+    def key(self) -> str:
+        """節點識別鍵（用於比對不同時間的 inventory）"""
+        return f"{self.host}:{self.port}"
+
     def __str__(self) -> str:
         return f"{self.user}@{self.host}:{self.port}"
 
 
+# kube-proxy 代理模式（iptables 為 kube-proxy 預設值）
+PROXY_MODES = ("iptables", "ipvs", "nftables")
+# nftables 模式最早支援的 Kubernetes minor 版本
+NFTABLES_MIN_MINOR = 29
+# etcd 建議的儲存配額上限（8 GiB）
+ETCD_MAX_QUOTA_BYTES = 8 * 1024 ** 3
+
+# Calico dataplane（bpf 會取代 kube-proxy）
+CALICO_DATAPLANES = ("iptables", "bpf")
+# Calico IP Pool 的封裝方式（與 Installation 資源的值相同）
+CALICO_ENCAPSULATIONS = ("VXLAN", "VXLANCrossSubnet", "IPIP", "IPIPCrossSubnet", "None")
+# Pod 網路 MTU 的合理範圍
+CALICO_MTU_RANGE = (576, 9000)
+
+# containerd 內建的 snapshotter
+CONTAINERD_SNAPSHOTTERS = ("overlayfs", "native", "btrfs", "zfs")
+
+# registry 名稱：hostname[:port]，或未個別設定的 registry 共用的 _default
+# （名稱同時是 certs.d 下的目錄名稱）
+REGISTRY_NAME_PATTERN = re.compile(
+    r"(?:_default|[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?"
+    r"(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?)*(?::[0-9]{1,5})?)"
+)
+
+
+def mirror_url_error(url: str) -> Optional[str]:
+    """檢查 registry 鏡像 URL，回傳錯誤原因（有效時為 None）"""
+    if any(c.isspace() or ord(c) < 0x20 or ord(c) == 0x7f or c in "\"\\" for c in url):
+        return "不可包含空白、引號或控制字元"
+    try:
+        parsed = urlparse(url)
+        # 存取 port 才會檢查連接埠格式
+        parsed.port
+    except ValueError as e:
+        return f"無法解析（{e}）"
+    if parsed.scheme not in ("http", "https"):
+        return "必須以 http:// 或 https:// 開頭"
+    if not parsed.hostname:
+        return "缺少主機名稱"
+    return None
+
+
+@dataclass(frozen=True)
+class KubeadmTuning:
+    """大型叢集的效能調校（None 表示沿用各元件的預設值）"""
+    proxy_mode: str = "iptables"
+    # kube-apiserver --max-requests-inflight
+    max_requests_inflight: Optional[int] = None
+    # etcd --quota-backend-bytes 與 --snapshot-count
+    etcd_quota_bytes: Optional[int] = None
+    etcd_snapshot_count: Optional[int] = None
+    # kube-controller-manager --kube-api-qps 與 --kube-api-burst
+    controller_manager_qps: Optional[int] = None
+    controller_manager_burst: Optional[int] = None
+    # kubelet serializeImagePulls 與 maxPods
+    serialize_image_pulls: Optional[bool] = None
+    max_pods: Optional[int] = None
+
+    def validate(self) -> list[str]:
+        """驗證調校參數，回傳錯誤訊息列表"""
+        errors = []
+        if self.proxy_mode not in PROXY_MODES:
+            errors.append(
+                f"tuning.proxy_mode 必須是 {'、'.join(PROXY_MODES)} 之一：{self.proxy_mode}"
+            )
+        for name in (
+            "max_requests_inflight",
+            "etcd_quota_bytes",
+            "etcd_snapshot_count",
+            "controller_manager_qps",
+            "controller_manager_burst",
+            "max_pods",
+        ):
+            value = getattr(self, name)
+            if value is not None and value < 1:
+                errors.append(f"tuning.{name} 必須至少為 1")
+        if self.etcd_quota_bytes is not None and self.etcd_quota_bytes > ETCD_MAX_QUOTA_BYTES:
+            errors.append("tuning.etcd_quota_bytes 不可超過 8 GiB（etcd 建議上限）")
+        if (
+            self.controller_manager_qps is not None
+            and self.controller_manager_burst is not None
+            and self.controller_manager_burst < self.controller_manager_qps
+        ):
+            errors.append("tuning.controller_manager_burst 不可小於 controller_manager_qps")
+        return errors
+
+    def to_dict(self) -> dict:
+        """只包含與預設值不同的欄位（與設定檔格式相同）"""
+        default = KubeadmTuning()
+        return {
+            name: getattr(self, name)
+            for name in self.__dataclass_fields__
+            if getattr(self, name) != getattr(default, name)
+        }
+
+
+@dataclass(frozen=True)
+class CalicoSettings:
+    """Calico 網路設定（None 表示安裝時依節點數與節點資訊決定）"""
+    dataplane: str = "iptables"
+    encapsulation: Optional[str] = None
+    mtu: Optional[int] = None
+
+    def validate(self) -> list[str]:
+        """驗證 Calico 設定，回傳錯誤訊息列表"""
+        errors = []
+        if self.dataplane not in CALICO_DATAPLANES:
+            errors.append(
+                f"calico.dataplane 必須是 {'、'.join(CALICO_DATAPLANES)} 之一：{self.dataplane}"
+            )
+        if self.encapsulation is not None and self.encapsulation not in CALICO_ENCAPSULATIONS:
+            errors.append(
+                f"calico.encapsulation 必須是 {'、'.join(CALICO_ENCAPSULATIONS)} 之一：{self.encapsulation}"
+            )
+        low, high = CALICO_MTU_RANGE
+        if self.mtu is not None and not low <= self.mtu <= high:
+            errors.append(f"calico.mtu 必須介於 {low} 與 {high} 之間")
+        return errors
+
+    def to_dict(self) -> dict:
+        """只包含與預設值不同的欄位（與設定檔格式相同）"""
+        default = CalicoSettings()
+        return {
+            name: getattr(self, name)
+            for name in self.__dataclass_fields__
+            if getattr(self, name) != getattr(default, name)
+        }
+
+
+@dataclass(frozen=True)
+class ContainerdSettings:
+    """containerd 映像下載設定（None 表示沿用 containerd 預設值）"""
+    max_concurrent_downloads: Optional[int] = None
+    snapshotter: Optional[str] = None
+    # ((registry, (鏡像 URL, ...)), ...)，依設定檔順序
+    registry_mirrors: tuple[tuple[str, tuple[str, ...]], ...] = ()
+
+    def validate(self) -> list[str]:
+        """驗證 containerd 設定，回傳錯誤訊息列表"""
+        errors = []
+        if self.max_concurrent_downloads is not None and self.max_concurrent_downloads < 1:
+            errors.append("containerd.max_concurrent_downloads 必須至少為 1")
+        if self.snapshotter is not None and self.snapshotter not in CONTAINERD_SNAPSHOTTERS:
+            errors.append(
+                f"containerd.snapshotter 必須是 {'、'.join(CONTAINERD_SNAPSHOTTERS)} 之一：{self.snapshotter}"
+            )
+        for registry, mirrors in self.registry_mirrors:
+            if not REGISTRY_NAME_PATTERN.fullmatch(registry):
+                errors.append(
+                    f"containerd.registry_mirrors: registry 名稱必須是 hostname[:port] 或 _default：{registry}"
+                )
+            if not mirrors:
+                errors.append(f"containerd.registry_mirrors: {registry} 至少需要一個鏡像")
+            for url in mirrors:
+                reason = mirror_url_error(url)
+                if reason is not None:
+                    errors.append(
+                        f"containerd.registry_mirrors: {registry} 的鏡像 URL {reason}：{url}"
+                    )
+        return errors
+
+    def to_dict(self) -> dict:
+        """只包含與預設值不同的欄位（與設定檔格式相同）"""
+        data = {}
+        if self.max_concurrent_downloads is not None:
+            data["max_concurrent_downloads"] = self.max_concurrent_downloads
+        if self.snapshotter is not None:
+            data["snapshotter"] = self.snapshotter
+        if self.registry_mirrors:
+            data["registry_mirrors"] = {
+                registry: list(mirrors) for registry, mirrors in self.registry_mirrors
+            }
+        return data
+
+
 @dataclass
 class ClusterConfig:
     """K8S 叢集配置"""
@@ -49,6 +269,15 @@ class ClusterConfig:
     load_balancer_ip: Optional[str] = None
     pod_network_cidr: str = "192.168.0.0/16"
     metallb_ip_range: Optional[str] = None
+    kubernetes_version: str = "1.29"
+    # 各站點同時操作的節點數上限（未列出的站點只受 max_workers 限制）
+    site_limits: dict[str, int] = field(default_factory=dict)
+    # kubeadm 設定的效能調校
+    tuning: KubeadmTuning = field(default_factory=KubeadmTuning)
+    # Calico dataplane、封裝與 MTU
+    calico: CalicoSettings = field(default_factory=CalicoSettings)
+    # containerd 的 registry 鏡像與下載設定
+    containerd: ContainerdSettings = field(default_factory=ContainerdSettings)
 
     def validate(self) -> list[str]:
         """驗證叢集配置，回傳錯誤訊息列表"""
@@ -67,6 +296,26 @@ class ClusterConfig:
             if w_errors:
                 errors.extend([f"Worker {i+1}: {e}" for e in w_errors])
 
+        sites = {node.site for node in self.all_nodes()}
+        for site, limit in self.site_limits.items():
+            if site not in sites:
+                errors.append(f"site_limits: 沒有節點位於站點 {site}")
+            if limit < 1:
+                errors.append(f"site_limits: {site} 的上限必須至少為 1")
+
+        errors.extend(self.tuning.validate())
+        minor = self.kubernetes_minor()
+        if self.tuning.proxy_mode == "nftables" and (
+            minor is None or minor < NFTABLES_MIN_MINOR
+        ):
+            errors.append(
+                f"tuning.proxy_mode nftables 需要 Kubernetes 1.{NFTABLES_MIN_MINOR} 以上"
+            )
+        errors.extend(self.calico.validate())
+        if self.calico.dataplane == "bpf" and self.tuning.proxy_mode != "iptables":
+            errors.append("calico.dataplane bpf 會取代 kube-proxy，不可同時設定 tuning.proxy_mode")
+        errors.extend(self.containerd.validate())
+
         return errors
 
     def all_nodes(self) -> list[NodeConnection]:
@@ -81,10 +330,37 @@ class ClusterConfig:
             return f"{self.load_balancer_ip}:6443"
         return f"{self.master_nodes[0].host}:6443"
 
+    def kubernetes_minor(self) -> Optional[int]:
+        """Kubernetes minor 版本（例如 1.29 → 29），無法解析時為 None"""
+        parts = self.kubernetes_version.lstrip("v").split(".")
+        try:
+            return int(parts[1])
+        except (IndexError, ValueError):
+            return None
+
     def primary_master(self) -> NodeConnection:
         """取得初始化用的第一個 Master"""
         return self.master_nodes[0]
 
+    def is_master(self, node: NodeConnection) -> bool:
+        """節點是否為 Master"""
+        return any(m.key() == node.key() for m in self.master_nodes)
+
+    def summary(self) -> dict:
+        """取得配置摘要（不含密碼，用於顯示與 JSON 輸出）"""
+        return {
+            "master_nodes": [str(m) for m in self.master_nodes],
+            "worker_nodes": [str(w) for w in self.worker_nodes],
+            "control_plane_endpoint": self.control_plane_endpoint(),
+            "pod_network_cidr": self.pod_network_cidr,
+            "metallb_ip_range": self.metallb_ip_range,
+            "kubernetes_version": self.kubernetes_version,
+            "sites": sorted({n.site for n in self.all_nodes() if n.site}),
+            "tuning": self.tuning.to_dict(),
+            "calico": self.calico.to_dict(),
+            "containerd": self.containerd.to_dict(),
+        }
+
 
 @dataclass
 class ExecutionResult:
@@ -94,6 +370,7 @@ class ExecutionResult:
     output: Optional[str] = None
     error: Optional[str] = None
     join_command: Optional[str] = None
+    diagnostics: Optional[str] = None
 
     def to_dict(self) -> dict:
         """轉換為字典格式（用於 JSON 輸出）"""
@@ -107,6 +384,8 @@ class ExecutionResult:
             result["error"] = self.error
         if self.join_command:
             result["join_command"] = self.join_command
+        if self.diagnostics:
+            result["diagnostics"] = self.diagnostics
         return result
 
 
@@ -118,20 +397,489 @@ class InstallationStep:
     status: StepStatus = StepStatus.PENDING
     output: Optional[str] = None
     error: Optional[str] = None
+    step_id: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """執行耗時（秒），尚未結束時為 None"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
 
     def mark_running(self) -> None:
         """標記為執行中"""
         self.status = StepStatus.RUNNING
+        self.started_at = time.monotonic()
 
     def mark_success(self, output: str = "") -> None:
         """標記為成功"""
         self.status = StepStatus.SUCCESS
         self.output = output
+        self.finished_at = time.monotonic()
 
     def mark_failed(self, error: str) -> None:
         """標記為失敗"""
         self.status = StepStatus.FAILED
         self.error = error
+        self.finished_at = time.monotonic()
+
+
+@dataclass(frozen=True)
+class RenderedScript:
+    """
+    已渲染的步驟腳本
+
+    digest 為腳本內容的 sha256，同時作為節點上的腳本快取鍵與執行記錄鍵。
+    secret 為 True 的腳本含有 join 憑證，不會寫入節點磁碟。
+    """
+    step_id: str
+    name: str
+    script: str
+    digest: str
+    secret: bool = False
+
+
+@dataclass
+class JoinCredentials:
+    """節點加入叢集所需的憑證（含到期時間，epoch 秒）"""
+    join_command: Optional[str] = None
+    token_expires_at: float = 0.0
+    certificate_key: Optional[str] = None
+    certificate_key_expires_at: float = 0.0
+
+    def token_valid(self, now: float, margin: float = 0.0) -> bool:
+        """join 命令在 margin 秒後是否仍有效"""
+        return bool(self.join_command) and self.token_expires_at - margin > now
+
+    def certificate_key_valid(self, now: float, margin: float = 0.0) -> bool:
+        """certificate key 在 margin 秒後是否仍有效"""
+        return (
+            bool(self.certificate_key)
+            and self.certificate_key_expires_at - margin > now
+        )
+
+    def master_join_command(self) -> Optional[str]:
+        """Control Plane 用的完整 join 命令"""
+        if not self.join_command or not self.certificate_key:
+            return None
+        return (
+            f"{self.join_command} --control-plane "
+            f"--certificate-key {self.certificate_key}"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "join_command": self.join_command,
+            "token_expires_at": self.token_expires_at,
+            "certificate_key": self.certificate_key,
+            "certificate_key_expires_at": self.certificate_key_expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JoinCredentials":
+        return cls(
+            join_command=data.get("join_command"),
+            token_expires_at=float(data.get("token_expires_at", 0.0)),
+            certificate_key=data.get("certificate_key"),
+            certificate_key_expires_at=float(
+                data.get("certificate_key_expires_at", 0.0)
+            ),
+        )
+
+
+class CheckStatus(Enum):
+    """前置檢查結果"""
+    PASS = "pass"
+    WARN = "warn"
+    FAIL = "fail"
+
+
+@dataclass
+class PreflightCheck:
+    """單一前置檢查項目"""
+    name: str
+    status: CheckStatus
+    message: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "status": self.status.value,
+            "message": self.message,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PreflightCheck":
+        return cls(data["name"], CheckStatus(data["status"]), data.get("message", ""))
+
+
+@dataclass
+class DiskLatency:
+    """etcd 資料目錄的 fdatasync 延遲量測結果"""
+    node: str
+    samples: int = 0
+    p50_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "samples": self.samples,
+            "p50_ms": self.p50_ms,
+            "p99_ms": self.p99_ms,
+            "error": self.error,
+        }
+
+
+@dataclass
+class NodePreflightResult:
+    """單一節點的前置檢查結果"""
+    node: str
+    role: str
+    checks: list[PreflightCheck] = field(default_factory=list)
+    facts: dict = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        """沒有任何 FAIL 項目即視為通過"""
+        return all(c.status != CheckStatus.FAIL for c in self.checks)
+
+    def failures(self) -> list[PreflightCheck]:
+        """取得失敗的檢查項目"""
+        return [c for c in self.checks if c.status == CheckStatus.FAIL]
+
+    def to_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "role": self.role,
+            "passed": self.passed,
+            "checks": [c.to_dict() for c in self.checks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NodePreflightResult":
+        return cls(
+            node=data["node"],
+            role=data["role"],
+            checks=[PreflightCheck.from_dict(c) for c in data.get("checks", [])],
+        )
+
+
+@dataclass
+class PreflightReport:
+    """整個叢集的前置檢查報告"""
+    nodes: list[NodePreflightResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return all(n.passed for n in self.nodes)
+
+    def failed_nodes(self) -> list[NodePreflightResult]:
+        """取得未通過的節點"""
+        return [n for n in self.nodes if not n.passed]
+
+    def error_summary(self) -> str:
+        """將失敗項目整理為多行錯誤訊息"""
+        lines = []
+        for result in self.failed_nodes():
+            for check in result.failures():
+                lines.append(f"[{result.node}] {check.name}：{check.message}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "success": self.passed,
+            "duration": round(self.duration, 2),
+            "nodes": [n.to_dict() for n in self.nodes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PreflightReport":
+        return cls(
+            nodes=[NodePreflightResult.from_dict(n) for n in data.get("nodes", [])],
+            duration=data.get("duration", 0.0),
+        )
+
+
+@dataclass
+class NodeStatus:
+    """單一節點的健康狀態（API Server 與 SSH 探測合併）"""
+    node: str
+    role: str
+    reachable: bool = False
+    name: Optional[str] = None
+    ready: Optional[bool] = None
+    kubelet_version: Optional[str] = None
+    conditions: list[str] = field(default_factory=list)
+    kubelet: Optional[str] = None
+    containerd: Optional[str] = None
+    disk_used_pct: Optional[int] = None
+    memory_available_mb: Optional[int] = None
+    pods_not_ready: int = 0
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def healthy(self) -> bool:
+        return not self.problems
+
+    def to_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "role": self.role,
+            "healthy": self.healthy,
+            "reachable": self.reachable,
+            "name": self.name,
+            "ready": self.ready,
+            "kubelet_version": self.kubelet_version,
+            "conditions": self.conditions,
+            "kubelet": self.kubelet,
+            "containerd": self.containerd,
+            "disk_used_pct": self.disk_used_pct,
+            "memory_available_mb": self.memory_available_mb,
+            "pods_not_ready": self.pods_not_ready,
+            "problems": self.problems,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NodeStatus":
+        fields = dict(data)
+        fields.pop("healthy", None)
+        return cls(**fields)
+
+
+@dataclass
+class ClusterStatus:
+    """整個叢集的健康狀態"""
+    nodes: list[NodeStatus] = field(default_factory=list)
+    api_error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.api_error is None and all(n.healthy for n in self.nodes)
+
+    def to_dict(self) -> dict:
+        return {
+            "success": self.healthy,
+            "api_error": self.api_error,
+            "duration": round(self.duration, 2),
+            "nodes": [n.to_dict() for n in self.nodes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClusterStatus":
+        return cls(
+            nodes=[NodeStatus.from_dict(n) for n in data.get("nodes", [])],
+            api_error=data.get("api_error"),
+            duration=data.get("duration", 0.0),
+        )
+
+
+@dataclass
+class PlannedStep:
+    """dry-run 計畫中的單一步驟"""
+    step_id: str
+    name: str
+    node: str
+    estimate: float
+    samples: int = 0
+    script: Optional[str] = None
+
+    def to_dict(self, include_script: bool = False) -> dict:
+        data = {
+            "step_id": self.step_id,
+            "name": self.name,
+            "node": self.node,
+            "estimate": round(self.estimate, 1),
+            "samples": self.samples,
+        }
+        if include_script and self.script is not None:
+            data["script"] = self.script
+        return data
+
+
+@dataclass
+class PlanPhase:
+    """
+    dry-run 計畫中的階段
+
+    chains 中的每條鏈依序執行；不同鏈之間並行，最多同時 max_workers 條。
+    """
+    name: str
+    chains: list[list[PlannedStep]] = field(default_factory=list)
+    max_workers: int = 1
+    estimate: float = 0.0
+    critical_chain: list[PlannedStep] = field(default_factory=list)
+
+    def steps(self) -> list[PlannedStep]:
+        return [step for chain in self.chains for step in chain]
+
+    def to_dict(self, include_script: bool = False) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "estimate": round(self.estimate, 1),
+            "steps": [s.to_dict(include_script) for s in self.steps()],
+        }
+
+
+@dataclass
+class InstallPlan:
+    """dry-run 安裝計畫與預估耗時"""
+    phases: list[PlanPhase] = field(default_factory=list)
+    max_workers: int = 1
+    # kubeadm init 使用的設定，以及與上次套用的設定的差異
+    kubeadm_config: str = ""
+    kubeadm_config_diff: str = ""
+    # 是否有上次套用的 kubeadm 設定可供比對
+    kubeadm_config_applied: bool = False
+    # Calico 設定摘要（dataplane、封裝、MTU、預估 Typha 副本數）
+    calico: dict = field(default_factory=dict)
+    # Primary Master 可能因 --fastest-primary 改變時的說明
+    primary_note: str = ""
+
+    @property
+    def estimate(self) -> float:
+        """預估總耗時（秒），各階段依序執行"""
+        return sum(phase.estimate for phase in self.phases)
+
+    def critical_path(self) -> list[PlannedStep]:
+        """決定總耗時的步驟序列"""
+        return [step for phase in self.phases for step in phase.critical_chain]
+
+    def to_dict(self, include_scripts: bool = False) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "estimate": round(self.estimate, 1),
+            "phases": [p.to_dict(include_scripts) for p in self.phases],
+            "critical_path": [
+                {"step_id": s.step_id, "node": s.node, "estimate": round(s.estimate, 1)}
+                for s in self.critical_path()
+            ],
+            "kubeadm_config": self.kubeadm_config,
+            "kubeadm_config_diff": self.kubeadm_config_diff,
+            "calico": self.calico,
+            "primary_note": self.primary_note,
+        }
+
+
+class ReconcileActionKind(Enum):
+    """調和動作類型"""
+    ADD = "add"
+    REMOVE = "remove"
+    RERUN = "rerun"
+
+
+@dataclass
+class ReconcileAction:
+    """調和計畫中的單一動作"""
+    kind: ReconcileActionKind
+    node: str
+    role: str
+    step: Optional[str] = None
+    reason: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind.value,
+            "node": self.node,
+            "role": self.role,
+            "step": self.step,
+            "reason": self.reason,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReconcileAction":
+        return cls(
+            kind=ReconcileActionKind(data["kind"]),
+            node=data["node"],
+            role=data["role"],
+            step=data.get("step"),
+            reason=data.get("reason", ""),
+        )
+
+
+@dataclass
+class ReconcilePlan:
+    """新配置與已套用狀態的差異，以及需要執行的最少動作"""
+    actions: list[ReconcileAction] = field(default_factory=list)
+    blockers: list[str] = field(default_factory=list)
+    notes: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.actions and not self.blockers
+
+    def of_kind(self, kind: ReconcileActionKind) -> list[ReconcileAction]:
+        """取得指定類型的動作"""
+        return [a for a in self.actions if a.kind == kind]
+
+    def to_dict(self) -> dict:
+        return {
+            "actions": [a.to_dict() for a in self.actions],
+            "blockers": self.blockers,
+            "notes": self.notes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReconcilePlan":
+        return cls(
+            actions=[ReconcileAction.from_dict(a) for a in data.get("actions", [])],
+            blockers=list(data.get("blockers", [])),
+            notes=list(data.get("notes", [])),
+        )
+
+
+@dataclass
+class DiagnosticsBundle:
+    """診斷資料收集結果"""
+    path: Optional[str] = None
+    collected: dict[str, int] = field(default_factory=dict)
+    failed: dict[str, str] = field(default_factory=dict)
+    duration: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.path is not None and not self.failed
+
+    def to_dict(self) -> dict:
+        return {
+            "success": self.success,
+            "path": self.path,
+            "collected": self.collected,
+            "failed": self.failed,
+            "duration": round(self.duration, 2),
+        }
+
+
+@dataclass
+class MultiClusterReport:
+    """多叢集安裝的彙整結果（以叢集名稱為鍵）"""
+    results: dict[str, ExecutionResult] = field(default_factory=dict)
+    duration: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return bool(self.results) and all(r.success for r in self.results.values())
+
+    def succeeded(self) -> list[str]:
+        return [name for name, r in self.results.items() if r.success]
+
+    def failed(self) -> list[str]:
+        return [name for name, r in self.results.items() if not r.success]
+
+    def to_dict(self) -> dict:
+        return {
+            "success": self.success,
+            "duration": round(self.duration, 2),
+            "succeeded": len(self.succeeded()),
+            "failed": len(self.failed()),
+            "clusters": {name: r.to_dict() for name, r in self.results.items()},
+        }
 
 
 @dataclass
@@ -150,5 +898,6 @@ class SkillDefinition:
     name: str
     description: str
     version: str
+    author: str = ""
     parameters: list[SkillParameter] = field(default_factory=list)
     entrypoint: str = "main.py"
@@ -0,0 +1,83 @@
+"""
+多叢集並行安裝
+
+一次安裝多個彼此獨立的叢集（例如大量相同規格的邊緣叢集）：叢集之間
+並行執行，所有叢集的安裝步驟共用同一個全域並行上限，manifest 只下載
+一次後傳到各叢集（腳本渲染、主機金鑰與認證方式本來就是行程內共用）。
+單一叢集失敗只記錄在該叢集的結果中，不影響其他叢集。
+"""
+import threading
+import time
+from typing import Optional
+
+from installer import K8SInstaller, ProgressCallback
+from manifests import ManifestCache
+from models import ClusterConfig, ExecutionResult, MultiClusterReport
+from parallel import DEFAULT_MAX_CLUSTERS, DEFAULT_MAX_NODE_OPERATIONS
+from prompts import show_progress
+from timings import StepTimings
+
+
+def run_multi_installation(
+    clusters: dict[str, ClusterConfig],
+    max_clusters: int = DEFAULT_MAX_CLUSTERS,
+    max_node_operations: int = DEFAULT_MAX_NODE_OPERATIONS,
+    progress: Optional[ProgressCallback] = None,
+    manifest_cache: Optional[ManifestCache] = None,
+    **options,
+) -> MultiClusterReport:
+    """
+    並行安裝多個叢集
+
+    Args:
+        clusters: 叢集名稱對應的配置
+        max_clusters: 同時安裝的叢集數上限
+        max_node_operations: 所有叢集合計同時執行的節點操作上限
+        progress: 進度回報函式（節點前加上叢集名稱），預設輸出到終端機
+        manifest_cache: 共用的 manifest 快取，預設建立新的快取
+        options: 其餘傳給 K8SInstaller 的選項（max_workers、skip_preflight 等）
+
+    Returns:
+        MultiClusterReport（每個叢集的 ExecutionResult）
+    """
+    started = time.monotonic()
+    progress = progress or show_progress
+    node_slots = threading.BoundedSemaphore(max_node_operations)
+    manifest_cache = manifest_cache or ManifestCache()
+    # 所有叢集共用同一份耗時記錄，各自寫回時不會覆蓋其他叢集的樣本
+    timings = StepTimings()
+
+    def install(name: str, config: ClusterConfig) -> ExecutionResult:
+        def report(step_name: str, node: str, status: str) -> None:
+            progress(step_name, f"{name}/{node}", status)
+
+        installer = K8SInstaller(
+            config,
+            progress=report,
+            node_slots=node_slots,
+            manifest_cache=manifest_cache,
+            timings=timings,
+            **options,
+        )
+        try:
+            return installer.install()
+        except Exception as e:
+            # 預期外的錯誤只影響此叢集
+            return ExecutionResult(
+                success=False, message="安裝失敗", error=f"{type(e).__name__}: {e}"
+            )
+
+    results: dict[str, ExecutionResult] = {}
+    if clusters:
+        # 延遲匯入：與 parallel 相同，只在實際並行時才載入
+        from concurrent.futures import ThreadPoolExecutor
+
+        workers = max(1, min(max_clusters, len(clusters)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(install, name, config)
+                for name, config in clusters.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+
+    return MultiClusterReport(results=results, duration=time.monotonic() - started)
@@ -0,0 +1,199 @@
+"""
+節點端 agent（上傳到節點後以 python3 執行，只使用標準函式庫）
+
+透過 SSH channel 的 stdin / stdout 交換訊息：每則訊息為 4 bytes
+big-endian 長度加上 UTF-8 JSON。請求帶有 id，agent 依序處理並回傳
+同 id 的 result / error，batch 執行期間另送出 event 回報每個項目的
+進度；呼叫端可連續送出多個請求而不必等待回應。
+
+須相容節點上較舊的 Python 3（3.6 起），不使用 dataclass 與 walrus。
+"""
+import base64
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct(">I")
+# 單一訊息上限，避免損毀的長度欄位讓 agent 配置過大記憶體
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def read_message(stream):
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError("message too large: %d" % length)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def write_message(stream, message):
+    payload = json.dumps(message).encode("utf-8")
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def op_ping(request, emit):
+    return {
+        "version": PROTOCOL_VERSION,
+        "python": sys.version.split()[0],
+        "hostname": socket.gethostname(),
+        "pid": os.getpid(),
+    }
+
+
+def op_run(request, emit):
+    started = time.time()
+    proc = subprocess.Popen(
+        ["bash", "-c", request["command"]],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=request.get("timeout"))
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate()
+        stderr += b"\ntimeout after %ds" % request["timeout"]
+    return {
+        "stdout": stdout.decode("utf-8", "replace"),
+        "stderr": stderr.decode("utf-8", "replace"),
+        "exit_code": proc.returncode,
+        "duration": round(time.time() - started, 3),
+    }
+
+
+def op_put(request, emit):
+    path = request["path"]
+    data = base64.b64decode(request["data"])
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".put.", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, int(request.get("mode", "0644"), 8))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return {"path": path, "size": len(data)}
+
+
+def op_get(request, emit):
+    max_bytes = int(request.get("max_bytes", 1024 * 1024))
+    with open(request["path"], "rb") as f:
+        data = f.read(max_bytes + 1)
+    return {
+        "data": base64.b64encode(data[:max_bytes]).decode("ascii"),
+        "truncated": len(data) > max_bytes,
+    }
+
+
+def op_join_credentials(request, emit):
+    """產生 join 命令及（或）certificate key，直接回傳欄位"""
+    result = {}
+    if request.get("upload_certs"):
+        output = _check_output(["kubeadm", "init", "phase", "upload-certs", "--upload-certs"])
+        result["certificate_key"] = output.strip().splitlines()[-1].strip()
+    if request.get("create_token"):
+        output = _check_output([
+            "kubeadm", "token", "create",
+            "--ttl", request.get("token_ttl", "24h"),
+            "--print-join-command",
+        ])
+        result["join_command"] = output.strip()
+    return result
+
+
+def op_batch(request, emit):
+    """依序執行多個請求；stop_on_error 時第一個失敗後其餘標記為 skipped"""
+    results = []
+    failed = False
+    for index, item in enumerate(request["items"]):
+        if failed and request.get("stop_on_error", True):
+            results.append({"status": "skipped"})
+            continue
+        emit({"index": index, "status": "running"})
+        try:
+            result = dispatch(item, emit)
+            ok = result.get("exit_code", 0) == 0
+            results.append(dict(result, status="success" if ok else "failed"))
+        except Exception as e:
+            ok = False
+            results.append({"status": "failed", "error": "%s: %s" % (type(e).__name__, e)})
+        emit({"index": index, "status": results[-1]["status"], "result": results[-1]})
+        failed = failed or not ok
+    return {"results": results}
+
+
+def _check_output(args):
+    proc = subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError("%s failed: %s" % (" ".join(args[:3]), stderr.decode("utf-8", "replace")))
+    return stdout.decode("utf-8", "replace")
+
+
+OPERATIONS = {
+    "ping": op_ping,
+    "run": op_run,
+    "put": op_put,
+    "get": op_get,
+    "join_credentials": op_join_credentials,
+    "batch": op_batch,
+}
+
+
+def dispatch(request, emit):
+    op = OPERATIONS.get(request.get("op"))
+    if op is None:
+        raise ValueError("unsupported op: %s" % request.get("op"))
+    return op(request, emit)
+
+
+def main():
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # 子行程不得寫入協定使用的 stdout
+    sys.stdout = sys.stderr
+
+    while True:
+        request = read_message(stdin)
+        if request is None or request.get("op") == "shutdown":
+            return
+        request_id = request.get("id")
+
+        def emit(event):
+            write_message(stdout, dict(event, id=request_id, type="event"))
+
+        try:
+            result = dispatch(request, emit)
+            write_message(stdout, {"id": request_id, "type": "result", "data": result})
+        except Exception as e:
+            write_message(stdout, {
+                "id": request_id,
+                "type": "error",
+                "message": "%s: %s" % (type(e).__name__, e),
+            })
+
+
+if __name__ == "__main__":
+    main()
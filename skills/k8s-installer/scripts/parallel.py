@@ -0,0 +1,70 @@
+"""
+節點並行執行
+
+以有上限的執行緒池對多個節點同時執行同一個操作。SSH 操作大多在等待
+網路 I/O，執行緒即可有效並行。
+"""
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, TypeVar
+
+from models import NodeConnection
+
+
+# 預設的節點並行數上限
+DEFAULT_MAX_WORKERS = 16
+
+# 多叢集安裝：同時安裝的叢集數上限，以及所有叢集合計的節點操作上限
+DEFAULT_MAX_CLUSTERS = 4
+DEFAULT_MAX_NODE_OPERATIONS = 32
+
+T = TypeVar("T")
+
+
+@dataclass
+class NodeOutcome(Generic[T]):
+    """單一節點的執行結果"""
+    node: NodeConnection
+    result: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_on_nodes(
+    nodes: list[NodeConnection],
+    fn: Callable[[NodeConnection], T],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[NodeOutcome[T]]:
+    """
+    對所有節點並行執行 fn
+
+    單一節點拋出的例外會記錄在該節點的結果中，不影響其他節點。
+
+    Args:
+        nodes: 目標節點
+        fn: 對單一節點執行的函式
+        max_workers: 同時執行的節點數上限
+
+    Returns:
+        與 nodes 順序相同的 NodeOutcome 列表
+    """
+    if not nodes:
+        return []
+
+    def call(node: NodeConnection) -> NodeOutcome[T]:
+        try:
+            return NodeOutcome(node=node, result=fn(node))
+        except Exception as e:
+            return NodeOutcome(node=node, error=e)
+
+    workers = max(1, min(max_workers, len(nodes)))
+    if workers == 1:
+        return [call(node) for node in nodes]
+
+    # 延遲匯入：CLI 只讀取 DEFAULT_MAX_WORKERS 時不需載入 concurrent.futures
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(call, nodes))
@@ -0,0 +1,259 @@
+"""
+安裝計畫（dry-run）
+
+不連線任何節點，依安裝器的實際執行順序渲染每個節點的每個腳本，並以
+歷史步驟耗時預估在指定並行數下的總耗時與關鍵路徑，用來規劃維護時段與
+挑選合適的 --max-workers。
+"""
+import heapq
+from typing import Callable, Optional
+
+from applied_state import load_applied_state
+from calico import calico_summary, resolve_calico, with_calico
+from kubeadm_config import diff_kubeadm_config, render_kubeadm_config
+from models import (
+    ClusterConfig,
+    InstallPlan,
+    NodeConnection,
+    PlanPhase,
+    PlannedStep,
+    RenderedScript,
+)
+from steps import STEP_NAMES, render_cluster_steps, render_node_steps, render_step
+from timings import StepTimings
+from topology import choose_seeds, site_of
+
+
+# 安裝前尚無法取得的 join 憑證，渲染時以預留字串代替
+PLACEHOLDER_TOKEN = "<token>"
+PLACEHOLDER_CA_HASH = "sha256:<ca-cert-hash>"
+PLACEHOLDER_CERTIFICATE_KEY = "<certificate-key>"
+
+
+def build_install_plan(
+    config: ClusterConfig,
+    max_workers: int,
+    skip_preflight: bool = False,
+    timings: Optional[StepTimings] = None,
+    site_seeds: bool = False,
+    etcd_disk_check: bool = False,
+    fastest_primary: bool = False,
+) -> InstallPlan:
+    """
+    產生完整安裝的執行計畫
+
+    階段與 K8SInstaller.install 相同：各階段依序執行，階段內的節點
+    在 max_workers 的限制下並行，同一節點的步驟依序執行。
+
+    Args:
+        config: 叢集配置
+        max_workers: 同時操作的節點數上限
+        skip_preflight: 是否略過前置檢查
+        timings: 歷史步驟耗時，預設讀取狀態目錄中的記錄
+        site_seeds: 是否由各站點的種子節點分發映像（--site-seeds）
+        etcd_disk_check: 是否量測 Master 的 etcd 磁碟延遲（--etcd-disk-check）
+        fastest_primary: 是否以延遲最低的 Master 作為 Primary Master（--fastest-primary）
+
+    Returns:
+        InstallPlan（含每個步驟的渲染腳本與預估耗時）
+    """
+    timings = timings or StepTimings()
+    applied = load_applied_state(config.control_plane_endpoint()) or {}
+    # 安裝前無法取得節點 facts；MTU 沿用上次套用的值，否則由 Calico 自動偵測
+    config = with_calico(config, resolve_calico(config, applied=applied))
+    cp = config.primary_master()
+    masters = config.master_nodes[1:]
+    join_command = (
+        f"kubeadm join {config.control_plane_endpoint()} --token {PLACEHOLDER_TOKEN} "
+        f"--discovery-token-ca-cert-hash {PLACEHOLDER_CA_HASH}"
+    )
+
+    def step(
+        rendered: RenderedScript,
+        node: NodeConnection,
+        name: Optional[str] = None,
+    ) -> PlannedStep:
+        estimate, samples = timings.estimate(rendered.step_id)
+        return PlannedStep(
+            rendered.step_id,
+            name or rendered.name,
+            str(node),
+            estimate,
+            samples,
+            rendered.script,
+        )
+
+    def untracked(step_id: str, node: NodeConnection) -> PlannedStep:
+        """不執行腳本的步驟（前置檢查、取得 Join 命令）"""
+        estimate, samples = timings.estimate(step_id)
+        return PlannedStep(step_id, STEP_NAMES[step_id], str(node), estimate, samples)
+
+    plan = InstallPlan(max_workers=max_workers)
+    plan.kubeadm_config = render_kubeadm_config(config)
+    plan.calico = calico_summary(config)
+    if applied.get("kubeadm_config") is not None:
+        plan.kubeadm_config_applied = True
+        plan.kubeadm_config_diff = diff_kubeadm_config(
+            applied["kubeadm_config"], plan.kubeadm_config
+        )
+
+    if not skip_preflight:
+        plan.phases.append(
+            PlanPhase(
+                "前置檢查",
+                [
+                    [untracked("preflight", n)]
+                    for n in config.all_nodes()
+                ],
+                max_workers,
+            )
+        )
+
+    if etcd_disk_check or fastest_primary:
+        plan.phases.append(
+            PlanPhase(
+                STEP_NAMES["etcd_disk_check"],
+                [[untracked("etcd_disk_check", m)] for m in config.master_nodes],
+                max_workers,
+            )
+        )
+    if fastest_primary and len(config.master_nodes) > 1:
+        if config.load_balancer_ip:
+            plan.primary_note = (
+                f"Primary Master 可能改為 etcd 磁碟延遲最低的 Master，"
+                f"計畫中以 {cp} 顯示"
+            )
+        else:
+            plan.primary_note = (
+                f"未設定 load_balancer_ip，Primary Master 維持 {cp}（只顯示延遲最低的 Master）"
+            )
+
+    node_steps = render_node_steps(config)
+    plan.phases.append(
+        PlanPhase(
+            "前置作業與套件安裝",
+            [
+                [step(rendered, n) for rendered in node_steps]
+                for n in config.all_nodes()
+            ],
+            max_workers,
+        )
+    )
+
+    if site_seeds:
+        _plan_seed_phases(plan, config, step, max_workers)
+
+    cluster_steps = {rendered.step_id: rendered for rendered in render_cluster_steps(config)}
+    init_chain = [
+        step(cluster_steps[step_id], cp) for step_id in ("kubeadm_init", "install_calico")
+    ]
+    init_chain.append(untracked("generate_join", cp))
+    plan.phases.append(PlanPhase("初始化 Control Plane", [init_chain], 1))
+
+    if masters:
+        prepare = render_step("master_prepare", join_command, PLACEHOLDER_CERTIFICATE_KEY)
+        plan.phases.append(
+            PlanPhase(
+                "準備其他 Master",
+                [
+                    [step(prepare, m)]
+                    for m in masters
+                ],
+                max_workers,
+            )
+        )
+        serial = []
+        for index, master in enumerate(masters, start=2):
+            serial.append(step(render_step("master_join"), master))
+            serial.append(
+                step(
+                    render_step("etcd_health_check", index),
+                    cp,
+                    f"{STEP_NAMES['etcd_health_check']}（{index} 個成員）",
+                )
+            )
+        plan.phases.append(PlanPhase("Master 逐台加入 etcd", [serial], 1))
+
+    if config.worker_nodes:
+        worker_join = render_step("worker_join", join_command)
+        plan.phases.append(
+            PlanPhase(
+                "Worker 加入叢集",
+                [
+                    [step(worker_join, w)]
+                    for w in config.worker_nodes
+                ],
+                max_workers,
+            )
+        )
+
+    if "install_metallb" in cluster_steps:
+        metallb = cluster_steps["install_metallb"]
+        plan.phases.append(PlanPhase("安裝 MetalLB", [[step(metallb, cp)]], 1))
+
+    for phase in plan.phases:
+        schedule_phase(phase)
+    return plan
+
+
+def _plan_seed_phases(
+    plan: InstallPlan,
+    config: ClusterConfig,
+    step: Callable[..., PlannedStep],
+    max_workers: int,
+) -> None:
+    """與 K8SInstaller._distribute_images 相同的站點映像分發階段"""
+    seeds = choose_seeds(config)
+    seed_keys = {seed.key() for seed in seeds.values()}
+    seed_images = render_step("seed_images")
+    plan.phases.append(
+        PlanPhase(
+            STEP_NAMES["seed_images"],
+            [[step(seed_images, seed)] for seed in seeds.values()],
+            max_workers,
+        )
+    )
+    peers = [n for n in config.all_nodes() if n.key() not in seed_keys]
+    if peers:
+        chains = []
+        for node in peers:
+            seed = seeds[site_of(node)]
+            chains.append([
+                step(
+                    render_step("fetch_seed_images", seed.host),
+                    node,
+                    f"{STEP_NAMES['fetch_seed_images']}（{seed.host}）",
+                )
+            ])
+        plan.phases.append(
+            PlanPhase(STEP_NAMES["fetch_seed_images"], chains, max_workers)
+        )
+    stop_seed = render_step("stop_seed")
+    plan.phases.append(
+        PlanPhase(
+            STEP_NAMES["stop_seed"],
+            [[step(stop_seed, seed)] for seed in seeds.values()],
+            max_workers,
+        )
+    )
+
+
+def schedule_phase(phase: PlanPhase) -> None:
+    """
+    模擬階段內的並行執行，計算預估耗時與關鍵鏈
+
+    與 ThreadPoolExecutor.map 相同，依序將每條鏈交給最早空出的執行緒。
+    關鍵鏈為最晚結束的執行緒依序執行的所有步驟（節點數超過並行數時，
+    排隊等待的鏈也在關鍵路徑上）。
+    """
+    count = max(1, min(phase.max_workers, len(phase.chains)))
+    workers = [(0.0, index) for index in range(count)]
+    assigned: list[list[PlannedStep]] = [[] for _ in range(count)]
+    for chain in phase.chains:
+        start, index = heapq.heappop(workers)
+        assigned[index].extend(chain)
+        heapq.heappush(workers, (start + sum(s.estimate for s in chain), index))
+
+    finish, index = max(workers)
+    phase.estimate = finish
+    phase.critical_chain = assigned[index]
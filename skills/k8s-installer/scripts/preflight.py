@@ -0,0 +1,293 @@
+"""
+安裝前置檢查
+
+在修改任何節點之前，並行檢查所有節點的 SSH 認證、權限、作業系統、
+CPU / 記憶體、必要 Port 與 DNS，彙整為單一報告。任何節點未通過時，
+安裝流程應在動到第一台機器前就停止。
+"""
+import time
+from collections import Counter
+from typing import Optional
+
+from calico import BPF_MIN_KERNEL, kernel_version
+from disk_bench import latency_check, measure_fsync_latency
+from facts import FACTS_SCRIPT, FactsCache, parse_facts
+from host_keys import scan_host_keys
+from models import (
+    CheckStatus,
+    ClusterConfig,
+    NodeConnection,
+    NodePreflightResult,
+    PreflightCheck,
+    PreflightReport,
+)
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from ssh_client import (
+    ConnectionPool,
+    SSHCommandError,
+    SSHConnectionError,
+    SSHPrivilegeError,
+)
+
+
+# 支援的作業系統（/etc/os-release 的 ID）與最低主版本
+SUPPORTED_OS_IDS = ("ol", "rhel", "rocky", "almalinux", "centos")
+MIN_OS_MAJOR = 9
+
+# kubeadm 的最低需求：Control Plane 至少 2 CPU、約 1.7GB 記憶體
+MIN_CPUS = {"master": 2, "worker": 1}
+MIN_MEMORY_MB = {"master": 1700, "worker": 1024}
+RECOMMENDED_MEMORY_MB = 2048
+
+# 安裝前必須未被佔用的 Port
+CONTROL_PLANE_PORTS = (6443, 2379, 2380, 10250, 10259, 10257)
+WORKER_PORTS = (10250,)
+
+# 用來確認可解析外部網域（下載套件）的主機
+DNS_PROBE_HOST = "pkgs.k8s.io"
+
+
+def get_preflight_script(ports: tuple[int, ...]) -> str:
+    """
+    取得前置檢查腳本（包含 facts 收集）
+
+    Args:
+        ports: 需確認未被佔用的 Port
+    """
+    port_list = " ".join(str(p) for p in ports)
+    return FACTS_SCRIPT + f"""
+echo "uid=$(id -u)"
+echo "sudo_user=${{SUDO_USER:-}}"
+PORTS_IN_USE=""
+for port in {port_list}; do
+  if ss -Htln "sport = :$port" 2>/dev/null | grep -q .; then
+    PORTS_IN_USE="$PORTS_IN_USE $port"
+  fi
+done
+echo "ports_in_use=$(echo $PORTS_IN_USE)"
+getent hosts "$(hostname)" >/dev/null 2>&1 && echo "dns_self=ok" || echo "dns_self=fail"
+getent hosts {DNS_PROBE_HOST} >/dev/null 2>&1 && echo "dns_external=ok" || echo "dns_external=fail"
+"""
+
+
+def evaluate_facts(role: str, facts: dict) -> list[PreflightCheck]:
+    """
+    依節點角色評估前置檢查結果
+
+    Args:
+        role: master 或 worker
+        facts: 前置檢查腳本的輸出
+
+    Returns:
+        檢查項目列表（不含 SSH 連線項目）
+    """
+    return [
+        _check_privilege(facts),
+        _check_os(facts),
+        _check_cpu(role, facts),
+        _check_memory(role, facts),
+        _check_ports(facts),
+        _check_dns(facts),
+    ]
+
+
+def _check_privilege(facts: dict) -> PreflightCheck:
+    # 非 root 使用者的檢查腳本已在 sudo 開啟的 session 中執行
+    if facts.get("uid") == "0":
+        if facts.get("sudo_user"):
+            return PreflightCheck(
+                "權限", CheckStatus.PASS, f"root（由 {facts['sudo_user']} 經 sudo 取得）"
+            )
+        return PreflightCheck("權限", CheckStatus.PASS, "root")
+    return PreflightCheck("權限", CheckStatus.FAIL, "安裝腳本需以 root 執行")
+
+
+def _check_os(facts: dict) -> PreflightCheck:
+    os_id = facts.get("os_id", "")
+    version = facts.get("os_version", "")
+    label = f"{os_id} {version}".strip() or "未知"
+    if os_id not in SUPPORTED_OS_IDS:
+        return PreflightCheck(
+            "作業系統", CheckStatus.FAIL, f"{label} 不是 RHEL 相容系統"
+        )
+    try:
+        major = int(version.split(".")[0])
+    except ValueError:
+        major = 0
+    if major < MIN_OS_MAJOR:
+        return PreflightCheck(
+            "作業系統", CheckStatus.WARN, f"{label}（建議 {MIN_OS_MAJOR}+）"
+        )
+    return PreflightCheck("作業系統", CheckStatus.PASS, label)
+
+
+def _check_cpu(role: str, facts: dict) -> PreflightCheck:
+    cpus = facts.get("cpus") or 0
+    minimum = MIN_CPUS[role]
+    if cpus < minimum:
+        return PreflightCheck(
+            "CPU", CheckStatus.FAIL, f"{cpus} 核，至少需要 {minimum} 核"
+        )
+    return PreflightCheck("CPU", CheckStatus.PASS, f"{cpus} 核")
+
+
+def _check_memory(role: str, facts: dict) -> PreflightCheck:
+    memory_mb = (facts.get("memory_kb") or 0) // 1024
+    if memory_mb < MIN_MEMORY_MB[role]:
+        return PreflightCheck(
+            "記憶體",
+            CheckStatus.FAIL,
+            f"{memory_mb} MB，至少需要 {MIN_MEMORY_MB[role]} MB",
+        )
+    if memory_mb < RECOMMENDED_MEMORY_MB:
+        return PreflightCheck(
+            "記憶體",
+            CheckStatus.WARN,
+            f"{memory_mb} MB（建議 {RECOMMENDED_MEMORY_MB} MB 以上）",
+        )
+    return PreflightCheck("記憶體", CheckStatus.PASS, f"{memory_mb} MB")
+
+
+def _check_ports(facts: dict) -> PreflightCheck:
+    in_use = facts.get("ports_in_use", "").split()
+    if in_use:
+        return PreflightCheck(
+            "Port", CheckStatus.FAIL, f"已被佔用：{', '.join(in_use)}"
+        )
+    return PreflightCheck("Port", CheckStatus.PASS, "必要 Port 皆未被佔用")
+
+
+def _check_dns(facts: dict) -> PreflightCheck:
+    if facts.get("dns_external") != "ok":
+        return PreflightCheck(
+            "DNS", CheckStatus.FAIL, f"無法解析 {DNS_PROBE_HOST}，無法下載套件"
+        )
+    if facts.get("dns_self") != "ok":
+        return PreflightCheck(
+            "DNS", CheckStatus.WARN, f"無法解析本機 hostname {facts.get('hostname')}"
+        )
+    return PreflightCheck("DNS", CheckStatus.PASS, "正常")
+
+
+def check_node(
+    pool: ConnectionPool,
+    node: NodeConnection,
+    role: str,
+) -> NodePreflightResult:
+    """
+    檢查單一節點
+
+    連線或執行失敗時記錄為 SSH 項目失敗，無法以 sudo 取得 root 權限時
+    記錄為權限項目失敗，不拋出例外。
+    """
+    result = NodePreflightResult(node=str(node), role=role)
+    ports = CONTROL_PLANE_PORTS if role == "master" else WORKER_PORTS
+
+    try:
+        stdout, stderr, exit_code = pool.get(node).execute(
+            get_preflight_script(ports)
+        )
+    except SSHPrivilegeError as e:
+        result.checks.append(PreflightCheck("SSH", CheckStatus.PASS, "認證成功"))
+        result.checks.append(PreflightCheck("權限", CheckStatus.FAIL, str(e)))
+        return result
+    except (SSHConnectionError, SSHCommandError) as e:
+        result.checks.append(PreflightCheck("SSH", CheckStatus.FAIL, str(e)))
+        return result
+
+    if exit_code != 0:
+        result.checks.append(
+            PreflightCheck("SSH", CheckStatus.FAIL, f"檢查腳本執行失敗：{stderr}")
+        )
+        return result
+
+    result.checks.append(PreflightCheck("SSH", CheckStatus.PASS, "認證成功"))
+    result.facts = parse_facts(stdout)
+    result.checks.extend(evaluate_facts(role, result.facts))
+    return result
+
+
+def run_preflight(
+    config: ClusterConfig,
+    pool: ConnectionPool,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    facts_cache: Optional[FactsCache] = None,
+    nodes: Optional[list[NodeConnection]] = None,
+    etcd_disk_check: bool = False,
+) -> PreflightReport:
+    """
+    並行檢查叢集節點
+
+    Args:
+        config: 叢集配置
+        pool: SSH 連線池（檢查建立的連線可直接供後續安裝使用）
+        max_workers: 同時檢查的節點數上限
+        facts_cache: 若提供，將收集到的 facts 寫入快取
+        nodes: 只檢查這些節點（例如新加入的節點），預設為全部
+        etcd_disk_check: 是否在 Master 上量測 etcd 資料目錄的 fsync 延遲
+
+    Returns:
+        PreflightReport 檢查報告
+    """
+    started = time.monotonic()
+    targets = nodes if nodes is not None else config.all_nodes()
+    # 第一次接觸的節點先並行記錄主機金鑰（失敗會在連線時回報）
+    scan_host_keys(targets, max_workers)
+
+    def check(node: NodeConnection) -> NodePreflightResult:
+        role = "master" if config.is_master(node) else "worker"
+        result = check_node(pool, node, role)
+        if etcd_disk_check and role == "master" and result.facts:
+            result.checks.append(latency_check(measure_fsync_latency(pool, node)))
+        return result
+
+    outcomes = run_on_nodes(targets, check, max_workers=max_workers)
+
+    report = PreflightReport()
+    for outcome in outcomes:
+        if not outcome.ok:
+            raise outcome.error
+        report.nodes.append(outcome.result)
+        if facts_cache is not None and outcome.result.facts:
+            facts_cache.put(outcome.node, outcome.result.facts)
+
+    _check_duplicate_hostnames(report)
+    if config.calico.dataplane == "bpf":
+        _check_bpf_kernel(report)
+    report.duration = time.monotonic() - started
+    return report
+
+
+def _check_bpf_kernel(report: PreflightReport) -> None:
+    """Calico eBPF dataplane 需要較新的核心"""
+    minimum = ".".join(str(part) for part in BPF_MIN_KERNEL)
+    for result in report.nodes:
+        release = result.facts.get("kernel", "")
+        version = kernel_version(release)
+        if version is None:
+            continue
+        if version < BPF_MIN_KERNEL:
+            result.checks.append(
+                PreflightCheck(
+                    "核心版本",
+                    CheckStatus.FAIL,
+                    f"{release} 不支援 Calico eBPF dataplane（需要 {minimum} 以上）",
+                )
+            )
+
+
+def _check_duplicate_hostnames(report: PreflightReport) -> None:
+    """kubeadm 以 hostname 作為節點名稱，重複時後加入的節點會失敗"""
+    hostnames = Counter(
+        n.facts.get("hostname", "").lower() for n in report.nodes if n.facts
+    )
+    for result in report.nodes:
+        hostname = result.facts.get("hostname", "").lower()
+        if hostname and hostnames[hostname] > 1:
+            result.checks.append(
+                PreflightCheck(
+                    "Hostname",
+                    CheckStatus.FAIL,
+                    f"{hostname} 與其他節點重複，節點名稱必須唯一",
+                )
+            )
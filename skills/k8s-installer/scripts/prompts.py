@@ -5,7 +5,17 @@
 """
 import click
 
-from models import NodeConnection, ClusterConfig
+from models import (
+    CheckStatus,
+    ClusterStatus,
+    InstallPlan,
+    MultiClusterReport,
+    NodeConnection,
+    ClusterConfig,
+    PreflightReport,
+    ReconcileActionKind,
+    ReconcilePlan,
+)
 
 
 def collect_node_info(node_name: str, default_port: int = 22) -> NodeConnection:
@@ -24,13 +34,39 @@ def collect_node_info(node_name: str, default_port: int = 22) -> NodeConnection:
     host = click.prompt("  HostAddr", type=str)
     port = click.prompt("  HostPort", type=int, default=default_port)
     user = click.prompt("  HostUser", type=str)
-    password = click.prompt("  HostPass", type=str, hide_input=True)
-    
+    password = click.prompt(
+        "  HostPass（留空改用 SSH 金鑰）",
+        type=str,
+        hide_input=True,
+        default="",
+        show_default=False,
+    )
+    key_file = None
+    if not password:
+        key_file = click.prompt(
+            "  SSH 私鑰路徑（留空使用 ssh-agent）",
+            type=str,
+            default="",
+            show_default=False,
+        ).strip()
+    sudo_password = None
+    if user.strip() != "root" and not password:
+        sudo_password = click.prompt(
+            "  sudo 密碼（留空使用免密碼 sudo）",
+            type=str,
+            hide_input=True,
+            default="",
+            show_default=False,
+        )
+
     return NodeConnection(
         host=host.strip(),
         port=port,
         user=user.strip(),
-        password=password,
+        password=password or None,
+        key_file=key_file or None,
+        use_agent=not password and not key_file,
+        sudo_password=sudo_password or None,
     )
 
 
@@ -141,6 +177,62 @@ def confirm_cluster_config(config: ClusterConfig) -> bool:
     return click.confirm("確認開始安裝？", default=False)
 
 
+def confirm_new_nodes(config: ClusterConfig, nodes: list[NodeConnection]) -> bool:
+    """
+    顯示要加入既有叢集的節點並確認
+
+    Args:
+        config: 包含新節點的叢集配置
+        nodes: 要加入的節點
+
+    Returns:
+        使用者是否確認
+    """
+    click.echo("\n" + "=" * 50)
+    click.echo(f"➕ 加入叢集 {config.control_plane_endpoint()}")
+    click.echo("=" * 50)
+
+    for i, node in enumerate(nodes):
+        role = "Master" if config.is_master(node) else "Worker"
+        click.echo(f"   {i + 1}. [{role}] {node}")
+
+    click.echo("\n" + "-" * 50)
+    return click.confirm("確認加入以上節點？", default=False)
+
+
+def show_reconcile_plan(plan: ReconcilePlan) -> None:
+    """
+    顯示調和計畫
+
+    Args:
+        plan: ReconcilePlan 物件
+    """
+    labels = {
+        ReconcileActionKind.ADD: "➕ 加入",
+        ReconcileActionKind.REMOVE: "➖ 移除",
+        ReconcileActionKind.RERUN: "🔁 重跑",
+    }
+
+    click.echo("\n" + "=" * 50)
+    click.echo("📋 調和計畫")
+    click.echo("=" * 50)
+
+    if plan.is_empty:
+        click.echo("\n✅ 叢集已符合目前配置，不需要任何動作")
+    for action in plan.actions:
+        step = f" {action.step}" if action.step else ""
+        click.echo(
+            f"   {labels[action.kind]} [{action.role}] {action.node}{step}"
+            f"（{action.reason}）"
+        )
+
+    for blocker in plan.blockers:
+        click.echo(f"   ❌ {blocker}")
+    for note in plan.notes:
+        click.echo(f"   ⚠️  {note}")
+    click.echo("-" * 50)
+
+
 def show_progress(step_name: str, node: str, status: str = "running") -> None:
     """
     顯示安裝進度
@@ -148,17 +240,176 @@ def show_progress(step_name: str, node: str, status: str = "running") -> None:
     Args:
         step_name: 步驟名稱
         node: 執行節點
-        status: 狀態（running, success, failed）
+        status: 狀態（running, success, warning, failed）
     """
     icons = {
         "running": "⏳",
         "success": "✅",
+        "warning": "⚠️ ",
         "failed": "❌",
     }
     icon = icons.get(status, "⏳")
     click.echo(f"{icon} [{node}] {step_name}")
 
 
+def show_preflight_report(report: PreflightReport) -> None:
+    """
+    顯示前置檢查報告
+
+    Args:
+        report: PreflightReport 物件
+    """
+    icons = {
+        CheckStatus.PASS: "✅",
+        CheckStatus.WARN: "⚠️ ",
+        CheckStatus.FAIL: "❌",
+    }
+    click.echo("\n" + "=" * 50)
+    click.echo("🔍 前置檢查報告")
+    click.echo("=" * 50)
+
+    for result in report.nodes:
+        icon = "✅" if result.passed else "❌"
+        click.echo(f"\n{icon} [{result.role}] {result.node}")
+        for check in result.checks:
+            click.echo(f"   {icons[check.status]} {check.name}: {check.message}")
+
+    failed = len(report.failed_nodes())
+    click.echo("\n" + "-" * 50)
+    click.echo(
+        f"共 {len(report.nodes)} 個節點，{failed} 個未通過"
+        f"（耗時 {report.duration:.1f} 秒）"
+    )
+
+
+def show_cluster_status(status: ClusterStatus) -> None:
+    """
+    以表格顯示叢集健康狀態
+
+    Args:
+        status: ClusterStatus 物件
+    """
+    def cell(value, suffix: str = "") -> str:
+        return "-" if value is None else f"{value}{suffix}"
+
+    click.echo("\n" + "=" * 50)
+    click.echo("🩺 叢集狀態")
+    click.echo("=" * 50)
+    if status.api_error:
+        click.echo(f"❌ API Server：{status.api_error}")
+
+    header = (
+        f"   {'NODE':<28} {'ROLE':<7} {'READY':<6} {'KUBELET':<9} "
+        f"{'CONTAINERD':<11} {'DISK':>5} {'MEM AVAIL':>9}"
+    )
+    click.echo("\n" + header)
+    for node in status.nodes:
+        icon = "✅" if node.healthy else "❌"
+        ready = {True: "Yes", False: "No", None: "-"}[node.ready]
+        click.echo(
+            f"{icon} {node.node:<28} {node.role:<7} {ready:<6} "
+            f"{cell(node.kubelet):<9} {cell(node.containerd):<11} "
+            f"{cell(node.disk_used_pct, '%'):>5} {cell(node.memory_available_mb, ' MB'):>9}"
+        )
+        for problem in node.problems:
+            click.echo(f"      ⚠️  {problem}")
+
+    unhealthy = sum(1 for n in status.nodes if not n.healthy)
+    click.echo("\n" + "-" * 50)
+    click.echo(
+        f"共 {len(status.nodes)} 個節點，{unhealthy} 個異常"
+        f"（耗時 {status.duration:.1f} 秒）"
+    )
+
+
+def show_install_plan(plan: InstallPlan, show_scripts: bool = False) -> None:
+    """
+    顯示 dry-run 安裝計畫
+
+    Args:
+        plan: InstallPlan 物件
+        show_scripts: 是否顯示渲染後的腳本（相同腳本只顯示一次）
+    """
+    def minutes(seconds: float) -> str:
+        return f"{seconds / 60:.1f} 分" if seconds >= 60 else f"{seconds:.0f} 秒"
+
+    click.echo("\n" + "=" * 50)
+    click.echo(f"🗺️  安裝計畫（dry-run，並行數 {plan.max_workers}）")
+    click.echo("=" * 50)
+
+    for i, phase in enumerate(plan.phases, 1):
+        nodes = len({step.node for step in phase.steps()})
+        click.echo(
+            f"\n{i}. {phase.name}：{nodes} 個節點，預估 {minutes(phase.estimate)}"
+        )
+        seen = set()
+        for step in phase.steps():
+            if step.step_id in seen:
+                continue
+            seen.add(step.step_id)
+            source = f"歷史 {step.samples} 次" if step.samples else "預設值"
+            click.echo(f"   - {step.name}：{minutes(step.estimate)}（{source}）")
+
+    click.echo("\n🔗 關鍵路徑：")
+    for step in plan.critical_path():
+        click.echo(f"   {step.name} @ {step.node}（{minutes(step.estimate)}）")
+
+    if show_scripts:
+        scripts: dict[tuple[str, str], list[str]] = {}
+        for phase in plan.phases:
+            for step in phase.steps():
+                if step.script is not None:
+                    scripts.setdefault((step.name, step.script), []).append(step.node)
+        for (name, script), nodes in scripts.items():
+            click.echo(f"\n📜 {name}（{len(nodes)} 個節點：{', '.join(nodes)}）")
+            click.echo(script)
+
+    if plan.calico:
+        calico = plan.calico
+        mtu = calico["mtu"] if calico["mtu"] is not None else "安裝時依節點網卡決定"
+        click.echo(
+            f"\n🕸️ Calico：dataplane {calico['dataplane']}、封裝 {calico['encapsulation']}"
+            f"（BGP {'啟用' if calico['bgp'] else '停用'}）、MTU {mtu}、"
+            f"Typha 預估 {calico['typha_replicas']} 個副本"
+        )
+
+    if plan.primary_note:
+        click.echo(f"\n👑 {plan.primary_note}")
+
+    click.echo("\n📄 kubeadm 設定：")
+    if plan.kubeadm_config_diff:
+        click.echo("（與上次套用的設定比對）")
+        click.echo(plan.kubeadm_config_diff.rstrip())
+    elif plan.kubeadm_config_applied:
+        click.echo("（與上次套用的設定相同）")
+    else:
+        click.echo(plan.kubeadm_config)
+
+    click.echo("\n" + "-" * 50)
+    click.echo(f"預估總耗時：{minutes(plan.estimate)}（未修改任何節點）")
+
+
+def show_multi_cluster_report(report: MultiClusterReport) -> None:
+    """
+    顯示多叢集安裝的彙整結果
+
+    Args:
+        report: MultiClusterReport 物件
+    """
+    click.echo("\n📊 多叢集安裝結果：")
+    for name, result in report.results.items():
+        icon = "✅" if result.success else "❌"
+        click.echo(f"  {icon} {name}：{result.message}")
+        if result.error:
+            click.echo(f"      {result.error.splitlines()[0]}")
+        if result.diagnostics:
+            click.echo(f"      🩺 {result.diagnostics}")
+    click.echo(
+        f"\n  成功 {len(report.succeeded())} 個、失敗 {len(report.failed())} 個"
+        f"（{report.duration:.1f} 秒）"
+    )
+
+
 def show_error(message: str, suggestion: str = "") -> None:
     """
     顯示錯誤訊息
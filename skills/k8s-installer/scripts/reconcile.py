@@ -0,0 +1,186 @@
+"""
+叢集調和
+
+比對新的叢集配置與上次套用的狀態，排出讓叢集符合配置所需的最少動作：
+加入新節點、移除（drain）已自 inventory 刪除的節點、重新執行腳本內容
+有變更的步驟。未變更的部分完全不動，重跑即為增量操作。
+"""
+from applied_state import AppliedStateError, applied_settings, load_applied_state
+from calico import resolve_calico, with_calico
+from models import (
+    ClusterConfig,
+    ReconcileAction,
+    ReconcileActionKind,
+    ReconcilePlan,
+)
+from steps import (
+    RERUNNABLE_CLUSTER_STEPS,
+    render_cluster_steps,
+    render_node_steps,
+    step_hashes,
+)
+
+
+# 變更後無法在既有叢集上調和、必須重新安裝的設定
+IMMUTABLE_SETTINGS = {
+    "control_plane_endpoint": "Control Plane Endpoint",
+    "pod_network_cidr": "Pod 網路 CIDR",
+}
+
+# 叢集層級動作（非特定節點）的目標名稱
+CLUSTER_TARGET = "cluster"
+
+
+def plan_for_config(config: ClusterConfig) -> ReconcilePlan:
+    """
+    與此叢集上次套用的狀態比對並產生調和計畫
+
+    Raises:
+        AppliedStateError: 沒有此叢集的套用記錄
+    """
+    applied = load_applied_state(config.control_plane_endpoint())
+    if applied is None:
+        raise AppliedStateError(
+            "找不到此叢集的套用記錄，請先以 install 安裝（或以 add-nodes --node 擴充）"
+        )
+    return plan_reconcile(config, applied)
+
+
+def plan_reconcile(config: ClusterConfig, applied: dict) -> ReconcilePlan:
+    """
+    產生調和計畫
+
+    Args:
+        config: 新的叢集配置
+        applied: load_applied_state 的結果
+
+    Returns:
+        ReconcilePlan；blockers 不為空時不應執行
+    """
+    plan = ReconcilePlan()
+    # 既有叢集沿用上次決定的封裝與 MTU，只有配置中明確變更的值才比對
+    config = with_calico(config, resolve_calico(config, applied=applied))
+    _check_settings(config, applied, plan)
+
+    applied_nodes = {entry["key"]: entry for entry in applied.get("nodes", [])}
+    node_hashes = step_hashes(render_node_steps(config))
+    primary_key = config.primary_master().key()
+
+    for node in config.all_nodes():
+        role = "master" if config.is_master(node) else "worker"
+        entry = applied_nodes.get(node.key())
+        if entry is None:
+            plan.actions.append(
+                ReconcileAction(ReconcileActionKind.ADD, node.key(), role, reason="新節點")
+            )
+            continue
+        if entry.get("role") != role:
+            plan.blockers.append(
+                f"{node.key()} 角色由 {entry.get('role')} 變更為 {role}，"
+                "請先自 inventory 移除並調和後再以新角色加入"
+            )
+            continue
+        _plan_node_reruns(node.key(), role, entry, node_hashes, plan)
+
+    current_keys = {node.key() for node in config.all_nodes()}
+    for key, entry in applied_nodes.items():
+        if key in current_keys:
+            continue
+        if entry.get("role") == "master":
+            plan.blockers.append(
+                f"Master {key} 已自 inventory 移除；Control Plane 縮減需手動移除 "
+                "etcd 成員，不支援自動調和"
+            )
+        else:
+            plan.actions.append(
+                ReconcileAction(
+                    ReconcileActionKind.REMOVE, key, "worker", reason="已自 inventory 移除"
+                )
+            )
+
+    if primary_key not in applied_nodes:
+        plan.blockers.append(
+            f"Primary Master {primary_key} 不在已套用的節點中，無法作為既有叢集的操作節點"
+        )
+
+    _plan_cluster_reruns(config, applied, plan)
+    return plan
+
+
+def _check_settings(config: ClusterConfig, applied: dict, plan: ReconcilePlan) -> None:
+    """檢查叢集層級設定的變更"""
+    before = applied.get("settings")
+    if before is None:
+        plan.notes.append("套用記錄不含叢集設定（舊版記錄），略過設定比對")
+        return
+
+    after = applied_settings(config)
+    for key, label in IMMUTABLE_SETTINGS.items():
+        if before.get(key) != after[key]:
+            plan.blockers.append(
+                f"{label} 由 {before.get(key)} 變更為 {after[key]}，需重新安裝叢集"
+            )
+
+    if before.get("kubernetes_version") != after["kubernetes_version"]:
+        plan.notes.append(
+            f"Kubernetes 版本由 {before.get('kubernetes_version')} 變更為 "
+            f"{after['kubernetes_version']}：只會更新套件來源與套件，"
+            "Control Plane 升級請另以 kubeadm upgrade 執行"
+        )
+    if "tuning" in before and before["tuning"] != after["tuning"]:
+        plan.notes.append(
+            "效能調校設定已變更：既有的 Control Plane、kube-proxy 與 kubelet 設定"
+            "不會自動更新（install --dry-run 可檢視 kubeadm 設定差異）"
+        )
+    if "calico" in before and before["calico"] != after["calico"]:
+        plan.notes.append(
+            "Calico 設定已變更：既有叢集的 Installation 資源不會自動更新，"
+            "dataplane 與封裝的切換請依 Calico 文件手動進行"
+        )
+
+
+def _plan_node_reruns(
+    key: str,
+    role: str,
+    entry: dict,
+    node_hashes: dict[str, str],
+    plan: ReconcilePlan,
+) -> None:
+    """既有節點上腳本內容有變更的步驟"""
+    recorded = entry.get("steps")
+    if recorded is None:
+        plan.notes.append(f"{key} 沒有步驟記錄（舊版記錄），視為已是最新")
+        return
+    for step_id, digest in node_hashes.items():
+        if recorded.get(step_id) != digest:
+            reason = "新步驟" if step_id not in recorded else "腳本內容已變更"
+            plan.actions.append(
+                ReconcileAction(ReconcileActionKind.RERUN, key, role, step_id, reason)
+            )
+
+
+def _plan_cluster_reruns(
+    config: ClusterConfig,
+    applied: dict,
+    plan: ReconcilePlan,
+) -> None:
+    """Control Plane 上腳本內容有變更的叢集層級步驟"""
+    recorded = applied.get("cluster_steps")
+    if recorded is None:
+        return
+    for step_id, digest in step_hashes(render_cluster_steps(config)).items():
+        if recorded.get(step_id) == digest:
+            continue
+        if step_id in RERUNNABLE_CLUSTER_STEPS:
+            plan.actions.append(
+                ReconcileAction(
+                    ReconcileActionKind.RERUN,
+                    CLUSTER_TARGET,
+                    "master",
+                    step_id,
+                    "設定已變更" if step_id in recorded else "新啟用",
+                )
+            )
+        elif not plan.blockers:
+            # 設定未變更但腳本本身更新（例如 CNI 版本），不自動重跑
+            plan.notes.append(f"{step_id} 腳本已更新，既有叢集不會自動重新執行")
@@ -0,0 +1,166 @@
+"""
+節點上的常駐 bash session
+
+每次 exec_command 都會在節點上開新的 session 與 shell（並重新載入
+profile）。RemoteShell 在既有連線上只開一個不載入 profile 的 bash，
+之後每個命令只需寫入一次、讀回一次：命令以 base64 傳入並在 subshell
+中 eval，結束後於 stdout / stderr 各印出一行唯一的結束標記（stdout 的
+標記帶有 exit code），據此切出每個命令的輸出。
+
+SSH 使用者不是 root 時，bash 本身以 sudo 啟動（見 elevation），整個
+session 只認證一次。
+"""
+import base64
+import select
+import threading
+import uuid
+from typing import Optional, Tuple
+
+from paramiko import Channel, Transport
+from paramiko.ssh_exception import SSHException
+
+from elevation import open_elevated_channel
+
+
+# 不載入 profile，補上常見的系統路徑
+SHELL_COMMAND = "exec bash --noprofile --norc"
+ELEVATED_SHELL_COMMAND = "bash --noprofile --norc"
+SHELL_INIT = "export PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin:$PATH\n"
+
+RECV_SIZE = 64 * 1024
+
+
+class RemoteShellError(Exception):
+    """常駐 session 中斷或輸出無法解析（session 已不可再用）"""
+    pass
+
+
+class RemoteShell:
+    """
+    單一節點上的常駐 bash
+
+    同一時間只能執行一個命令；呼叫端可用 try_acquire 判斷是否忙碌。
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        elevate: bool = False,
+        password: Optional[str] = None,
+    ):
+        """
+        Args:
+            transport: 已認證的 SSH transport
+            elevate: 以 sudo 啟動 bash（SSH 使用者不是 root）
+            password: sudo 密碼，未設定時使用 sudo -n
+        """
+        self._transport = transport
+        self._elevate = elevate
+        self._password = password
+        self._channel: Optional[Channel] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._channel is not None and not self._channel.closed
+
+    def try_acquire(self) -> bool:
+        """取得執行權（不等待）；忙碌時回傳 False"""
+        return self._lock.acquire(blocking=False)
+
+    def acquire(self) -> None:
+        """取得執行權（等待其他命令結束）"""
+        self._lock.acquire()
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def run(self, command: str) -> Tuple[str, str, int]:
+        """
+        在 session 中執行命令（呼叫端須已取得執行權）
+
+        命令在 subshell 中執行，stdin 導向 /dev/null：命令中的 exit、
+        set -e 與讀取 stdin 都不會影響 session 本身。
+
+        Returns:
+            Tuple[stdout, stderr, exit_code]
+
+        Raises:
+            RemoteShellError: session 中斷（已關閉，呼叫端可重試於新 session）
+            ElevationError: 無法以 sudo 開啟 session
+        """
+        if not self.is_open:
+            self._open()
+
+        token = f"__K8S_DONE_{uuid.uuid4().hex}__"
+        encoded = base64.b64encode(command.encode("utf-8")).decode("ascii")
+        frame = (
+            f"( eval \"$(printf %s '{encoded}' | base64 -d)\" ) < /dev/null\n"
+            f"printf '\\n%s %d\\n' '{token}' $?\n"
+            f"printf '\\n%s\\n' '{token}' >&2\n"
+        )
+        try:
+            self._channel.sendall(frame.encode("ascii"))
+            stdout, exit_code, stderr = self._read_frame(token)
+        except (OSError, SSHException) as e:
+            self.close()
+            raise RemoteShellError(f"常駐 session 中斷：{e}") from e
+        return stdout, stderr, exit_code
+
+    def close(self) -> None:
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+
+    def _open(self) -> None:
+        try:
+            if self._elevate:
+                channel = open_elevated_channel(
+                    self._transport, ELEVATED_SHELL_COMMAND, self._password
+                )
+            else:
+                channel = self._transport.open_session()
+                channel.exec_command(SHELL_COMMAND)
+            channel.sendall(SHELL_INIT.encode("ascii"))
+        except SSHException as e:
+            raise RemoteShellError(f"無法開啟常駐 session：{e}") from e
+        self._channel = channel
+
+    def _read_frame(self, token: str) -> Tuple[str, int, str]:
+        """讀取直到 stdout 與 stderr 都出現結束標記"""
+        out_marker = f"\n{token} ".encode("ascii")
+        err_marker = f"\n{token}\n".encode("ascii")
+        out, err = bytearray(), bytearray()
+        out_end = err_end = -1
+        out_scanned = err_scanned = 0
+        exit_code: Optional[int] = None
+
+        while exit_code is None or err_end < 0:
+            if not (self._channel.recv_ready() or self._channel.recv_stderr_ready()):
+                if self._channel.exit_status_ready() or self._channel.closed:
+                    self.close()
+                    raise RemoteShellError("常駐 session 已結束")
+                select.select([self._channel], [], [], 1.0)
+                continue
+            if self._channel.recv_ready():
+                out += self._channel.recv(RECV_SIZE)
+            if self._channel.recv_stderr_ready():
+                err += self._channel.recv_stderr(RECV_SIZE)
+
+            # 只搜尋新收到的部分（保留標記長度的重疊）
+            if out_end < 0:
+                out_end = out.find(out_marker, max(0, out_scanned - len(out_marker)))
+                out_scanned = len(out)
+            if out_end >= 0 and exit_code is None:
+                line_end = out.find(b"\n", out_end + len(out_marker))
+                if line_end >= 0:
+                    exit_code = int(out[out_end + len(out_marker):line_end])
+            if err_end < 0:
+                err_end = err.find(err_marker, max(0, err_scanned - len(err_marker)))
+                err_scanned = len(err)
+
+        return (
+            out[:out_end].decode("utf-8", errors="replace"),
+            exit_code,
+            err[:err_end].decode("utf-8", errors="replace"),
+        )
@@ -3,12 +3,19 @@ Skill 載入器
 
 掃描並載入專案中的所有 Skill 定義。
 """
+import hashlib
+import os
+from dataclasses import asdict
 from pathlib import Path
 from typing import Optional
 
-import yaml
-
 from models import SkillDefinition, SkillParameter
+from state import get_state_dir, load_json_state, save_json_state
+
+
+# 索引格式版本，格式變更時遞增以捨棄舊索引
+SKILL_INDEX_VERSION = 1
+SKILL_FILE_NAME = "skill.yaml"
 
 
 class SkillLoadError(Exception):
@@ -29,6 +36,9 @@ def load_skill_definition(skill_path: Path) -> SkillDefinition:
     Raises:
         SkillLoadError: 載入失敗時
     """
+    # 延遲匯入：索引命中時完全不需要 YAML 解析器
+    import yaml
+
     try:
         with open(skill_path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
@@ -64,9 +74,195 @@ def load_skill_definition(skill_path: Path) -> SkillDefinition:
         raise SkillLoadError(f"找不到檔案：{skill_path}")
 
 
+class SkillIndex:
+    """
+    持久化的 Skill 索引
+
+    記錄每個 skill.yaml 的路徑、mtime、大小與解析結果。每次使用時只對
+    檔案做 stat，僅重新解析有變動的檔案，並以名稱對應表提供 O(1) 查詢。
+    """
+
+    def __init__(self, base_path: Path, index_path: Optional[Path] = None):
+        self.base_path = base_path.resolve()
+        self.index_path = index_path or _default_index_path(self.base_path)
+        # skill.yaml 路徑 -> {"mtime_ns", "size", "definition"}
+        self._entries: dict[str, dict] = {}
+        self._by_name: dict[str, str] = {}
+        self._definitions: dict[str, SkillDefinition] = {}
+        self._load()
+
+    def refresh(self) -> None:
+        """掃描基底目錄，僅重新解析新增或變動的 skill.yaml"""
+        seen: dict[str, dict] = {}
+        changed = False
+
+        for skill_file in self._candidate_files():
+            key = str(skill_file)
+            entry = self._entries.get(key)
+            fresh = self._stat_entry(skill_file, entry)
+            if fresh is None:
+                continue
+            if fresh is not entry:
+                changed = True
+            seen[key] = fresh
+
+        if changed or seen.keys() != self._entries.keys():
+            self._entries = seen
+            self._rebuild()
+            self._save()
+
+    def skills(self) -> list[SkillDefinition]:
+        """取得所有成功載入的 Skill（依目錄名稱排序）"""
+        self.refresh()
+        return [
+            self._definition(key)
+            for key in sorted(self._entries)
+            if self._entries[key]["definition"] is not None
+        ]
+
+    def get(self, name: str) -> Optional[SkillDefinition]:
+        """
+        依名稱取得 Skill
+
+        命中索引時只 stat 該檔案；未命中或檔案已變動才做完整掃描。
+        """
+        key = self._by_name.get(name)
+        if key is not None:
+            entry = self._entries[key]
+            if self._stat_entry(Path(key), entry) is entry:
+                return self._definition(key)
+
+        self.refresh()
+        key = self._by_name.get(name)
+        return self._definition(key) if key is not None else None
+
+    def _candidate_files(self) -> list[Path]:
+        """列出基底目錄下各子目錄的 skill.yaml"""
+        try:
+            items = list(os.scandir(self.base_path))
+        except OSError:
+            return []
+        return [
+            Path(item.path) / SKILL_FILE_NAME
+            for item in items
+            if not item.name.startswith(".") and item.is_dir()
+        ]
+
+    def _stat_entry(self, skill_file: Path, entry: Optional[dict]) -> Optional[dict]:
+        """
+        比對檔案狀態
+
+        Returns:
+            未變動時回傳原 entry；變動時回傳重新解析的新 entry；
+            檔案不存在時回傳 None
+        """
+        try:
+            st = skill_file.stat()
+        except OSError:
+            return None
+
+        if (
+            entry is not None
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["size"] == st.st_size
+        ):
+            return entry
+
+        try:
+            definition = asdict(load_skill_definition(skill_file))
+        except SkillLoadError:
+            # 記錄載入失敗的結果，避免每次都重新解析壞掉的檔案
+            definition = None
+
+        self._definitions.pop(str(skill_file), None)
+        return {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "definition": definition,
+        }
+
+    def _definition(self, key: str) -> SkillDefinition:
+        """將索引中的字典還原為 SkillDefinition（結果快取於記憶體）"""
+        cached = self._definitions.get(key)
+        if cached is None:
+            data = dict(self._entries[key]["definition"])
+            data["parameters"] = [
+                SkillParameter(**p) for p in data.get("parameters", [])
+            ]
+            cached = SkillDefinition(**data)
+            self._definitions[key] = cached
+        return cached
+
+    def _rebuild(self) -> None:
+        """重建名稱對應表，同名時以目錄名稱排序較前者為準"""
+        self._by_name = {}
+        for key in sorted(self._entries):
+            definition = self._entries[key]["definition"]
+            if definition is not None:
+                self._by_name.setdefault(definition["name"], key)
+        self._definitions = {
+            k: v for k, v in self._definitions.items() if k in self._entries
+        }
+
+    def _load(self) -> None:
+        """從磁碟載入索引，格式或基底路徑不符時視為空索引"""
+        data = load_json_state(self.index_path)
+        if (
+            isinstance(data, dict)
+            and data.get("version") == SKILL_INDEX_VERSION
+            and data.get("base_path") == str(self.base_path)
+        ):
+            self._entries = data.get("entries", {})
+            self._rebuild()
+
+    def _save(self) -> None:
+        """寫回索引（失敗時忽略，索引僅為加速用途）"""
+        save_json_state(
+            self.index_path,
+            {
+                "version": SKILL_INDEX_VERSION,
+                "base_path": str(self.base_path),
+                "entries": self._entries,
+            },
+        )
+
+
+def _default_index_path(base_path: Path) -> Path:
+    """依基底路徑產生索引檔路徑"""
+    digest = hashlib.sha1(str(base_path).encode("utf-8")).hexdigest()[:12]
+    return get_state_dir() / f"skill-index-{digest}.json"
+
+
+# 同一行程內重用索引物件（例如常駐模式）
+_SKILL_INDEXES: dict[Path, SkillIndex] = {}
+
+
+def get_skill_index(base_path: Optional[Path] = None) -> SkillIndex:
+    """
+    取得指定基底路徑的 Skill 索引
+
+    Args:
+        base_path: 基底路徑，預設為當前目錄的上層
+
+    Returns:
+        SkillIndex 物件
+    """
+    if base_path is None:
+        base_path = Path(__file__).parent.parent
+    base_path = base_path.resolve()
+
+    index = _SKILL_INDEXES.get(base_path)
+    if index is None:
+        index = SkillIndex(base_path)
+        _SKILL_INDEXES[base_path] = index
+    return index
+
+
 def discover_skills(base_path: Optional[Path] = None) -> list[SkillDefinition]:
     """
     掃描並發現所有 Skills
+
+    透過持久化索引進行，只重新解析有變動的 skill.yaml。
     
     Args:
         base_path: 基底路徑，預設為當前目錄的上層
@@ -74,24 +270,7 @@ def discover_skills(base_path: Optional[Path] = None) -> list[SkillDefinition]:
     Returns:
         SkillDefinition 列表
     """
-    if base_path is None:
-        base_path = Path(__file__).parent.parent
-    
-    skills = []
-    
-    # 掃描所有子目錄尋找 skill.yaml
-    for item in base_path.iterdir():
-        if item.is_dir() and not item.name.startswith("."):
-            skill_file = item / "skill.yaml"
-            if skill_file.exists():
-                try:
-                    skill = load_skill_definition(skill_file)
-                    skills.append(skill)
-                except SkillLoadError:
-                    # 忽略載入失敗的 skill，繼續處理其他
-                    pass
-    
-    return skills
+    return get_skill_index(base_path).skills()
 
 
 def get_skill_by_name(
@@ -108,11 +287,7 @@ def get_skill_by_name(
     Returns:
         SkillDefinition 或 None
     """
-    skills = discover_skills(base_path)
-    for skill in skills:
-        if skill.name == name:
-            return skill
-    return None
+    return get_skill_index(base_path).get(name)
 
 
 def format_skill_list(skills: list[SkillDefinition]) -> str:
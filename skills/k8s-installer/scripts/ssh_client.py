@@ -3,17 +3,29 @@ SSH Client 封裝
 
 提供 SSH 連線、命令執行、錯誤處理功能。
 """
+import hashlib
+import io
+import secrets
+import shlex
 import socket
-from typing import Optional, Tuple
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
 
-from paramiko import SSHClient, AutoAddPolicy
+from paramiko import Channel, ECDSAKey, Ed25519Key, PKey, RSAKey, SSHClient
 from paramiko.ssh_exception import (
     AuthenticationException,
     NoValidConnectionsError,
+    PasswordRequiredException,
     SSHException,
 )
 
+from agent import AgentError, RemoteAgent, agent_source
+from elevation import ElevationError, open_elevated_channel
+from host_keys import HostKeyError, PinningPolicy, get_host_key_store
 from models import NodeConnection
+from remote_shell import RemoteShell, RemoteShellError
+from state import get_state_dir, load_json_state, save_json_state
 
 
 # SSH 連線逾時設定（秒）
@@ -21,42 +33,187 @@ SSH_TIMEOUT = 30
 BANNER_TIMEOUT = 30
 AUTH_TIMEOUT = 30
 
+# 上傳腳本的存放目錄（檔名為內容雜湊）與執行記錄
+REMOTE_SCRIPT_DIR = "/var/lib/k8s-installer/scripts"
+REMOTE_JOURNAL = "/var/lib/k8s-installer/journal"
+
+# 串流讀取 stdout 的區塊大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class SSHConnectionError(Exception):
     """SSH 連線錯誤"""
     pass
 
 
+class SSHCredentialError(SSHConnectionError):
+    """此認證方式的認證資訊無法使用（例如私鑰無法讀取、agent 沒有金鑰）"""
+    pass
+
+
 class SSHCommandError(Exception):
     """SSH 命令執行錯誤"""
     pass
 
 
+class SSHPrivilegeError(SSHCommandError):
+    """無法以 sudo 取得 root 權限"""
+    pass
+
+
+class AuthMethodCache:
+    """
+    各節點上次成功的認證方式（以 user@host:port 為鍵）
+
+    記錄檔只在建立時讀取一次，有變更才寫回；執行緒安全。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_state_dir() / "auth-methods.json"
+        data = load_json_state(self.path)
+        self._methods: dict[str, str] = data if isinstance(data, dict) else {}
+        self._lock = threading.Lock()
+
+    def get(self, node: NodeConnection) -> Optional[str]:
+        with self._lock:
+            return self._methods.get(str(node))
+
+    def put(self, node: NodeConnection, method: str) -> None:
+        with self._lock:
+            if self._methods.get(str(node)) == method:
+                return
+            self._methods[str(node)] = method
+            save_json_state(self.path, self._methods)
+
+
+_auth_cache: Optional[AuthMethodCache] = None
+_keys: dict[tuple, PKey] = {}
+_shared_lock = threading.Lock()
+
+
+def get_auth_method_cache() -> AuthMethodCache:
+    """取得行程共用的認證方式快取"""
+    global _auth_cache
+    with _shared_lock:
+        if _auth_cache is None:
+            _auth_cache = AuthMethodCache()
+        return _auth_cache
+
+
+def load_private_key(
+    path: str,
+    passphrase: Optional[str] = None,
+    certificate: Optional[str] = None,
+) -> PKey:
+    """
+    讀取私鑰（可附加 OpenSSH 憑證），同一檔案在行程內只解析一次
+
+    Raises:
+        SSHCredentialError: 檔案不存在、格式不支援、需要密碼或密碼錯誤
+    """
+    cache_key = (path, certificate)
+    with _shared_lock:
+        key = _keys.get(cache_key)
+    if key is not None:
+        return key
+
+    for key_class in (Ed25519Key, ECDSAKey, RSAKey):
+        try:
+            key = key_class.from_private_key_file(path, password=passphrase)
+            break
+        except PasswordRequiredException as e:
+            raise SSHCredentialError(f"私鑰 {path} 需要密碼（key_passphrase）") from e
+        except SSHException:
+            continue
+        except OSError as e:
+            raise SSHCredentialError(f"無法讀取私鑰 {path}：{e}") from e
+    else:
+        raise SSHCredentialError(f"不支援的私鑰格式或密碼錯誤：{path}")
+
+    if certificate:
+        try:
+            key.load_certificate(certificate)
+        except (OSError, ValueError) as e:
+            raise SSHCredentialError(f"無法載入憑證 {certificate}：{e}") from e
+
+    with _shared_lock:
+        return _keys.setdefault(cache_key, key)
+
+
 class K8SSSHClient:
     """K8S 安裝用 SSH Client 封裝"""
 
     def __init__(self, node: NodeConnection):
         self.node = node
         self._client: Optional[SSHClient] = None
+        # 此連線已確認存在於節點上的檔案路徑
+        self._uploaded: set[str] = set()
+        self._upload_lock = threading.Lock()
+        self._shell: Optional[RemoteShell] = None
+        self._agent: Optional[RemoteAgent] = None
+        self._shell_lock = threading.Lock()
 
     def connect(self) -> None:
-        """建立 SSH 連線"""
+        """
+        建立 SSH 連線
+
+        先使用此節點上次成功的認證方式，失敗才依序嘗試其他方式，
+        避免每次連線都經過較慢的密碼 / keyboard-interactive 流程。
+        認證被拒或該方式的認證資訊無法使用時改試下一種方式；連線層級
+        的錯誤（無法連線、逾時、主機金鑰不符）直接拋出。
+        """
+        cache = get_auth_method_cache()
+        methods = self.node.auth_methods()
+        cached = cache.get(self.node)
+        if cached in methods:
+            methods.remove(cached)
+            methods.insert(0, cached)
+        if not methods:
+            raise SSHConnectionError(f"{self.node} 未設定任何認證方式")
+
+        reasons = []
+        for method in methods:
+            try:
+                self._connect(method)
+            except (AuthenticationException, SSHCredentialError) as e:
+                self.disconnect()
+                reasons.append(f"{method}: {e}")
+                if method == methods[-1]:
+                    raise SSHConnectionError(
+                        f"認證失敗：請確認 {self.node} 的認證資訊"
+                        f"（{'；'.join(reasons)}）"
+                    ) from e
+                continue
+            cache.put(self.node, method)
+            return
+
+    def _connect(self, method: str) -> None:
+        """
+        以指定的認證方式建立連線
+
+        Raises:
+            AuthenticationException: 認證失敗（由呼叫端改用下一種方式）
+            SSHCredentialError: 此方式的認證資訊無法使用（由呼叫端改用下一種方式）
+            SSHConnectionError: 其他連線錯誤
+        """
         try:
+            # 不載入 known_hosts：每次連線都由共用的主機金鑰記錄驗證
             self._client = SSHClient()
-            self._client.set_missing_host_key_policy(AutoAddPolicy())
+            self._client.set_missing_host_key_policy(
+                PinningPolicy(get_host_key_store(), self.node)
+            )
             self._client.connect(
                 hostname=self.node.host,
                 port=self.node.port,
                 username=self.node.user,
-                password=self.node.password,
                 timeout=SSH_TIMEOUT,
                 banner_timeout=BANNER_TIMEOUT,
                 auth_timeout=AUTH_TIMEOUT,
+                look_for_keys=False,
+                **self._auth_kwargs(method),
             )
-        except AuthenticationException as e:
-            raise SSHConnectionError(
-                f"認證失敗：請確認 {self.node} 的使用者名稱與密碼是否正確"
-            ) from e
+        except AuthenticationException:
+            raise
         except NoValidConnectionsError as e:
             raise SSHConnectionError(
                 f"無法連線：請確認 {self.node} 是否可達，SSH 服務是否啟動"
@@ -65,25 +222,92 @@ class K8SSSHClient:
             raise SSHConnectionError(
                 f"連線逾時：{self.node} 在 {SSH_TIMEOUT} 秒內無回應"
             ) from e
+        except HostKeyError as e:
+            self._client.close()
+            self._client = None
+            raise SSHConnectionError(f"主機金鑰驗證失敗：{e}") from e
         except SSHException as e:
+            transport = self._client.get_transport() if self._client else None
+            if transport is not None and transport.is_active():
+                # 連線與金鑰交換已完成，錯誤發生在認證階段
+                # （例如 agent 沒有任何金鑰時的 No authentication methods available）
+                raise SSHCredentialError(str(e)) from e
             raise SSHConnectionError(f"SSH 錯誤：{str(e)}") from e
 
+    def _auth_kwargs(self, method: str) -> dict:
+        """SSHClient.connect 只使用指定認證方式所需的參數"""
+        if method == "agent":
+            return {"allow_agent": True}
+        if method == "password":
+            return {"allow_agent": False, "password": self.node.password}
+        certificate = self.node.certificate_file if method == "certificate" else None
+        return {
+            "allow_agent": False,
+            "pkey": load_private_key(
+                self.node.key_file, self.node.key_passphrase, certificate
+            ),
+        }
+
     def disconnect(self) -> None:
         """關閉 SSH 連線"""
+        if self._shell is not None:
+            self._shell.close()
+            self._shell = None
+        if self._agent is not None:
+            self._agent.close()
+            self._agent = None
         if self._client:
             self._client.close()
             self._client = None
 
-    def execute(self, command: str) -> Tuple[str, str, int]:
+    def is_active(self) -> bool:
+        """連線是否仍可使用"""
+        if not self._client:
+            return False
+        transport = self._client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def execute(
+        self,
+        command: str,
+        persistent_shell: bool = False,
+    ) -> Tuple[str, str, int]:
         """
         執行 SSH 命令
-        
+
+        SSH 使用者不是 root 時，所有命令都在此連線以 sudo 開啟的常駐
+        bash 中執行（整個連線只認證一次；session 忙碌時等待）。
+
+        Args:
+            command: 要執行的命令
+            persistent_shell: 在此連線的常駐 bash 中執行，省去每個命令
+                開新 session 與載入 profile 的成本（session 忙碌時改用
+                獨立 session）
+
         Returns:
             Tuple[stdout, stderr, exit_code]
+
+        Raises:
+            SSHPrivilegeError: 無法以 sudo 取得 root 權限
         """
         if not self._client:
             raise SSHConnectionError("尚未建立連線，請先呼叫 connect()")
 
+        elevated = self.node.needs_elevation()
+        if persistent_shell or elevated:
+            shell = self._get_shell()
+            if elevated:
+                shell.acquire()
+            if elevated or shell.try_acquire():
+                try:
+                    return shell.run(command)
+                except ElevationError as e:
+                    raise SSHPrivilegeError(f"[{self.node}] {e}") from e
+                except RemoteShellError as e:
+                    raise SSHCommandError(str(e)) from e
+                finally:
+                    shell.release()
+
         try:
             stdin, stdout, stderr = self._client.exec_command(
                 command, 
@@ -100,6 +324,218 @@ class K8SSSHClient:
         except SSHException as e:
             raise SSHCommandError(f"命令執行失敗：{str(e)}") from e
 
+    def _get_shell(self) -> RemoteShell:
+        """取得此連線的常駐 bash（第一次使用時才開啟）"""
+        with self._shell_lock:
+            if self._shell is None:
+                self._shell = RemoteShell(
+                    self._client.get_transport(),
+                    elevate=self.node.needs_elevation(),
+                    password=self.node.become_password(),
+                )
+            return self._shell
+
+    def agent(self) -> RemoteAgent:
+        """
+        取得此連線上的節點端 agent（第一次使用時上傳並啟動）
+
+        Raises:
+            SSHCommandError: 上傳或啟動失敗（例如節點沒有 python3）
+        """
+        if not self._client:
+            raise SSHConnectionError("尚未建立連線，請先呼叫 connect()")
+
+        with self._shell_lock:
+            if self._agent is not None and self._agent.is_open:
+                return self._agent
+
+            source, digest = agent_source()
+            path = self.stage_file(
+                REMOTE_SCRIPT_DIR, f"agent-{digest}.py", source.encode("utf-8")
+            )
+            try:
+                channel = self._open_channel(f"python3 {path}")
+            except SSHException as e:
+                raise SSHCommandError(f"[{self.node}] 無法啟動 agent：{e}") from e
+            agent = RemoteAgent(channel)
+            try:
+                agent.handshake()
+            except AgentError as e:
+                agent.close()
+                raise SSHCommandError(f"[{self.node}] 無法啟動 agent：{e}") from e
+            self._agent = agent
+            return agent
+
+    def execute_streaming(
+        self,
+        command: str,
+        sink: BinaryIO,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, str, int]:
+        """
+        執行命令並將 stdout 原始位元組直接寫入 sink（用於傳回壓縮檔等二進位資料）
+
+        Args:
+            command: 要執行的命令
+            sink: 接收 stdout 的檔案物件
+            limit: stdout 位元組上限，超過即中止並拋出例外
+
+        Returns:
+            Tuple[寫入的位元組數, stderr, exit_code]
+        """
+        if not self._client:
+            raise SSHConnectionError("尚未建立連線，請先呼叫 connect()")
+
+        try:
+            channel = self._open_channel(f"bash -c {shlex.quote(command)}")
+            channel.settimeout(SSH_TIMEOUT)
+            written = 0
+            while True:
+                chunk = channel.recv(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if limit is not None and written > limit:
+                    channel.close()
+                    raise SSHCommandError(f"輸出超過上限 {limit} bytes：{command[:50]}...")
+                sink.write(chunk)
+            exit_code = channel.recv_exit_status()
+            stderr = channel.makefile_stderr("rb").read()
+            return written, stderr.decode("utf-8", errors="replace"), exit_code
+        except socket.timeout as e:
+            raise SSHCommandError(
+                f"命令執行逾時：{command[:50]}..."
+            ) from e
+        except SSHException as e:
+            raise SSHCommandError(f"命令執行失敗：{str(e)}") from e
+
+    def _open_channel(self, command: str) -> Channel:
+        """
+        開啟執行 command 的 channel（SSH 使用者不是 root 時以 sudo 執行）
+
+        Raises:
+            SSHPrivilegeError: 無法以 sudo 取得 root 權限
+            SSHException: 無法開啟 channel
+        """
+        transport = self._client.get_transport()
+        if self.node.needs_elevation():
+            try:
+                return open_elevated_channel(
+                    transport, command, self.node.become_password()
+                )
+            except ElevationError as e:
+                raise SSHPrivilegeError(f"[{self.node}] {e}") from e
+        channel = transport.open_session()
+        channel.exec_command(command)
+        return channel
+
+    def execute_uploaded(
+        self,
+        script: str,
+        digest: str,
+        step_id: str,
+        persistent_shell: bool = False,
+    ) -> Tuple[str, str, int]:
+        """
+        上傳腳本（每份內容只傳一次）後執行，成功時寫入執行記錄
+
+        腳本以內容雜湊命名，節點上已有相同內容時不會重新傳送；
+        執行記錄每行為「時間 雜湊 步驟 ID」。
+
+        Returns:
+            Tuple[stdout, stderr, exit_code]
+        """
+        path = self.stage_file(REMOTE_SCRIPT_DIR, f"{digest}.sh", script.encode("utf-8"))
+        return self.execute(
+            f"bash {path} && "
+            f"echo \"$(date +%s) {digest} {step_id}\" >> {REMOTE_JOURNAL}",
+            persistent_shell=persistent_shell,
+        )
+
+    def stage_file(self, directory: str, name: str, data: bytes) -> str:
+        """
+        將檔案放到節點上的目錄（以內容命名的檔案每個連線只傳一次）
+
+        Args:
+            directory: 節點上的目錄（不存在時建立）
+            name: 檔名
+            data: 檔案內容
+
+        Returns:
+            節點上的路徑
+
+        Raises:
+            SSHCommandError: 無法建立目錄或上傳失敗
+        """
+        path = f"{directory}/{name}"
+        with self._upload_lock:
+            if path not in self._uploaded:
+                self._upload(directory, path, data)
+                self._uploaded.add(path)
+        return path
+
+    def _upload(self, directory: str, path: str, data: bytes) -> None:
+        """
+        上傳檔案（節點上已有相同內容的檔案時略過）
+
+        目錄維持 root 擁有、權限 0700（其中的檔案會以 root 執行）。SFTP
+        以 SSH 使用者身分先寫到其家目錄下的暫存檔，再由 root 權限的
+        session 以 install 放入目錄；略過與放置後都以 SHA-256 比對內容，
+        確認執行的就是要上傳的內容。
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        quoted_dir, quoted_path = shlex.quote(directory), shlex.quote(path)
+        stdout, stderr, exit_code = self.execute(
+            f"mkdir -p {quoted_dir} && chown root:root {quoted_dir} && chmod 700 {quoted_dir} "
+            f"&& {{ sha256sum {quoted_path} 2>/dev/null || true; }}"
+        )
+        if exit_code != 0:
+            raise SSHCommandError(f"無法建立目錄 {directory}：{stderr}")
+        if stdout.split()[:1] == [digest]:
+            return
+
+        try:
+            with self._client.open_sftp() as sftp:
+                staging = (
+                    f"{sftp.normalize('.')}/.k8s-installer-{digest[:16]}-{secrets.token_hex(4)}"
+                )
+                with sftp.open(staging, "wb") as remote_file:
+                    remote_file.chmod(0o600)
+                    remote_file.write(data)
+        except (IOError, SSHException) as e:
+            raise SSHCommandError(f"上傳 {path} 失敗：{e}") from e
+
+        quoted_staging = shlex.quote(staging)
+        stdout, stderr, exit_code = self.execute(
+            f"install -m 0700 -o root -g root {quoted_staging} {quoted_path}; "
+            f"status=$?; rm -f {quoted_staging}; "
+            f"[ $status -eq 0 ] && sha256sum {quoted_path}"
+        )
+        if exit_code != 0:
+            raise SSHCommandError(f"無法放置 {path}：{stderr}")
+        if stdout.split()[:1] != [digest]:
+            # 暫存檔在放置前被替換，不保留內容不符的檔案
+            self.execute(f"rm -f {quoted_path}")
+            raise SSHCommandError(f"{path} 的 SHA-256 與上傳的內容不符，已移除")
+
+    def open_tunnel(self, host: str, port: int) -> Channel:
+        """
+        經由此連線開啟到節點端 host:port 的 TCP 通道（direct-tcpip）
+
+        Raises:
+            SSHCommandError: 節點拒絕轉送（例如 sshd 設定 AllowTcpForwarding no）
+        """
+        if not self._client:
+            raise SSHConnectionError("尚未建立連線，請先呼叫 connect()")
+        try:
+            return self._client.get_transport().open_channel(
+                "direct-tcpip", (host, port), ("127.0.0.1", 0)
+            )
+        except SSHException as e:
+            raise SSHCommandError(
+                f"[{self.node}] 無法開啟到 {host}:{port} 的通道：{e}"
+            ) from e
+
     def execute_script(self, script: str) -> Tuple[str, str, int]:
         """
         執行多行腳本
@@ -120,6 +556,84 @@ class K8SSSHClient:
         return False
 
 
+class ConnectionPool:
+    """
+    SSH 連線池
+
+    同一節點重用已建立的連線（paramiko 可在同一 transport 上並行開啟多個
+    channel），避免每個步驟都重新握手與認證。執行緒安全。
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple, K8SSSHClient] = {}
+        self._node_locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, node: NodeConnection) -> K8SSSHClient:
+        """
+        取得節點的已連線 client，必要時建立新連線
+
+        Raises:
+            SSHConnectionError: 連線失敗
+        """
+        key = _node_key(node)
+        with self._lock:
+            node_lock = self._node_locks.setdefault(key, threading.Lock())
+
+        # 同一節點的並行請求只建立一次連線
+        with node_lock:
+            client = self._clients.get(key)
+            if client is not None and client.is_active():
+                return client
+            if client is not None:
+                client.disconnect()
+
+            client = K8SSSHClient(node)
+            client.connect()
+            self._clients[key] = client
+            return client
+
+    def discard(self, node: NodeConnection) -> None:
+        """關閉並移除節點的連線"""
+        with self._lock:
+            client = self._clients.pop(_node_key(node), None)
+        if client is not None:
+            client.disconnect()
+
+    def close_all(self) -> None:
+        """關閉所有連線"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.disconnect()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+def _node_key(node: NodeConnection) -> tuple:
+    """
+    連線池鍵值
+
+    包含認證資訊的指紋：配置中的密碼、金鑰或 sudo 密碼變更後（常駐模式
+    載入新版配置）會建立新的連線，不同配置也不會共用同一個已認證的連線。
+    """
+    credentials = "\0".join(
+        str(value or "")
+        for value in (
+            node.password,
+            node.key_file,
+            node.key_passphrase,
+            node.certificate_file,
+            node.use_agent,
+            node.sudo_password,
+        )
+    )
+    fingerprint = hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+    return (node.host, node.port, node.user, fingerprint)
+
+
 def test_connection(node: NodeConnection) -> Tuple[bool, str]:
     """
     測試 SSH 連線
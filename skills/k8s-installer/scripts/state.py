@@ -0,0 +1,73 @@
+"""
+本機狀態儲存
+
+提供快取與狀態檔案（JSON）的讀寫，統一存放於狀態目錄。
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+
+# 狀態目錄可透過環境變數覆寫
+STATE_DIR_ENV = "K8S_INSTALLER_STATE_DIR"
+DEFAULT_STATE_DIR = Path.home() / ".cache" / "k8s-installer"
+
+
+def get_state_dir() -> Path:
+    """取得狀態目錄路徑"""
+    override = os.environ.get(STATE_DIR_ENV)
+    if override:
+        return Path(override).expanduser()
+    return DEFAULT_STATE_DIR
+
+
+def load_json_state(path: Path) -> Optional[Any]:
+    """
+    讀取 JSON 狀態檔
+
+    Args:
+        path: 狀態檔路徑
+
+    Returns:
+        解析後的資料，檔案不存在或損毀時回傳 None
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json_state(path: Path, data: Any, private: bool = False) -> bool:
+    """
+    以原子方式寫入 JSON 狀態檔
+
+    先寫入同目錄的暫存檔再 rename，避免並行讀取到寫一半的檔案。
+
+    Args:
+        path: 狀態檔路徑
+        data: 要寫入的資料
+        private: 是否限制為僅擁有者可讀寫（含敏感資訊時使用）
+
+    Returns:
+        是否寫入成功（狀態目錄不可寫時回傳 False，不中斷主流程）
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{path.name}.", dir=str(path.parent)
+        )
+        try:
+            if private:
+                os.chmod(tmp_path, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,192 @@
+"""
+叢集健康狀態
+
+透過 Primary Master 查詢一次 API Server，同時以連線池並行探測每個節點
+（kubelet、containerd、磁碟、記憶體），合併為單一報告。總耗時取決於
+最慢的節點，而非所有節點的總和。
+"""
+import threading
+import time
+from typing import Optional
+
+from commands import get_check_cluster_status_script, get_node_health_probe_script
+from host_keys import scan_host_keys
+from models import ClusterConfig, ClusterStatus, NodeConnection, NodeStatus
+from parallel import DEFAULT_MAX_WORKERS, run_on_nodes
+from ssh_client import ConnectionPool, SSHConnectionError, SSHCommandError
+
+
+# 磁碟使用率超過此百分比即列為問題
+DISK_USAGE_LIMIT_PCT = 85
+# 可用記憶體低於此值（MB）即列為問題
+MEMORY_AVAILABLE_MIN_MB = 256
+# API Server 回報的異常 condition
+PRESSURE_CONDITIONS = ("MemoryPressure", "DiskPressure", "PIDPressure", "NetworkUnavailable")
+
+
+def parse_api_status(stdout: str) -> tuple[dict, dict]:
+    """
+    解析 get_check_cluster_status_script 的輸出
+
+    Returns:
+        ({InternalIP 或名稱: 節點資訊}, {節點名稱: 未就緒 Pod 數})
+    """
+    api_nodes = {}
+    pods = {}
+    for line in stdout.splitlines():
+        parts = line.split("\t")
+        if parts[0] == "node" and len(parts) >= 6:
+            info = {
+                "name": parts[1],
+                "ready": parts[3] == "True",
+                "kubelet_version": parts[4],
+                "conditions": [c for c in parts[5].split() if c != "Ready"],
+            }
+            api_nodes[parts[1]] = info
+            if parts[2]:
+                api_nodes[parts[2]] = info
+        elif parts[0] == "pods" and len(parts) >= 3:
+            pods[parts[1]] = int(parts[2] or 0)
+    return api_nodes, pods
+
+
+def probe_node(pool: ConnectionPool, node: NodeConnection) -> dict:
+    """
+    探測單一節點
+
+    Raises:
+        SSHConnectionError: 連線失敗
+        SSHCommandError: 命令執行失敗
+    """
+    stdout, stderr, exit_code = pool.get(node).execute(get_node_health_probe_script())
+    if exit_code != 0:
+        raise SSHCommandError(f"[{node}] 健康探測失敗：{stderr}")
+
+    probe = {}
+    for line in stdout.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            probe[key.strip()] = value.strip()
+    return probe
+
+
+def collect_cluster_status(
+    config: ClusterConfig,
+    pool: ConnectionPool,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> ClusterStatus:
+    """
+    收集叢集健康狀態
+
+    API 查詢與節點探測同時進行；任一節點失敗只會記錄在該節點的結果中。
+
+    Args:
+        config: 叢集配置
+        pool: SSH 連線池
+        max_workers: 同時探測的節點數上限
+
+    Returns:
+        ClusterStatus 報告
+    """
+    started = time.monotonic()
+    scan_host_keys(config.all_nodes(), max_workers)
+    api: dict = {}
+
+    def query_api() -> None:
+        try:
+            stdout, stderr, exit_code = pool.get(config.primary_master()).execute(
+                get_check_cluster_status_script()
+            )
+            if exit_code != 0:
+                api["error"] = f"API Server 查詢失敗：{stderr.strip()}"
+            else:
+                api["nodes"], api["pods"] = parse_api_status(stdout)
+        except (SSHConnectionError, SSHCommandError) as e:
+            api["error"] = str(e)
+
+    api_thread = threading.Thread(target=query_api, name="cluster-status-api")
+    api_thread.start()
+    outcomes = run_on_nodes(
+        config.all_nodes(),
+        lambda node: probe_node(pool, node),
+        max_workers=max_workers,
+    )
+    api_thread.join()
+
+    status = ClusterStatus(api_error=api.get("error"))
+    for outcome in outcomes:
+        role = "master" if config.is_master(outcome.node) else "worker"
+        node_status = NodeStatus(node=str(outcome.node), role=role)
+        probe = outcome.result if outcome.ok else None
+        if not outcome.ok:
+            node_status.problems.append(f"無法探測：{outcome.error}")
+        _merge_probe(node_status, probe)
+        _merge_api(node_status, outcome.node, probe, api)
+        status.nodes.append(node_status)
+
+    status.duration = time.monotonic() - started
+    return status
+
+
+def _merge_probe(status: NodeStatus, probe: Optional[dict]) -> None:
+    """合併 SSH 探測結果並判斷問題"""
+    if probe is None:
+        return
+    status.reachable = True
+    status.kubelet = probe.get("kubelet") or "unknown"
+    status.containerd = probe.get("containerd") or "unknown"
+    disks = [_to_int(probe.get(k)) for k in ("disk_root_pct", "disk_containerd_pct")]
+    disks = [d for d in disks if d is not None]
+    status.disk_used_pct = max(disks) if disks else None
+    available_kb = _to_int(probe.get("memory_available_kb"))
+    status.memory_available_mb = available_kb // 1024 if available_kb is not None else None
+
+    if status.kubelet != "active":
+        status.problems.append(f"kubelet {status.kubelet}")
+    if status.containerd != "active":
+        status.problems.append(f"containerd {status.containerd}")
+    if status.disk_used_pct is not None and status.disk_used_pct >= DISK_USAGE_LIMIT_PCT:
+        status.problems.append(f"磁碟使用率 {status.disk_used_pct}%")
+    if (
+        status.memory_available_mb is not None
+        and status.memory_available_mb < MEMORY_AVAILABLE_MIN_MB
+    ):
+        status.problems.append(f"可用記憶體 {status.memory_available_mb} MB")
+
+
+def _merge_api(
+    status: NodeStatus,
+    node: NodeConnection,
+    probe: Optional[dict],
+    api: dict,
+) -> None:
+    """合併 API Server 回報的節點狀態"""
+    api_nodes = api.get("nodes")
+    if api_nodes is None:
+        return
+
+    info = api_nodes.get(node.host)
+    if info is None and probe:
+        info = api_nodes.get(probe.get("hostname", ""))
+    if info is None:
+        status.problems.append("未註冊於叢集")
+        return
+
+    status.name = info["name"]
+    status.ready = info["ready"]
+    status.kubelet_version = info["kubelet_version"]
+    status.conditions = info["conditions"]
+    status.pods_not_ready = api.get("pods", {}).get(info["name"], 0)
+
+    if not status.ready:
+        status.problems.append("NotReady")
+    for condition in status.conditions:
+        if condition in PRESSURE_CONDITIONS:
+            status.problems.append(condition)
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,185 @@
+"""
+安裝步驟渲染
+
+依叢集配置產生每個節點與 Control Plane 要執行的腳本。渲染結果以
+（步驟 ID, 參數）為鍵快取（含 join 憑證的步驟除外）：同一份腳本送往
+數百個節點時只渲染與雜湊一次。
+安裝流程、已套用狀態（腳本雜湊）與 dry-run 共用同一份渲染結果，確保
+比對的就是實際執行的內容。
+"""
+import functools
+import hashlib
+
+from calico import render_calico_resources
+from containerd_config import containerd_script_params
+from concurrency import RESOURCE_APISERVER, RESOURCE_MIRROR, RESOURCE_SSH
+from kubeadm_config import render_kubeadm_config
+from models import ClusterConfig, RenderedScript
+from commands import (
+    get_disable_swap_script,
+    get_load_kernel_modules_script,
+    get_configure_sysctl_script,
+    get_install_containerd_script,
+    get_install_kubernetes_packages_script,
+    get_kubeadm_init_script,
+    get_install_calico_script,
+    get_master_prepare_script,
+    get_master_control_plane_join_script,
+    get_etcd_health_check_script,
+    get_worker_join_script,
+    get_install_metallb_script,
+    get_remove_node_script,
+    get_seed_images_script,
+    get_fetch_seed_images_script,
+    get_stop_seed_script,
+)
+
+
+# 可在既有叢集上重新執行的 Control Plane 步驟
+RERUNNABLE_CLUSTER_STEPS = ("install_metallb",)
+
+# 步驟名稱（前置檢查與取得 Join 命令不是腳本步驟，只用於顯示）
+STEP_NAMES = {
+    "preflight": "前置檢查",
+    "etcd_disk_check": "etcd 磁碟延遲檢查",
+    "disable_swap": "停用 Swap",
+    "load_modules": "載入核心模組",
+    "configure_sysctl": "設定 Sysctl",
+    "install_containerd": "安裝 Containerd",
+    "install_k8s_packages": "安裝 K8S 套件",
+    "kubeadm_init": "初始化 Control Plane",
+    "install_calico": "安裝 Calico CNI",
+    "generate_join": "取得 Join 命令",
+    "master_prepare": "準備 Control Plane",
+    "master_join": "加入 Control Plane（etcd）",
+    "etcd_health_check": "etcd 健康檢查",
+    "worker_join": "加入叢集",
+    "install_metallb": "安裝 MetalLB",
+    "remove_node": "移除節點",
+    "seed_images": "準備站點映像種子",
+    "fetch_seed_images": "從站點種子匯入映像",
+    "stop_seed": "停止站點映像種子",
+}
+
+# 步驟 ID 對應的腳本產生函式
+STEP_RENDERERS = {
+    "disable_swap": get_disable_swap_script,
+    "load_modules": get_load_kernel_modules_script,
+    "configure_sysctl": get_configure_sysctl_script,
+    "install_containerd": get_install_containerd_script,
+    "install_k8s_packages": get_install_kubernetes_packages_script,
+    "kubeadm_init": get_kubeadm_init_script,
+    "install_calico": get_install_calico_script,
+    "master_prepare": get_master_prepare_script,
+    "master_join": get_master_control_plane_join_script,
+    "etcd_health_check": get_etcd_health_check_script,
+    "worker_join": get_worker_join_script,
+    "install_metallb": get_install_metallb_script,
+    "remove_node": get_remove_node_script,
+    "seed_images": get_seed_images_script,
+    "fetch_seed_images": get_fetch_seed_images_script,
+    "stop_seed": get_stop_seed_script,
+}
+
+# 腳本內含 join 憑證的步驟
+SECRET_STEPS = ("master_prepare", "worker_join")
+
+# 步驟除了 SSH 以外會使用的共享資源（自適應並行依資源分別調整）
+STEP_RESOURCES = {
+    "install_containerd": (RESOURCE_MIRROR,),
+    "install_k8s_packages": (RESOURCE_MIRROR,),
+    "kubeadm_init": (RESOURCE_MIRROR,),
+    "install_calico": (RESOURCE_MIRROR, RESOURCE_APISERVER),
+    "master_prepare": (RESOURCE_APISERVER,),
+    "master_join": (RESOURCE_MIRROR, RESOURCE_APISERVER),
+    "worker_join": (RESOURCE_APISERVER,),
+    "install_metallb": (RESOURCE_MIRROR, RESOURCE_APISERVER),
+    "remove_node": (RESOURCE_APISERVER,),
+    "seed_images": (RESOURCE_MIRROR,),
+}
+
+# 快取的渲染結果數上限（每個叢集約數十種步驟與參數組合；常駐模式下
+# 多個叢集與配置版本共用，超過時捨棄最久未使用的結果）
+RENDER_CACHE_SIZE = 512
+
+
+def render_step(step_id: str, *params) -> RenderedScript:
+    """
+    渲染單一步驟（以步驟 ID 與參數快取）
+
+    含 join 憑證的步驟（SECRET_STEPS）不快取，憑證不會在常駐程序中
+    留存於快取。
+
+    Args:
+        step_id: STEP_RENDERERS 中的步驟 ID
+        params: 傳給腳本產生函式的參數（須可雜湊）
+
+    Returns:
+        RenderedScript；仍在快取中的相同參數回傳同一個物件
+    """
+    if step_id in SECRET_STEPS:
+        return _render(step_id, params)
+    return _render_cached(step_id, params)
+
+
+def _render(step_id: str, params: tuple) -> RenderedScript:
+    """渲染並雜湊腳本"""
+    script = STEP_RENDERERS[step_id](*params)
+    return RenderedScript(
+        step_id=step_id,
+        name=STEP_NAMES[step_id],
+        script=script,
+        digest=script_hash(script),
+        secret=step_id in SECRET_STEPS,
+    )
+
+
+# lru_cache 本身是執行緒安全的；同一組參數同時第一次渲染時可能各算一次
+_render_cached = functools.lru_cache(maxsize=RENDER_CACHE_SIZE)(_render)
+
+
+def step_resources(step_id: str) -> tuple[str, ...]:
+    """步驟使用的共享資源（一律包含 SSH）"""
+    return (RESOURCE_SSH,) + STEP_RESOURCES.get(step_id, ())
+
+
+def render_node_steps(config: ClusterConfig) -> list[RenderedScript]:
+    """
+    取得每個節點都要執行的前置作業與套件安裝步驟
+
+    Returns:
+        依執行順序排列的 RenderedScript 列表
+    """
+    return [
+        render_step("disable_swap"),
+        render_step("load_modules", config.tuning.proxy_mode),
+        render_step("configure_sysctl"),
+        render_step("install_containerd", *containerd_script_params(config.containerd)),
+        render_step("install_k8s_packages", config.kubernetes_version),
+    ]
+
+
+def render_cluster_steps(config: ClusterConfig) -> list[RenderedScript]:
+    """
+    取得只在 Primary Master 執行的叢集層級步驟
+
+    Returns:
+        RenderedScript 列表；未設定 MetalLB 時不含該步驟
+    """
+    steps = [
+        render_step("kubeadm_init", render_kubeadm_config(config)),
+        render_step("install_calico", render_calico_resources(config)),
+    ]
+    if config.metallb_ip_range:
+        steps.append(render_step("install_metallb", config.metallb_ip_range))
+    return steps
+
+
+def script_hash(script: str) -> str:
+    """腳本內容雜湊（用於判斷步驟是否需要重新執行）"""
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+
+def step_hashes(steps: list[RenderedScript]) -> dict[str, str]:
+    """將步驟列表轉為 {步驟 ID: 腳本雜湊}"""
+    return {step.step_id: step.digest for step in steps}
@@ -0,0 +1,99 @@
+"""
+步驟耗時記錄
+
+記錄每次執行各步驟（依步驟 ID）的實際耗時，供 dry-run 預估安裝時間。
+沒有歷史記錄的步驟使用預設值。
+"""
+import threading
+from pathlib import Path
+from typing import Optional
+
+from models import InstallationStep, StepStatus
+from state import get_state_dir, load_json_state, save_json_state
+
+
+# 沒有歷史記錄時的預估耗時（秒）
+DEFAULT_STEP_DURATIONS = {
+    "preflight": 5.0,
+    "etcd_disk_check": 15.0,
+    "disable_swap": 2.0,
+    "load_modules": 2.0,
+    "configure_sysctl": 2.0,
+    "install_containerd": 60.0,
+    "install_k8s_packages": 90.0,
+    "kubeadm_init": 120.0,
+    "install_calico": 120.0,
+    "generate_join": 5.0,
+    "master_prepare": 60.0,
+    "master_join": 40.0,
+    "etcd_health_check": 15.0,
+    "worker_join": 45.0,
+    "install_metallb": 90.0,
+    "remove_node": 60.0,
+    "seed_images": 120.0,
+    "fetch_seed_images": 45.0,
+    "stop_seed": 2.0,
+}
+FALLBACK_STEP_DURATION = 30.0
+
+# 新樣本在移動平均中的權重
+SMOOTHING = 0.3
+
+
+def get_timings_path() -> Path:
+    """取得耗時記錄檔路徑"""
+    return get_state_dir() / "step-timings.json"
+
+
+class StepTimings:
+    """
+    各步驟耗時的移動平均
+
+    執行緒安全：並行安裝多個叢集時所有安裝器共用同一個實例，每次寫回
+    都包含所有叢集的樣本，不會互相覆蓋。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_timings_path()
+        data = load_json_state(self.path)
+        self._timings: dict[str, dict] = data if isinstance(data, dict) else {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def record(self, step_id: str, duration: float) -> None:
+        """加入一筆耗時樣本"""
+        with self._lock:
+            self._dirty = True
+            entry = self._timings.get(step_id)
+            if entry is None:
+                self._timings[step_id] = {"mean": duration, "max": duration, "count": 1}
+                return
+            entry["mean"] = (1 - SMOOTHING) * entry["mean"] + SMOOTHING * duration
+            entry["max"] = max(entry["max"], duration)
+            entry["count"] += 1
+
+    def record_steps(self, steps: list[InstallationStep]) -> None:
+        """記錄成功步驟的耗時，並將尚未寫入的樣本寫回檔案"""
+        for step in steps:
+            if step.step_id and step.status == StepStatus.SUCCESS and step.duration:
+                self.record(step.step_id, step.duration)
+        if self._dirty:
+            self.save()
+
+    def estimate(self, step_id: str) -> tuple[float, int]:
+        """
+        預估步驟耗時
+
+        Returns:
+            (秒數, 歷史樣本數)；樣本數為 0 表示使用預設值
+        """
+        with self._lock:
+            entry = self._timings.get(step_id)
+            if entry:
+                return entry["mean"], entry["count"]
+        return DEFAULT_STEP_DURATIONS.get(step_id, FALLBACK_STEP_DURATION), 0
+
+    def save(self) -> bool:
+        with self._lock:
+            self._dirty = False
+            return save_json_state(self.path, self._timings)
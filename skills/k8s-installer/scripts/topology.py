@@ -0,0 +1,103 @@
+"""
+節點拓撲
+
+依節點的 site / zone / rack 標籤安排執行順序、限制各站點的並行數，
+並為每個站點挑選映像分發的種子節點：種子節點從 registry 下載一次後在
+站點內提供給其他節點，跨站點（WAN）只需傳送一份。
+"""
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, Optional
+
+from models import ClusterConfig, NodeConnection
+
+
+# 未標示站點的節點歸在同一組
+DEFAULT_SITE = ""
+
+# 由外而內交錯排列的拓撲層級
+TOPOLOGY_LEVELS = ("site", "zone", "rack")
+
+
+def site_of(node: NodeConnection) -> str:
+    return node.site or DEFAULT_SITE
+
+
+def group_by_site(nodes: list[NodeConnection]) -> dict[str, list[NodeConnection]]:
+    """依站點分組（保留原本順序）"""
+    groups: dict[str, list[NodeConnection]] = {}
+    for node in nodes:
+        groups.setdefault(site_of(node), []).append(node)
+    return groups
+
+
+def interleave(
+    nodes: list[NodeConnection],
+    levels: tuple[str, ...] = TOPOLOGY_LEVELS,
+) -> list[NodeConnection]:
+    """
+    依拓撲交錯排列節點
+
+    先輪流取各站點，站點內再輪流取各 zone、各 rack；執行緒池依此順序
+    取用節點時，同時進行的工作會分散在不同站點與機櫃，而不是集中在
+    清單前段的同一站點。
+
+    Args:
+        nodes: 節點列表
+        levels: 交錯的拓撲層級（由外而內）
+
+    Returns:
+        重新排列後的節點（各組內保留原本順序）
+    """
+    if not levels or len(nodes) < 2:
+        return list(nodes)
+
+    groups: dict[str, list[NodeConnection]] = {}
+    for node in nodes:
+        groups.setdefault(getattr(node, levels[0]) or "", []).append(node)
+    if len(groups) == 1:
+        return interleave(nodes, levels[1:])
+
+    queues = [interleave(group, levels[1:]) for group in groups.values()]
+    ordered = []
+    for index in range(max(len(q) for q in queues)):
+        ordered.extend(q[index] for q in queues if index < len(q))
+    return ordered
+
+
+def choose_seeds(
+    config: ClusterConfig,
+    nodes: Optional[list[NodeConnection]] = None,
+) -> dict[str, NodeConnection]:
+    """
+    為每個站點挑選映像種子節點
+
+    優先選 Master（本身就需要全部 Control Plane 映像），否則選站點中的
+    第一個節點。
+
+    Args:
+        config: 叢集配置
+        nodes: 需要映像的節點，預設為全部節點
+
+    Returns:
+        站點對應的種子節點
+    """
+    seeds: dict[str, NodeConnection] = {}
+    for site, members in group_by_site(nodes or config.all_nodes()).items():
+        masters = [n for n in members if config.is_master(n)]
+        seeds[site] = (masters or members)[0]
+    return seeds
+
+
+class SiteLimits:
+    """各站點同時操作的節點數上限（執行緒安全）"""
+
+    def __init__(self, limits: dict[str, int]):
+        self._semaphores = {
+            site: threading.BoundedSemaphore(limit) for site, limit in limits.items()
+        }
+
+    def slot(self, node: NodeConnection) -> ContextManager:
+        """佔用節點所在站點的名額（未設定上限的站點不限制）"""
+        semaphore = self._semaphores.get(site_of(node))
+        return semaphore if semaphore is not None else nullcontext()